@@ -7,18 +7,77 @@ class Settings(BaseSettings):
     BACKEND_PORT: int = 8000
     DEBUG: bool = False
 
-    # Database
-    DATABASE_URL: str
-    SUPABASE_URL: str
-    SUPABASE_KEY: str
-    SUPABASE_SERVICE_ROLE_KEY: str
+    # Database (Supabase values are only required with VECTOR_STORE_BACKEND=supabase)
+    DATABASE_URL: str = ""
+    SUPABASE_URL: str = ""
+    SUPABASE_KEY: str = ""
+    SUPABASE_SERVICE_ROLE_KEY: str = ""
+
+    # Async Postgres pool over DATABASE_URL (asyncpg); Supabase REST is the fallback
+    DATABASE_POOL_ENABLED: bool = False
+    DATABASE_POOL_MIN_SIZE: int = 1
+    DATABASE_POOL_MAX_SIZE: int = 10
+    DATABASE_STATEMENT_CACHE_SIZE: int = 100  # Prepared statements per connection (0 behind PgBouncer)
+
+    # Ownership/status metadata cache (documents and notebooks)
+    METADATA_CACHE_SIZE: int = 10000  # Entries kept in memory (LRU)
+    METADATA_CACHE_TTL_SECONDS: float = 30  # Bounds staleness for writes from other workers
+
+    # Chat: notebook updated_at bumps are buffered and written in one UPDATE
+    NOTEBOOK_TOUCH_FLUSH_SECONDS: float = 2.0  # Write-behind interval (0 = write immediately)
+    MESSAGE_BATCH_MAX: int = 50  # Messages accepted per batch save
+
+    # Vector store backend: "supabase" (pgvector) or "embedded" (SQLite + mmap, no network)
+    VECTOR_STORE_BACKEND: str = "supabase"
+    EMBEDDED_STORE_DIR: str = "data/embedded_store"
 
     # Embedding (Sentence-Transformers - Local)
     EMBEDDING_MODEL: str = "all-MiniLM-L6-v2"  # 384 dimensions, fast & good
+    EMBEDDING_BATCH_SIZE: int = 64  # Chunks per model.encode call during ingestion
+    EMBEDDING_EXECUTOR_WORKERS: int = 2  # Threads running model.encode off the event loop
+    EMBEDDING_BATCH_MAX_WAIT_MS: float = 5.0  # How long concurrent query embeds wait to share a batch
+    EMBEDDING_BATCH_MAX_SIZE: int = 32  # Flush a micro-batch early at this many texts (1 = disabled)
+    EMBEDDING_CACHE_ENABLED: bool = True  # Reuse vectors for text we've already embedded
+    EMBEDDING_CACHE_PATH: str = "data/embedding_cache.sqlite3"
+    EMBEDDING_CACHE_MEMORY_ITEMS: int = 10000  # In-memory LRU tier size
+    EMBEDDING_CACHE_DTYPE: str = "float32"  # "float16" halves disk use at slight precision cost
+    QUERY_EMBEDDING_CACHE_SIZE: int = 1024  # Recent question vectors kept in memory
+    QUERY_EMBEDDING_CACHE_TTL_SECONDS: int = 3600
+
+    # Ingestion
+    CHUNK_INSERT_BATCH_SIZE: int = 100  # Rows per multi-row insert into document_chunks
+    CHUNK_BULK_COPY: bool = True  # With the Postgres pool, load chunks via binary COPY
+    INGESTION_CONCURRENCY: int = 2  # Documents processed in parallel by background workers
+    INGESTION_QUEUE_SIZE: int = 32  # Pending uploads before new ones get 503
+
+    # Local ANN vector index (optional, per-document IVF persisted to disk)
+    LOCAL_VECTOR_INDEX_ENABLED: bool = False
+    LOCAL_VECTOR_INDEX_DIR: str = "data/vector_index"
+    LOCAL_VECTOR_INDEX_NPROBE: int = 8  # Inverted lists scanned per query (higher = better recall)
+    LOCAL_VECTOR_INDEX_MAX_LOADED: int = 256  # Document indexes kept in memory (LRU); others reload from disk
+
+    # Hybrid retrieval (BM25 + vector, fused with reciprocal rank fusion)
+    LEXICAL_INDEX_DIR: str = "data/lexical_index"
+    LEXICAL_INDEX_MAX_LOADED: int = 256  # Document indexes kept in memory (LRU); others reload from disk
+    HYBRID_RRF_K: int = 60  # RRF damping constant; higher flattens rank differences
+    HYBRID_CANDIDATE_MULTIPLIER: int = 4  # Each retriever returns search_limit * this before fusion
 
     # Ollama (Local LLM)
     OLLAMA_BASE_URL: str = "http://localhost:11434"
     OLLAMA_MODEL: str = "gemma3:4b"  # Your installed model
+    OLLAMA_MAX_CONNECTIONS: int = 4  # Concurrent generations sent to Ollama; the rest wait for a slot
+    OLLAMA_MAX_KEEPALIVE: int = 4  # Idle connections kept open between requests
+    OLLAMA_KEEPALIVE_SECONDS: float = 60  # Idle connection lifetime
+    OLLAMA_POOL_TIMEOUT_SECONDS: float = 30  # Max wait for a free connection before answering 503
+    OLLAMA_MAX_CONCURRENCY: int = 2  # Generations admitted at once per Ollama server (keep below OLLAMA_MAX_CONNECTIONS)
+    OLLAMA_QUEUE_INTERACTIVE: int = 32  # Waiting chat answers before new ones get 503
+    OLLAMA_QUEUE_SUMMARY: int = 8  # Waiting summaries before new ones get 503
+    OLLAMA_QUEUE_BACKGROUND: int = 64  # Waiting background jobs before new ones get 503
+    OLLAMA_RETRY_AFTER_SECONDS: int = 5  # Retry-After on 503 until generation times are known
+    LLM_CACHE_ENABLED: bool = True  # Reuse completions for byte-identical prompts
+    LLM_CACHE_MEMORY_ITEMS: int = 512  # In-memory LRU tier size
+    LLM_CACHE_PATH: str = ""  # SQLite file for the disk tier (empty = memory only)
+    LLM_CACHE_TTL_SECONDS: float = 86400  # Both tiers
 
     # JWT
     JWT_SECRET_KEY: str
@@ -1,11 +1,29 @@
 from supabase import create_client, Client
 from app.config import settings
 
+
+class _LazySupabaseClient:
+    """Creates the Supabase client on first use, so the embedded backend needs no Supabase config"""
+
+    def __init__(self):
+        self._client = None
+
+    def _get(self) -> Client:
+        if self._client is None:
+            if not settings.SUPABASE_URL or not settings.SUPABASE_SERVICE_ROLE_KEY:
+                raise RuntimeError("SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY must be set")
+            self._client = create_client(
+                settings.SUPABASE_URL,
+                settings.SUPABASE_SERVICE_ROLE_KEY
+            )
+        return self._client
+
+    def __getattr__(self, name):
+        return getattr(self._get(), name)
+
+
 # Initialize Supabase client with service role key (bypasses RLS)
-supabase: Client = create_client(
-    settings.SUPABASE_URL,
-    settings.SUPABASE_SERVICE_ROLE_KEY
-)
+supabase: Client = _LazySupabaseClient()
 
 async def test_connection():
     """Test Supabase connection"""
@@ -1,12 +1,38 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.config import settings
 from app.routes import documents, queries, notebooks
+from app.services.ingestion_queue import ingestion_queue
+from app.services.embedding_client import embedding_client
+from app.services.ollama_client import ollama_client
+from app.services.postgres_client import postgres_client
+from app.services.metadata_cache import metadata_cache
+from app.services.notebook_touch import notebook_touch_buffer
+from app.services.lexical_index import lexical_index
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Startup: Postgres pool (optional), background workers and the Ollama connection pool
+    await postgres_client.connect()
+    await ingestion_queue.start()
+    await notebook_touch_buffer.start()
+    await ollama_client.start()
+    yield
+    # Shutdown
+    await ingestion_queue.stop()
+    await notebook_touch_buffer.stop()
+    await postgres_client.close()
+    await ollama_client.close()
+    await embedding_client.close()
+
 
 app = FastAPI(
     title="DocuMind API",
     description="AI-powered document Q&A system",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS Configuration for Frontend
@@ -39,6 +65,18 @@ async def root():
         "health": "/health"
     }
 
+@app.get("/metrics")
+async def metrics():
+    """Runtime metrics (batching, caches, queues)"""
+    return {
+        "embedding": embedding_client.stats(),
+        "postgres_pool": postgres_client.stats(),
+        "metadata_cache": metadata_cache.stats(),
+        "notebook_touch": notebook_touch_buffer.stats(),
+        "lexical_index": lexical_index.stats(),
+        "ollama": ollama_client.stats()
+    }
+
 @app.get("/health")
 async def health():
     """Health check endpoint"""
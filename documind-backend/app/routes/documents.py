@@ -1,22 +1,33 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Header, Query
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Header, Query
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from uuid import uuid4
-from typing import Literal, Optional
-from app.services.pdf_processor import pdf_processor
-from app.services.embedding_client import embedding_client
-from app.services.supabase_vector import vector_store
-from app.services.ollama_client import ollama_client
-from app.database import supabase
+from typing import AsyncIterator, Dict, List, Literal, Optional
+import asyncio
+from app.services.vector_store import vector_store
+from app.services.lexical_index import lexical_index
+from app.services.response_cache import response_cache
+from app.services.document_loader import DocumentLoader, get_document_loader, get_summary_loader
+from app.services.ollama_client import ollama_client, OllamaBusy
+from app.services.llm_scheduler import Reservation
+from app.services.ingestion_queue import ingestion_queue, IngestionQueueFull
+from app.services.sse import sse_event, SSE_HEADERS
 
 router = APIRouter(prefix="/api/v1/documents", tags=["documents"])
 
 
-@router.post("/upload")
+@router.post("/upload", status_code=202)
 async def upload_document(
     file: UploadFile = File(...),
     notebook_id: Optional[str] = Query(None, description="Notebook ID to associate document with"),
     x_user_id: str = Header(..., description="User ID from frontend")
 ):
-    """Upload and process a document (PDF/TXT) with status management"""
+    """
+    Upload a document (PDF/TXT) and queue it for processing.
+
+    Returns 202 immediately with status=processing; poll
+    `GET /{document_id}/status` for extraction/embedding/storing progress.
+    """
     doc_id = str(uuid4())
 
     try:
@@ -29,6 +40,9 @@ async def upload_document(
         if not (is_pdf or is_txt):
             raise HTTPException(status_code=400, detail="Only PDF or TXT files are accepted")
 
+        if ingestion_queue.is_full():
+            raise HTTPException(status_code=503, detail="Too many documents are being processed. Please retry shortly.")
+
         # Store document metadata with status=processing
         doc_data = {
             "id": doc_id,
@@ -41,57 +55,25 @@ async def upload_document(
         if notebook_id:
             doc_data["notebook_id"] = notebook_id
 
-        supabase.table("documents").insert(doc_data).execute()
+        vector_store.create_document(doc_data)
 
+        # Extraction, embedding and storage happen in the background workers
         try:
-            # Extract chunks with location metadata
-            if is_txt:
-                try:
-                    text = content.decode("utf-8", errors="ignore")
-                except Exception:
-                    text = ""
-                chunks = pdf_processor.extract_text_chunks(text, file.filename)
-            else:
-                chunks = pdf_processor.extract_chunks(content, file.filename)
-
-            # Generate embeddings and store chunks (LOCAL - no rate limiting needed!)
-            for chunk in chunks:
-                try:
-                    embedding = embedding_client.embed_text(chunk['text'])
-                    vector_store.store_chunk(
-                        document_id=doc_id,
-                        chunk_text=chunk['text'],
-                        chunk_number=chunk['chunk_number'],
-                        page_number=chunk.get('page_number'),
-                        embedding=embedding,
-                        chunk_index=chunk.get('chunk_index'),
-                        line_start=chunk.get('line_start'),
-                        line_end=chunk.get('line_end')
-                    )
-                except Exception as e:
-                    print(f"[upload] Chunk embedding error: {str(e)}")
-                    import traceback
-                    traceback.print_exc()
-                    # Mark as failed and re-raise
-                    vector_store.update_document_status(doc_id, "failed")
-                    raise HTTPException(status_code=500, detail=str(e))
-
-            # Mark as ready after successful processing
-            vector_store.update_document_status(doc_id, "ready")
-
-            return {
-                "id": doc_id,
-                "filename": file.filename,
-                "chunks_count": len(chunks),
-                "status": "ready"
-            }
-
-        except HTTPException:
-            raise
-        except Exception as e:
-            # Mark document as failed
+            ingestion_queue.enqueue(doc_id, content, file.filename, is_pdf)
+        except IngestionQueueFull as e:
             vector_store.update_document_status(doc_id, "failed")
-            raise HTTPException(status_code=500, detail=str(e))
+            raise HTTPException(status_code=503, detail=str(e))
+        except Exception:
+            # No job will ever pick this row up
+            vector_store.update_document_status(doc_id, "failed")
+            raise
+
+        return {
+            "id": doc_id,
+            "filename": file.filename,
+            "chunks_count": 0,
+            "status": "processing"
+        }
 
     except HTTPException:
         raise
@@ -103,15 +85,11 @@ async def upload_document(
 async def list_documents(x_user_id: str = Header(...)):
     """List all documents for a user with status"""
     try:
-        response = supabase.table("documents").select(
-            "id, filename, file_size, status, short_summary, long_summary, created_at, updated_at"
-        ).eq(
-            "user_id", x_user_id
-        ).order("created_at", desc=True).execute()
+        documents = vector_store.list_documents(x_user_id)
 
         return {
-            "documents": response.data,
-            "total": len(response.data)
+            "documents": documents,
+            "total": len(documents)
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -124,14 +102,10 @@ async def get_document(
 ):
     """Get a single document's details including status and summaries"""
     try:
-        response = supabase.table("documents").select("*").eq(
-            "id", document_id
-        ).execute()
-
-        if not response.data:
+        doc = await vector_store.aget_document(document_id)
+        if not doc:
             raise HTTPException(status_code=404, detail="Document not found")
 
-        doc = response.data[0]
         if doc['user_id'] != x_user_id:
             raise HTTPException(status_code=403, detail="Unauthorized")
 
@@ -147,40 +121,132 @@ async def get_document_status(
     document_id: str,
     x_user_id: str = Header(...)
 ):
-    """Get document processing status"""
+    """Get document processing status (with stage and chunk progress while processing)"""
     try:
-        response = supabase.table("documents").select("id, status, filename").eq(
-            "id", document_id
-        ).execute()
-
-        if not response.data:
+        # Polled until ready: always read the row, never the metadata cache
+        doc = await vector_store.aget_document(document_id)
+        if not doc:
             raise HTTPException(status_code=404, detail="Document not found")
 
-        doc = response.data[0]
-        return {
+        result = {
             "id": doc['id'],
             "filename": doc['filename'],
             "status": doc['status'],
             "ready": doc['status'] == "ready"
         }
+
+        # Live progress while the background job is running
+        progress = ingestion_queue.get_progress(document_id)
+        if progress:
+            result.update(progress)
+
+        return result
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def prepare_summary(
+    document_id: str,
+    mode: Literal["short", "long"],
+    save: bool,
+    x_user_id: str,
+    loader: DocumentLoader
+) -> Dict:
+    """
+    Access checks, stored-summary lookup and summarization input shared by
+    the blocking and streaming summary modes. Returns `cached` (the stored
+    summary, or None) or the `doc`, `content` and `sources` to summarize.
+    """
+    # Check document exists and user has access
+    doc = await loader.load(document_id)
+    if not doc:
+        raise HTTPException(status_code=404, detail="Document not found")
+
+    if doc['user_id'] != x_user_id:
+        raise HTTPException(status_code=403, detail="Unauthorized")
+
+    if doc['status'] != "ready":
+        raise HTTPException(
+            status_code=400,
+            detail=f"Document is not ready. Current status: {doc['status']}"
+        )
+
+    # Check if we already have this summary cached
+    cached_summary = doc.get('short_summary') if mode == "short" else doc.get('long_summary')
+    if cached_summary and not save:  # Return cached if exists and not forcing regeneration
+        print(f"[summary] Returning cached {mode} summary for doc {document_id[:8]}")
+        return {"cached": cached_summary}
+
+    # Get all chunks for the document
+    chunks = await vector_store.get_document_chunks(document_id)
+
+    if not chunks:
+        raise HTTPException(status_code=400, detail="No content found for this document")
+
+    # Build content from chunks (limit to avoid token overflow)
+    max_content_length = 32000  # ~8k tokens
+    content_parts = []
+    total_length = 0
+
+    for chunk in chunks:
+        chunk_text = chunk['chunk_text']
+        if total_length + len(chunk_text) > max_content_length:
+            break
+        content_parts.append(chunk_text)
+        total_length += len(chunk_text)
+
+    content = "\n\n".join(content_parts)
+
+    # Prepare sources (chunks used for summarization)
+    sources = [
+        {
+            "document_id": document_id,
+            "chunk_id": str(chunk['id']),
+            "chunk_index": chunk.get('chunk_index', chunk['chunk_number']),
+            "page": chunk.get('page_number'),
+            "line_start": chunk.get('line_start'),
+            "line_end": chunk.get('line_end')
+        }
+        for chunk in chunks[:len(content_parts)]
+    ]
+
+    return {"cached": None, "doc": doc, "content": content, "sources": sources}
+
+
+def save_summary(document_id: str, mode: Literal["short", "long"], summary: str) -> bool:
+    """Persist a finished summary; failures are logged, not raised"""
+    try:
+        if mode == "short":
+            vector_store.save_document_summary(document_id, short_summary=summary)
+        else:
+            vector_store.save_document_summary(document_id, long_summary=summary)
+        return True
+    except Exception as e:
+        print(f"[summary] Failed to save summary: {str(e)}")
+        # Don't fail the request, just log
+        return False
+
+
 @router.post("/{document_id}/summary")
 async def generate_document_summary(
     document_id: str,
     mode: Literal["short", "long"] = Query("short", description="Summary mode: short or long"),
     save: bool = Query(False, description="Save summary to database"),
-    x_user_id: str = Header(...)
+    stream: bool = Query(False, description="Stream the summary as Server-Sent Events"),
+    x_user_id: str = Header(...),
+    loader: DocumentLoader = Depends(get_summary_loader)
 ):
     """
     Generate a summary for a document.
 
     - **mode**: "short" for 1-2 paragraphs + 5 bullet points, "long" for detailed summary with sections
     - **save**: If true, saves the summary to the document record
+    - **stream**: If true, respond with Server-Sent Events: `sources`, then
+      `token` events, then `done` (full summary, cached, saved) or `error`.
+      With save=true the summary is stored only after the stream completes,
+      so an abandoned or failed stream never leaves a partial summary.
 
     Returns:
     - summary: The generated summary text
@@ -188,105 +254,113 @@ async def generate_document_summary(
     - sources: List of chunks used to generate the summary
     """
     try:
-        # Check document exists and user has access
-        doc = vector_store.get_document(document_id)
-        if not doc:
-            raise HTTPException(status_code=404, detail="Document not found")
-
-        if doc['user_id'] != x_user_id:
-            raise HTTPException(status_code=403, detail="Unauthorized")
-
-        if doc['status'] != "ready":
-            raise HTTPException(
-                status_code=400,
-                detail=f"Document is not ready. Current status: {doc['status']}"
+        prepared = await prepare_summary(document_id, mode, save, x_user_id, loader)
+
+        if stream:
+            # Admission is decided before the 200 goes out: a full queue is a 503
+            reservation = None if prepared["cached"] else ollama_client.reserve("summary")
+            return StreamingResponse(
+                stream_summary_events(document_id, mode, save, prepared, reservation),
+                media_type="text/event-stream",
+                headers=SSE_HEADERS,
+                # Gives the place back if the body never started
+                background=BackgroundTask(reservation.cancel) if reservation else None
             )
 
-        # Check if we already have this summary cached
-        cached_summary = doc.get('short_summary') if mode == "short" else doc.get('long_summary')
-        if cached_summary and not save:  # Return cached if exists and not forcing regeneration
-            print(f"[summary] Returning cached {mode} summary for doc {document_id[:8]}")
+        if prepared["cached"]:
             return {
                 "mode": mode,
-                "summary": cached_summary,
+                "summary": prepared["cached"],
                 "sources": [],  # Cached summary doesn't have sources
                 "cached": True
             }
 
-        # Get all chunks for the document
-        chunks = await vector_store.get_document_chunks(document_id)
-
-        if not chunks:
-            raise HTTPException(status_code=400, detail="No content found for this document")
-
-        # Build content from chunks (limit to avoid token overflow)
-        max_content_length = 32000  # ~8k tokens
-        content_parts = []
-        total_length = 0
-
-        for chunk in chunks:
-            chunk_text = chunk['chunk_text']
-            if total_length + len(chunk_text) > max_content_length:
-                break
-            content_parts.append(chunk_text)
-            total_length += len(chunk_text)
-
-        content = "\n\n".join(content_parts)
-
         # Generate summary using Ollama
         summary = await ollama_client.generate_summary(
-            content=content,
+            content=prepared["content"],
             mode=mode,
-            document_name=doc['filename']
+            document_name=prepared["doc"]['filename'],
+            document_id=document_id
         )
 
-        # Prepare sources (chunks used for summarization)
-        sources = [
-            {
-                "document_id": document_id,
-                "chunk_id": str(chunk['id']),
-                "chunk_index": chunk.get('chunk_index', chunk['chunk_number']),
-                "page": chunk.get('page_number'),
-                "line_start": chunk.get('line_start'),
-                "line_end": chunk.get('line_end')
-            }
-            for chunk in chunks[:len(content_parts)]
-        ]
-
         # Save summary if requested
         if save:
-            try:
-                if mode == "short":
-                    vector_store.save_document_summary(document_id, short_summary=summary)
-                else:
-                    vector_store.save_document_summary(document_id, long_summary=summary)
-            except Exception as e:
-                print(f"[summary] Failed to save summary: {str(e)}")
-                # Don't fail the request, just log
+            save_summary(document_id, mode, summary)
 
         return {
             "mode": mode,
             "summary": summary,
-            "sources": sources,
+            "sources": prepared["sources"],
             "cached": False
         }
 
     except HTTPException:
         raise
+    except OllamaBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
     except Exception as e:
         print(f"[summary] Error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def stream_summary_events(
+    document_id: str,
+    mode: Literal["short", "long"],
+    save: bool,
+    prepared: Dict,
+    reservation: Optional[Reservation] = None
+) -> AsyncIterator[str]:
+    """SSE body for the streaming summary mode"""
+    if prepared["cached"]:
+        yield sse_event("sources", {"mode": mode, "sources": []})
+        yield sse_event("token", {"text": prepared["cached"]})
+        yield sse_event("done", {"mode": mode, "summary": prepared["cached"], "cached": True, "saved": False})
+        return
+
+    parts: List[str] = []
+    try:
+        yield sse_event("sources", {"mode": mode, "sources": prepared["sources"]})
+        async for text in ollama_client.stream_summary(
+            content=prepared["content"],
+            mode=mode,
+            document_name=prepared["doc"]['filename'],
+            document_id=document_id,
+            reservation=reservation
+        ):
+            parts.append(text)
+            yield sse_event("token", {"text": text})
+    except Exception as e:
+        print(f"[summary] Stream error: {str(e)}")
+        yield sse_event("error", {
+            "detail": str(e),
+            "busy": isinstance(e, OllamaBusy),
+            "retry_after": getattr(e, "retry_after", None)
+        })
+        return
+    finally:
+        # A client that leaves before the generation claims the place gives it back here
+        if reservation:
+            reservation.cancel()
+
+    # Only a completed stream gets here: cancelled generators never save
+    summary = "".join(parts).strip()
+    saved = False
+    if save:
+        saved = await asyncio.to_thread(save_summary, document_id, mode, summary)
+    print(f"[summary] Stream finished for doc {document_id[:8]}: {len(summary)} chars")
+    yield sse_event("done", {"mode": mode, "summary": summary, "cached": False, "saved": saved})
+
+
 @router.get("/{document_id}/chunks")
 async def get_document_chunks(
     document_id: str,
-    x_user_id: str = Header(...)
+    x_user_id: str = Header(...),
+    loader: DocumentLoader = Depends(get_document_loader)
 ):
     """Get all chunks for a document (for viewing sources)"""
     try:
         # Check document exists and user has access
-        doc = vector_store.get_document(document_id)
+        doc = await loader.load(document_id)
         if not doc:
             raise HTTPException(status_code=404, detail="Document not found")
 
@@ -311,26 +385,23 @@ async def get_document_chunks(
 async def get_single_chunk(
     document_id: str,
     chunk_id: str,
-    x_user_id: str = Header(...)
+    x_user_id: str = Header(...),
+    loader: DocumentLoader = Depends(get_document_loader)
 ):
     """Get a single chunk by ID (for source preview)"""
     try:
         # Check document exists and user has access
-        doc = vector_store.get_document(document_id)
+        doc = await loader.load(document_id)
         if not doc:
             raise HTTPException(status_code=404, detail="Document not found")
 
         if doc['user_id'] != x_user_id:
             raise HTTPException(status_code=403, detail="Unauthorized")
 
-        response = supabase.table("document_chunks").select(
-            "id, chunk_text, chunk_number, chunk_index, page_number, line_start, line_end"
-        ).eq("id", chunk_id).eq("document_id", document_id).execute()
-
-        if not response.data:
+        chunk = vector_store.get_chunk(document_id, chunk_id)
+        if not chunk:
             raise HTTPException(status_code=404, detail="Chunk not found")
 
-        chunk = response.data[0]
         return {
             "document_id": document_id,
             "filename": doc['filename'],
@@ -342,6 +413,13 @@ async def get_single_chunk(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def discard_document(document_id: str) -> None:
+    """Delete a document (chunks cascade) and everything derived from it: indexes and cached answers"""
+    vector_store.delete_document(document_id)
+    lexical_index.remove_document(document_id)
+    response_cache.invalidate_document(document_id)
+
+
 @router.delete("/{document_id}")
 async def delete_document(
     document_id: str,
@@ -349,16 +427,12 @@ async def delete_document(
 ):
     """Delete a document and its chunks"""
     try:
-        doc = supabase.table("documents").select("user_id").eq(
-            "id", document_id
-        ).execute()
+        doc = await vector_store.aget_document(document_id)
 
-        if not doc.data or doc.data[0]['user_id'] != x_user_id:
+        if not doc or doc['user_id'] != x_user_id:
             raise HTTPException(status_code=403, detail="Unauthorized")
 
-        supabase.table("documents").delete().eq(
-            "id", document_id
-        ).execute()
+        discard_document(document_id)
 
         return {"status": "deleted", "id": document_id}
     except HTTPException:
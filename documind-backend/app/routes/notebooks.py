@@ -1,8 +1,19 @@
-from fastapi import APIRouter, HTTPException, Header
+from fastapi import APIRouter, HTTPException, Header, Query
 from pydantic import BaseModel
-from typing import Optional, List, Literal
-from uuid import uuid4
+from typing import Optional, List, Literal, Tuple
+from collections import Counter
+from datetime import datetime
+import asyncio
+import base64
+from uuid import UUID, uuid4
+from app.config import settings
 from app.database import supabase
+from app.services.postgres_client import postgres_client
+from app.services.metadata_cache import metadata_cache
+from app.services.notebook_touch import notebook_touch_buffer
+from app.services.document_loader import DocumentLoader
+from app.services.vector_store import vector_store
+from app.routes.documents import discard_document
 
 router = APIRouter(prefix="/api/v1/notebooks", tags=["notebooks"])
 
@@ -36,6 +47,54 @@ class SaveMessageRequest(BaseModel):
     sources: Optional[List[MessageSource]] = None
 
 
+class SaveMessagesRequest(BaseModel):
+    messages: List[SaveMessageRequest]
+
+
+# ============================================
+# OWNERSHIP
+# ============================================
+
+async def get_notebook_owner(notebook_id: str) -> Optional[str]:
+    """Notebook owner from the metadata cache, else the pool or Supabase REST"""
+    try:
+        UUID(notebook_id)
+    except ValueError:
+        # Not an id we ever issued; the uuid cast would fail in Postgres
+        return None
+
+    owner = metadata_cache.get_notebook_owner(notebook_id)
+    if owner is not None:
+        return owner
+
+    owner = None
+    pooled = False
+    if postgres_client.available:
+        try:
+            owner = await postgres_client.get_notebook_owner(notebook_id)
+            pooled = True
+        except Exception as e:
+            print(f"[notebooks] Pool owner lookup failed, using REST: {str(e)}")
+    if not pooled:
+        response = await asyncio.to_thread(
+            lambda: supabase.table("notebooks").select("user_id").eq("id", notebook_id).execute()
+        )
+        owner = response.data[0]['user_id'] if response.data else None
+
+    if owner is not None:
+        metadata_cache.set_notebook_owner(notebook_id, owner)
+    return owner
+
+
+async def check_notebook_owner(notebook_id: str, x_user_id: str) -> None:
+    """404 if the notebook does not exist, 403 if it belongs to someone else"""
+    owner = await get_notebook_owner(notebook_id)
+    if owner is None:
+        raise HTTPException(status_code=404, detail="Notebook not found")
+    if owner != x_user_id:
+        raise HTTPException(status_code=403, detail="Unauthorized")
+
+
 # ============================================
 # NOTEBOOK CRUD
 # ============================================
@@ -64,30 +123,114 @@ async def create_notebook(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def encode_cursor(timestamp: str, row_id: str) -> str:
+    """Opaque keyset cursor for a (timestamp, id) sort position"""
+    raw = f"{timestamp}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    try:
+        timestamp, row_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        datetime.fromisoformat(timestamp)
+        return timestamp, row_id
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def list_notebooks_fallback(
+    user_id: str,
+    limit: Optional[int],
+    cursor: Optional[Tuple[str, str]]
+) -> List[dict]:
+    """Two queries (page of notebooks + one grouped count) when the RPC is missing"""
+    query = supabase.table("notebooks").select(
+        "id, title, accent, created_at, updated_at"
+    ).eq("user_id", user_id)
+    if cursor:
+        created_at, notebook_id = cursor
+        query = query.or_(
+            f"created_at.lt.{created_at},and(created_at.eq.{created_at},id.lt.{notebook_id})"
+        )
+    query = query.order("created_at", desc=True).order("id", desc=True)
+    if limit:
+        query = query.limit(limit)
+    notebooks = query.execute().data or []
+
+    docs = []
+    if notebooks:
+        docs = supabase.table("documents").select("notebook_id, updated_at").in_(
+            "notebook_id", [n["id"] for n in notebooks]
+        ).execute().data or []
+
+    counts = Counter(d["notebook_id"] for d in docs)
+    last_activity = {}
+    for doc in docs:
+        if doc.get("updated_at"):
+            last_activity[doc["notebook_id"]] = max(last_activity.get(doc["notebook_id"], ""), doc["updated_at"])
+
+    for notebook in notebooks:
+        notebook["document_count"] = counts.get(notebook["id"], 0)
+        notebook["last_activity_at"] = max(notebook.get("updated_at") or "", last_activity.get(notebook["id"], "")) or None
+    return notebooks
+
+
 @router.get("/")
-async def list_notebooks(x_user_id: str = Header(...)):
-    """List all notebooks for a user with document counts"""
+async def list_notebooks(
+    x_user_id: str = Header(...),
+    limit: Optional[int] = Query(None, ge=1, le=200, description="Page size (default: all notebooks)"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page")
+):
+    """
+    List notebooks for a user with document counts, newest first.
+
+    Counts (and last_activity_at) come from one aggregated query
+    (list_notebooks_with_counts, migration 002). Pass `limit` to page with
+    keyset cursors; `next_cursor` is null on the last page. Pages are keyed
+    on (created_at, id), which never change, so a notebook touched while a
+    client is paging is neither skipped nor repeated.
+    """
     try:
-        # Get notebooks
-        notebooks_response = supabase.table("notebooks").select(
-            "id, title, accent, created_at, updated_at"
-        ).eq(
-            "user_id", x_user_id
-        ).order("updated_at", desc=True).execute()
+        keyset = decode_cursor(cursor) if cursor else None
+        # One extra row tells us whether another page exists
+        fetch_limit = limit + 1 if limit else None
+        params = {
+            "p_user_id": x_user_id,
+            "p_limit": fetch_limit,
+            "p_cursor_created_at": keyset[0] if keyset else None,
+            "p_cursor_id": keyset[1] if keyset else None
+        }
 
-        notebooks = notebooks_response.data or []
+        try:
+            if postgres_client.available:
+                notebooks = await postgres_client.list_notebooks_with_counts(
+                    x_user_id, fetch_limit, params["p_cursor_created_at"], params["p_cursor_id"]
+                )
+            else:
+                response = await asyncio.to_thread(
+                    lambda: supabase.rpc("list_notebooks_with_counts", params).execute()
+                )
+                notebooks = response.data or []
+        except Exception as e:
+            print(f"[notebooks] Count RPC unavailable, using fallback: {str(e)}")
+            notebooks = await asyncio.to_thread(list_notebooks_fallback, x_user_id, fetch_limit, keyset)
+
+        next_cursor = None
+        if limit and len(notebooks) > limit:
+            notebooks = notebooks[:limit]
+            next_cursor = encode_cursor(notebooks[-1]["created_at"], notebooks[-1]["id"])
 
-        # Get document counts for each notebook
         for notebook in notebooks:
-            docs_response = supabase.table("documents").select(
-                "id", count="exact"
-            ).eq("notebook_id", notebook["id"]).execute()
-            notebook["document_count"] = docs_response.count or 0
+            notebook.setdefault("user_id", x_user_id)
+            metadata_cache.set_notebook_owner(notebook["id"], x_user_id)
 
         return {
             "notebooks": notebooks,
-            "total": len(notebooks)
+            "total": len(notebooks),
+            "next_cursor": next_cursor
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -108,6 +251,7 @@ async def get_notebook(
             raise HTTPException(status_code=404, detail="Notebook not found")
 
         notebook = notebook_response.data[0]
+        metadata_cache.set_notebook_owner(notebook_id, notebook['user_id'])
 
         if notebook['user_id'] != x_user_id:
             raise HTTPException(status_code=403, detail="Unauthorized")
@@ -134,16 +278,8 @@ async def update_notebook(
 ):
     """Update notebook title or accent"""
     try:
-        # Check ownership
-        notebook_response = supabase.table("notebooks").select("user_id").eq(
-            "id", notebook_id
-        ).execute()
-
-        if not notebook_response.data:
-            raise HTTPException(status_code=404, detail="Notebook not found")
-
-        if notebook_response.data[0]['user_id'] != x_user_id:
-            raise HTTPException(status_code=403, detail="Unauthorized")
+        # Check notebook ownership (cached)
+        await check_notebook_owner(notebook_id, x_user_id)
 
         # Build update data
         update_data = {}
@@ -159,6 +295,7 @@ async def update_notebook(
         response = supabase.table("notebooks").update(update_data).eq(
             "id", notebook_id
         ).execute()
+        metadata_cache.invalidate_notebook(notebook_id)
 
         return response.data[0]
     except HTTPException:
@@ -174,19 +311,20 @@ async def delete_notebook(
 ):
     """Delete a notebook and all its documents and messages"""
     try:
-        # Check ownership
-        notebook_response = supabase.table("notebooks").select("user_id").eq(
-            "id", notebook_id
-        ).execute()
-
-        if not notebook_response.data:
-            raise HTTPException(status_code=404, detail="Notebook not found")
-
-        if notebook_response.data[0]['user_id'] != x_user_id:
-            raise HTTPException(status_code=403, detail="Unauthorized")
+        # Check notebook ownership (cached)
+        await check_notebook_owner(notebook_id, x_user_id)
+        docs = await asyncio.to_thread(vector_store.list_notebook_documents, notebook_id)
 
         # Delete notebook (CASCADE will delete documents and messages)
         supabase.table("notebooks").delete().eq("id", notebook_id).execute()
+        metadata_cache.invalidate_notebook(notebook_id)
+
+        # The cascade does not reach local indexes, cached answers or an embedded store
+        for doc in docs:
+            try:
+                await asyncio.to_thread(discard_document, doc['id'])
+            except Exception as e:
+                print(f"[notebooks] Cleanup failed for doc {doc['id'][:8]}: {str(e)}")
 
         return {"status": "deleted", "id": notebook_id}
     except HTTPException:
@@ -207,32 +345,22 @@ async def add_document_to_notebook(
 ):
     """Associate an existing document with a notebook"""
     try:
-        # Check notebook ownership
-        notebook_response = supabase.table("notebooks").select("user_id").eq(
-            "id", notebook_id
-        ).execute()
-
-        if not notebook_response.data:
-            raise HTTPException(status_code=404, detail="Notebook not found")
-
-        if notebook_response.data[0]['user_id'] != x_user_id:
-            raise HTTPException(status_code=403, detail="Unauthorized")
+        # Check notebook ownership (cached)
+        await check_notebook_owner(notebook_id, x_user_id)
 
-        # Check document ownership
-        doc_response = supabase.table("documents").select("user_id").eq(
-            "id", document_id
-        ).execute()
-
-        if not doc_response.data:
+        # Check document ownership (cached)
+        doc = await DocumentLoader().load(document_id)
+        if not doc:
             raise HTTPException(status_code=404, detail="Document not found")
 
-        if doc_response.data[0]['user_id'] != x_user_id:
+        if doc['user_id'] != x_user_id:
             raise HTTPException(status_code=403, detail="Unauthorized")
 
         # Update document's notebook_id
         supabase.table("documents").update({
             "notebook_id": notebook_id
         }).eq("id", document_id).execute()
+        metadata_cache.invalidate_document(document_id)
 
         return {"status": "linked", "notebook_id": notebook_id, "document_id": document_id}
     except HTTPException:
@@ -249,21 +377,14 @@ async def remove_document_from_notebook(
 ):
     """Remove a document from a notebook (doesn't delete the document)"""
     try:
-        # Check notebook ownership
-        notebook_response = supabase.table("notebooks").select("user_id").eq(
-            "id", notebook_id
-        ).execute()
-
-        if not notebook_response.data:
-            raise HTTPException(status_code=404, detail="Notebook not found")
-
-        if notebook_response.data[0]['user_id'] != x_user_id:
-            raise HTTPException(status_code=403, detail="Unauthorized")
+        # Check notebook ownership (cached)
+        await check_notebook_owner(notebook_id, x_user_id)
 
         # Remove notebook_id from document
         supabase.table("documents").update({
             "notebook_id": None
         }).eq("id", document_id).eq("notebook_id", notebook_id).execute()
+        metadata_cache.invalidate_document(document_id)
 
         return {"status": "unlinked", "document_id": document_id}
     except HTTPException:
@@ -276,35 +397,98 @@ async def remove_document_from_notebook(
 # CHAT MESSAGES
 # ============================================
 
+def list_messages_rest(
+    notebook_id: str,
+    limit: int,
+    before: Optional[Tuple[str, str]] = None,
+    after: Optional[Tuple[str, str]] = None,
+    since: Optional[str] = None
+) -> List[dict]:
+    """PostgREST version of postgres_client.list_messages (oldest first)"""
+    query = supabase.table("chat_messages").select(
+        "id, role, content, sources, created_at"
+    ).eq("notebook_id", notebook_id)
+    forward = bool(after or since)
+    if after:
+        created_at, message_id = after
+        query = query.or_(f"created_at.gt.{created_at},and(created_at.eq.{created_at},id.gt.{message_id})")
+    elif since:
+        query = query.gt("created_at", since)
+    elif before:
+        created_at, message_id = before
+        query = query.or_(f"created_at.lt.{created_at},and(created_at.eq.{created_at},id.lt.{message_id})")
+    messages = query.order(
+        "created_at", desc=not forward
+    ).order("id", desc=not forward).limit(limit).execute().data or []
+    return messages if forward else list(reversed(messages))
+
+
 @router.get("/{notebook_id}/messages")
 async def get_notebook_messages(
     notebook_id: str,
-    limit: int = 100,
+    limit: int = Query(100, ge=1, le=500),
+    before: Optional[str] = Query(None, description="Page backwards: next_before of the previous page"),
+    after: Optional[str] = Query(None, description="Only messages after this cursor (sync_cursor)"),
+    since: Optional[str] = Query(None, description="Only messages created after this ISO timestamp"),
     x_user_id: str = Header(...)
 ):
-    """Get chat messages for a notebook"""
+    """
+    Get chat messages for a notebook, oldest first.
+
+    Without parameters the newest `limit` messages are returned; pass
+    `next_before` as `before` to load older ones. For incremental sync pass
+    the last `sync_cursor` as `after` (or a timestamp as `since`) to get only
+    messages added since then; `has_more` means another forward page exists.
+    """
     try:
-        # Check notebook ownership
-        notebook_response = supabase.table("notebooks").select("user_id").eq(
-            "id", notebook_id
-        ).execute()
-
-        if not notebook_response.data:
-            raise HTTPException(status_code=404, detail="Notebook not found")
-
-        if notebook_response.data[0]['user_id'] != x_user_id:
-            raise HTTPException(status_code=403, detail="Unauthorized")
-
-        # Get messages
-        messages_response = supabase.table("chat_messages").select(
-            "id, role, content, sources, created_at"
-        ).eq(
-            "notebook_id", notebook_id
-        ).order("created_at", desc=False).limit(limit).execute()
+        if before and (after or since):
+            raise HTTPException(status_code=400, detail="Use either before or after/since, not both")
+        if since:
+            try:
+                datetime.fromisoformat(since)
+            except ValueError:
+                raise HTTPException(status_code=400, detail="since must be an ISO timestamp")
+        before_key = decode_cursor(before) if before else None
+        after_key = decode_cursor(after) if after else None
+
+        # Check notebook ownership (cached)
+        await check_notebook_owner(notebook_id, x_user_id)
+
+        # One extra row tells us whether another page exists
+        messages = None
+        if postgres_client.available:
+            # Pooled fast path: no PostgREST round trips on the event loop
+            try:
+                messages = await postgres_client.list_messages(
+                    notebook_id, limit + 1, before=before_key, after=after_key, since=since
+                )
+            except Exception as e:
+                print(f"[notebooks] Pool message query failed, using REST: {str(e)}")
+        if messages is None:
+            messages = await asyncio.to_thread(
+                list_messages_rest, notebook_id, limit + 1, before_key, after_key, since
+            )
+
+        forward = bool(after or since)
+        has_more = len(messages) > limit
+        if has_more:
+            # Drop the extra row from the far end of the page
+            messages = messages[:limit] if forward else messages[1:]
+
+        if messages:
+            sync_cursor = encode_cursor(messages[-1]["created_at"], messages[-1]["id"])
+        else:
+            sync_cursor = after
+        next_before = None
+        if messages and not forward and has_more:
+            next_before = encode_cursor(messages[0]["created_at"], messages[0]["id"])
 
         return {
-            "messages": messages_response.data or [],
-            "total": len(messages_response.data or [])
+            "messages": messages,
+            "total": len(messages),
+            "has_more": has_more,
+            "next_before": next_before,
+            "sync_cursor": sync_cursor
         }
     except HTTPException:
         raise
@@ -312,6 +496,35 @@ async def get_notebook_messages(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def build_message_row(notebook_id: str, message: SaveMessageRequest, message_id: Optional[str] = None) -> dict:
+    return {
+        "id": message_id or str(uuid4()),
+        "notebook_id": notebook_id,
+        "role": message.role,
+        "content": message.content,
+        # Always present: PostgREST bulk inserts need the same keys on every row
+        "sources": [s.model_dump() for s in message.sources] if message.sources else None
+    }
+
+
+async def insert_messages(rows: List[dict]) -> List[dict]:
+    """One insert for all rows; the notebook touch is buffered (write-behind)"""
+    saved = None
+    if postgres_client.available:
+        try:
+            saved = await postgres_client.insert_messages(rows)
+        except Exception as e:
+            # Row ids are fixed, so a retry can never duplicate messages
+            print(f"[notebooks] Pool message insert failed, using REST: {str(e)}")
+    if saved is None:
+        response = await asyncio.to_thread(
+            lambda: supabase.table("chat_messages").insert(rows).execute()
+        )
+        saved = response.data or []
+    await notebook_touch_buffer.touch(rows[0]["notebook_id"])
+    return saved
+
+
 @router.post("/{notebook_id}/messages")
 async def save_message(
     notebook_id: str,
@@ -320,38 +533,51 @@ async def save_message(
 ):
     """Save a chat message to a notebook"""
     try:
-        # Check notebook ownership
-        notebook_response = supabase.table("notebooks").select("user_id").eq(
-            "id", notebook_id
-        ).execute()
-
-        if not notebook_response.data:
-            raise HTTPException(status_code=404, detail="Notebook not found")
+        # Check notebook ownership (cached)
+        await check_notebook_owner(notebook_id, x_user_id)
 
-        if notebook_response.data[0]['user_id'] != x_user_id:
-            raise HTTPException(status_code=403, detail="Unauthorized")
+        saved = await insert_messages([build_message_row(notebook_id, request)])
+        return saved[0]
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-        message_id = str(uuid4())
 
-        # Insert message
-        message_data = {
-            "id": message_id,
-            "notebook_id": notebook_id,
-            "role": request.role,
-            "content": request.content
+@router.post("/{notebook_id}/messages/batch")
+async def save_messages(
+    notebook_id: str,
+    request: SaveMessagesRequest,
+    x_user_id: str = Header(...)
+):
+    """
+    Save several chat messages (e.g. a user question and its answer) with
+    one insert. Messages keep their order: the database assigns created_at
+    microseconds apart in list order, and ids ascend too so the (created_at,
+    id) keyset order holds even where all rows share one timestamp (REST).
+    """
+    try:
+        if not request.messages:
+            raise HTTPException(status_code=400, detail="messages must not be empty")
+        if len(request.messages) > settings.MESSAGE_BATCH_MAX:
+            raise HTTPException(
+                status_code=400,
+                detail=f"At most {settings.MESSAGE_BATCH_MAX} messages per batch"
+            )
+
+        # Check notebook ownership (cached)
+        await check_notebook_owner(notebook_id, x_user_id)
+
+        message_ids = sorted(str(uuid4()) for _ in request.messages)
+        rows = [
+            build_message_row(notebook_id, message, message_id)
+            for message, message_id in zip(request.messages, message_ids)
+        ]
+        saved = await insert_messages(rows)
+        return {
+            "messages": saved,
+            "total": len(saved)
         }
-
-        if request.sources:
-            message_data["sources"] = [s.model_dump() for s in request.sources]
-
-        response = supabase.table("chat_messages").insert(message_data).execute()
-
-        # Update notebook's updated_at
-        supabase.table("notebooks").update({
-            "updated_at": "now()"
-        }).eq("id", notebook_id).execute()
-
-        return response.data[0]
     except HTTPException:
         raise
     except Exception as e:
@@ -365,16 +591,8 @@ async def clear_messages(
 ):
     """Clear all messages in a notebook"""
     try:
-        # Check notebook ownership
-        notebook_response = supabase.table("notebooks").select("user_id").eq(
-            "id", notebook_id
-        ).execute()
-
-        if not notebook_response.data:
-            raise HTTPException(status_code=404, detail="Notebook not found")
-
-        if notebook_response.data[0]['user_id'] != x_user_id:
-            raise HTTPException(status_code=403, detail="Unauthorized")
+        # Check notebook ownership (cached)
+        await check_notebook_owner(notebook_id, x_user_id)
 
         # Delete all messages
         supabase.table("chat_messages").delete().eq("notebook_id", notebook_id).execute()
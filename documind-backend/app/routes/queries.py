@@ -1,11 +1,18 @@
-from fastapi import APIRouter, HTTPException, Header, Query
+from fastapi import APIRouter, Depends, HTTPException, Header, Query
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
 from uuid import uuid4
-from typing import Optional, List
+from typing import AsyncIterator, Dict, Literal, Optional, List
+import asyncio
+import time
 from app.services.embedding_client import embedding_client
-from app.services.ollama_client import ollama_client
-from app.services.supabase_vector import vector_store
-from app.database import supabase
+from app.services.ollama_client import ollama_client, OllamaBusy
+from app.services.vector_store import vector_store
+from app.services.document_loader import DocumentLoader, get_document_loader
+from app.services.retrieval import hybrid_search, keyword_search as indexed_keyword_search
+from app.services.sse import sse_event, SSE_HEADERS
+from app.routes.notebooks import check_notebook_owner
 
 router = APIRouter(prefix="/api/v1", tags=["queries"])
 
@@ -14,18 +21,121 @@ class QueryRequest(BaseModel):
     question: str
     document_ids: list[str]
     search_limit: int = 5
+    retrieval_mode: Literal["vector", "hybrid"] = "vector"
 
 
 class KeywordSearchRequest(BaseModel):
     query: str
-    document_id: str
+    document_id: Optional[str] = None
+    document_ids: Optional[List[str]] = None
+    notebook_id: Optional[str] = None
     limit: int = 10
+    offset: int = 0
+
+
+NO_RESULTS_ANSWER = "Sağlanan belgelerde bu soruya cevap verebilecek bilgi bulunamadı."
+
+
+async def prepare_query(req: QueryRequest, loader: DocumentLoader) -> Dict:
+    """
+    Readiness check, retrieval and prompt context shared by /query and
+    /query/stream. Returns context, sources_hint and the formatted sources
+    (empty when nothing relevant was found).
+    """
+    # Check if all documents are ready (one batched lookup; titles are kept for sources)
+    docs = await loader.load_many(req.document_ids)
+    doc_titles = {}
+    for doc_id, doc in docs.items():
+        if not doc:
+            raise HTTPException(status_code=404, detail=f"Document {doc_id} not found")
+        if doc['status'] != 'ready':
+            raise HTTPException(
+                status_code=400,
+                detail=f"Document '{doc['filename']}' is still processing. Please wait."
+            )
+        doc_titles[doc_id] = doc['filename']
+
+    # Generate embedding for the question (LOCAL - fast!)
+    question_embedding = await embedding_client.aembed_query(req.question)
+    print(f"[query] Embedding generated, length: {len(question_embedding)}")
+
+    # Search for similar chunks (hybrid = vector + BM25 fused with RRF)
+    if req.retrieval_mode == "hybrid":
+        search_results = await hybrid_search(
+            question=req.question,
+            query_embedding=question_embedding,
+            document_ids=req.document_ids,
+            limit=req.search_limit
+        )
+    else:
+        search_results = await vector_store.vector_search(
+            query_embedding=question_embedding,
+            document_ids=req.document_ids,
+            limit=req.search_limit
+        )
+
+    if not search_results:
+        return {"context": "", "sources_hint": "", "sources": [], "document_ids": []}
+
+    # Build context from search results with location info
+    context_parts = []
+    sources_hint_parts = []
+
+    for r in search_results:
+        doc_title = doc_titles.get(r['document_id'], 'Belge')
+        location_info = ""
+
+        page_num = r.get('page_number')
+        if page_num is not None and page_num > 0:
+            location_info = f"Sayfa {page_num}"
+        elif r.get('line_start') is not None:
+            location_info = f"Satır {r['line_start']}-{r['line_end']}"
+        else:
+            location_info = f"Bölüm {r.get('chunk_index', r.get('chunk_number', 0))}"
+
+        # Context'e belge adını da ekle
+        context_parts.append(f"[Kaynak: {doc_title}, {location_info}]\n{r['chunk_text']}")
+
+        # Sources hint for the prompt
+        sources_hint_parts.append(f"• {doc_title} - {location_info}")
+
+    context = "\n\n".join(context_parts)
+    sources_hint = "\n".join(sources_hint_parts)
+
+    print(f"[query] Context built, length: {len(context)} chars")
+
+    # Format detailed sources with previews
+    sources = []
+    for r in search_results:
+        chunk_text = r.get('chunk_text', '')
+        preview = chunk_text[:200] + "..." if len(chunk_text) > 200 else chunk_text
+
+        sources.append({
+            "document_id": r['document_id'],
+            "title": doc_titles.get(r['document_id'], 'Unknown'),
+            "chunk_id": str(r['id']),
+            "chunk_index": r.get('chunk_index', r.get('chunk_number', 0)),
+            "page": r.get('page_number'),
+            "line_start": r.get('line_start'),
+            "line_end": r.get('line_end'),
+            "similarity": round(r.get('similarity') or 0, 3),
+            "preview": preview
+        })
+
+    return {
+        "context": context,
+        "sources_hint": sources_hint,
+        "sources": sources,
+        # Documents whose chunks are in the prompt (response cache invalidation)
+        "document_ids": list(dict.fromkeys(r['document_id'] for r in search_results))
+    }
 
 
 @router.post("/query")
 async def query_documents(
     req: QueryRequest,
-    x_user_id: str = Header(..., description="User ID from frontend")
+    x_user_id: str = Header(..., description="User ID from frontend"),
+    loader: DocumentLoader = Depends(get_document_loader)
 ):
     """
     Ask a question about documents using semantic search.
@@ -43,185 +153,298 @@ async def query_documents(
         print(f"[query] Document IDs: {req.document_ids}")
 
         query_id = str(uuid4())
+        prepared = await prepare_query(req, loader)
 
-        # Check if all documents are ready
-        for doc_id in req.document_ids:
-            doc = vector_store.get_document(doc_id)
-            if not doc:
-                raise HTTPException(status_code=404, detail=f"Document {doc_id} not found")
-            if doc['status'] != 'ready':
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Document '{doc['filename']}' is still processing. Please wait."
-                )
-
-        # Generate embedding for the question (LOCAL - fast!)
-        question_embedding = embedding_client.embed_text(req.question)
-        print(f"[query] Embedding generated, length: {len(question_embedding)}")
-
-        # Search for similar chunks
-        search_results = await vector_store.vector_search(
-            query_embedding=question_embedding,
-            document_ids=req.document_ids,
-            limit=req.search_limit
-        )
-
-        if not search_results:
+        if not prepared["sources"]:
             return {
                 "query_id": query_id,
                 "question": req.question,
-                "answer": "Sağlanan belgelerde bu soruya cevap verebilecek bilgi bulunamadı.",
-                "sources": []
+                "answer": NO_RESULTS_ANSWER,
+                "sources": [],
+                "cached": False
             }
 
-        # Get document titles for sources
-        doc_titles = {}
-        for doc_id in req.document_ids:
-            doc = vector_store.get_document(doc_id)
-            if doc:
-                doc_titles[doc_id] = doc['filename']
-
-        # Build context from search results with location info
-        context_parts = []
-        sources_hint_parts = []
-
-        for r in search_results:
-            doc_title = doc_titles.get(r['document_id'], 'Belge')
-            location_info = ""
-
-            page_num = r.get('page_number')
-            if page_num is not None and page_num > 0:
-                location_info = f"Sayfa {page_num}"
-            elif r.get('line_start') is not None:
-                location_info = f"Satır {r['line_start']}-{r['line_end']}"
-            else:
-                location_info = f"Bölüm {r.get('chunk_index', r.get('chunk_number', 0))}"
-
-            # Context'e belge adını da ekle
-            context_parts.append(f"[Kaynak: {doc_title}, {location_info}]\n{r['chunk_text']}")
-
-            # Sources hint for the prompt
-            sources_hint_parts.append(f"• {doc_title} - {location_info}")
-
-        context = "\n\n".join(context_parts)
-        sources_hint = "\n".join(sources_hint_parts)
-
-        print(f"[query] Context built, length: {len(context)} chars")
         print(f"[query] Calling Ollama...")
 
-        # Generate answer using Ollama (LOCAL!)
-        answer = await ollama_client.generate_answer(
+        # Generate answer using Ollama (LOCAL!); identical prompts are served from the response cache
+        answer, cached = await ollama_client.generate_answer_cached(
             question=req.question,
-            context=context,
-            sources_hint=sources_hint
+            context=prepared["context"],
+            sources_hint=prepared["sources_hint"],
+            document_ids=prepared["document_ids"]
         )
-        print(f"[query] Ollama response received: {answer[:100]}...")
+        print(f"[query] Ollama response received (cached={cached}): {answer[:100]}...")
 
         # Store query in database
-        supabase.table("queries").insert({
-            "id": query_id,
-            "user_id": x_user_id,
-            "question": req.question
-        }).execute()
-
-        # Format detailed sources with previews
-        sources = []
-        for r in search_results:
-            chunk_text = r.get('chunk_text', '')
-            preview = chunk_text[:200] + "..." if len(chunk_text) > 200 else chunk_text
-
-            sources.append({
-                "document_id": r['document_id'],
-                "title": doc_titles.get(r['document_id'], 'Unknown'),
-                "chunk_id": str(r['id']),
-                "chunk_index": r.get('chunk_index', r.get('chunk_number', 0)),
-                "page": r.get('page_number'),
-                "line_start": r.get('line_start'),
-                "line_end": r.get('line_end'),
-                "similarity": round(r.get('similarity', 0), 3),
-                "preview": preview
-            })
+        vector_store.log_query(query_id, x_user_id, req.question)
 
         return {
             "query_id": query_id,
             "question": req.question,
             "answer": answer,
-            "sources": sources
+            "sources": prepared["sources"],
+            "cached": cached
         }
     except HTTPException:
         raise
+    except OllamaBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
     except Exception as e:
         print(f"[query] Error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/search/keyword")
-async def keyword_search(
-    document_id: str = Query(..., description="Document ID to search in"),
-    q: str = Query(..., description="Keyword to search for"),
-    limit: int = Query(10, description="Maximum number of results"),
-    x_user_id: str = Header(...)
+@router.post("/query/stream")
+async def query_documents_stream(
+    req: QueryRequest,
+    x_user_id: str = Header(..., description="User ID from frontend"),
+    loader: DocumentLoader = Depends(get_document_loader)
 ):
     """
-    Search for a keyword in document chunks using ILIKE matching.
-
-    Returns matching chunks with location information.
+    Streaming variant of /query (Server-Sent Events).
+
+    Validation, retrieval and admission happen before the response starts,
+    so missing or processing documents still return 404/400 and a full
+    Ollama queue returns 503 with Retry-After. The stream then sends:
+    - `sources`: query_id, question and sources, right after retrieval
+    - `token`: {"text": ...} for each fragment Ollama generates
+    - `done`: the full answer, `cached` and timings (ms): retrieval, first_token, total
+    - `error`: {"detail": ...} if generation fails mid-stream
     """
+    started = time.perf_counter()
     try:
-        print(f"[keyword] Searching for '{q}' in document {document_id[:8]}...")
+        print(f"[query] Received question (stream): {req.question}")
+        query_id = str(uuid4())
+        prepared = await prepare_query(req, loader)
+        # Hold a place in the Ollama queue for the generation
+        reservation = ollama_client.reserve("interactive") if prepared["sources"] else None
+    except HTTPException:
+        raise
+    except OllamaBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except Exception as e:
+        print(f"[query] Error: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+    retrieval_ms = (time.perf_counter() - started) * 1000
+
+    async def events() -> AsyncIterator[str]:
+        parts: List[str] = []
+        first_token_ms = None
+        meta = {"cached": False}
+        try:
+            yield sse_event("sources", {
+                "query_id": query_id,
+                "question": req.question,
+                "sources": prepared["sources"]
+            })
+            if not prepared["sources"]:
+                parts.append(NO_RESULTS_ANSWER)
+                yield sse_event("token", {"text": NO_RESULTS_ANSWER})
+            else:
+                async for text in ollama_client.stream_answer(
+                    question=req.question,
+                    context=prepared["context"],
+                    sources_hint=prepared["sources_hint"],
+                    document_ids=prepared["document_ids"],
+                    meta=meta,
+                    reservation=reservation
+                ):
+                    if first_token_ms is None:
+                        first_token_ms = (time.perf_counter() - started) * 1000
+                    parts.append(text)
+                    yield sse_event("token", {"text": text})
+                await asyncio.to_thread(vector_store.log_query, query_id, x_user_id, req.question)
+        except Exception as e:
+            print(f"[query] Stream error: {str(e)}")
+            yield sse_event("error", {
+                "detail": str(e),
+                "busy": isinstance(e, OllamaBusy),
+                "retry_after": getattr(e, "retry_after", None)
+            })
+            return
+        finally:
+            # A client that leaves before the generation claims the place gives it back here
+            if reservation:
+                reservation.cancel()
+
+        answer = "".join(parts).strip()
+        print(f"[query] Stream finished: {len(answer)} chars")
+        yield sse_event("done", {
+            "query_id": query_id,
+            "answer": answer,
+            "cached": meta["cached"],
+            "timings": {
+                "retrieval_ms": round(retrieval_ms, 1),
+                "first_token_ms": round(first_token_ms, 1) if first_token_ms is not None else None,
+                "total_ms": round((time.perf_counter() - started) * 1000, 1)
+            }
+        })
 
-        # Check document exists and user has access
-        doc = vector_store.get_document(document_id)
-        if not doc:
-            raise HTTPException(status_code=404, detail="Document not found")
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+        # Gives the place back if the body never started
+        background=BackgroundTask(reservation.cancel) if reservation else None
+    )
 
-        if doc['user_id'] != x_user_id:
-            raise HTTPException(status_code=403, detail="Unauthorized")
 
-        if doc['status'] != 'ready':
-            raise HTTPException(
-                status_code=400,
-                detail=f"Document is still processing. Status: {doc['status']}"
-            )
+def format_keyword_result(r: dict, document_id: str, title: str, window: int = 300) -> dict:
+    """
+    Shape a keyword hit for the API.
 
-        # Perform keyword search
-        results = await vector_store.keyword_search(
-            document_id=document_id,
-            query=q,
-            limit=limit
+    `matches` are [start, end] offsets into `full_text`; the preview is a
+    `window`-char snippet around the first match (its offsets are returned as
+    snippet_start/snippet_end) with every hit inside it wrapped in **.
+    """
+    chunk_text = r.get('chunk_text', '')
+    matches = r.get('matches') or []
+
+    snippet_start = max(0, matches[0][0] - window // 3) if matches else 0
+    snippet_end = min(len(chunk_text), snippet_start + window)
+
+    parts = []
+    cursor = snippet_start
+    for start, end in matches:
+        if start < cursor or end > snippet_end:
+            continue
+        parts.append(chunk_text[cursor:start])
+        parts.append(f"**{chunk_text[start:end]}**")
+        cursor = end
+    parts.append(chunk_text[cursor:snippet_end])
+
+    preview = "".join(parts)
+    if snippet_start > 0:
+        preview = "..." + preview
+    if snippet_end < len(chunk_text):
+        preview = preview + "..."
+
+    return {
+        "document_id": document_id,
+        "title": title,
+        "chunk_id": str(r['id']),
+        "chunk_index": r.get('chunk_index', r.get('chunk_number', 0)),
+        "page": r.get('page_number'),
+        "line_start": r.get('line_start'),
+        "line_end": r.get('line_end'),
+        "preview": preview,
+        "full_text": chunk_text,
+        "match_count": r.get('match_count', len(matches)),
+        "matches": matches,
+        "snippet_start": snippet_start,
+        "snippet_end": snippet_end
+    }
+
+
+async def run_keyword_search(
+    query: str,
+    x_user_id: str,
+    document_id: Optional[str] = None,
+    document_ids: Optional[List[str]] = None,
+    notebook_id: Optional[str] = None,
+    limit: int = 10,
+    offset: int = 0,
+    loader: Optional[DocumentLoader] = None
+) -> dict:
+    """
+    Shared body of the keyword endpoints.
+
+    Exactly one scope is given: a document_id, a list of document_ids, or a
+    notebook_id. All target documents are loaded and access-checked with a
+    single query, then searched together in one pass.
+    """
+    scopes = [s for s in (document_id, document_ids, notebook_id) if s]
+    if len(scopes) != 1:
+        raise HTTPException(
+            status_code=400,
+            detail="Provide exactly one of document_id, document_ids or notebook_id"
         )
+    if limit < 1 or offset < 0:
+        raise HTTPException(status_code=400, detail="limit must be >= 1 and offset >= 0")
+
+    # Load and authorize every target document in one query
+    loader = loader or DocumentLoader()
+    if notebook_id:
+        await check_notebook_owner(notebook_id, x_user_id)
+        docs = await asyncio.to_thread(vector_store.list_notebook_documents, notebook_id)
+        loader.prime(docs)
+        target_ids = [d['id'] for d in docs]
+    else:
+        target_ids = list(dict.fromkeys(document_ids or [document_id]))
+        loaded = await loader.load_many(target_ids)
+        if not all(loaded.values()):
+            raise HTTPException(status_code=404, detail="Document not found")
+        docs = list(loaded.values())
 
-        # Format results with location info
-        formatted_results = []
-        for r in results:
-            chunk_text = r.get('chunk_text', '')
-            preview = chunk_text[:300] + "..." if len(chunk_text) > 300 else chunk_text
-
-            # Highlight keyword in preview (simple implementation)
-            import re
-            pattern = re.compile(re.escape(q), re.IGNORECASE)
-            highlighted_preview = pattern.sub(f"**{q}**", preview)
-
-            formatted_results.append({
-                "document_id": document_id,
-                "title": doc['filename'],
-                "chunk_id": str(r['id']),
-                "chunk_index": r.get('chunk_index', r.get('chunk_number', 0)),
-                "page": r.get('page_number'),
-                "line_start": r.get('line_start'),
-                "line_end": r.get('line_end'),
-                "preview": highlighted_preview,
-                "full_text": chunk_text
-            })
+    if any(d['user_id'] != x_user_id for d in docs):
+        raise HTTPException(status_code=403, detail="Unauthorized")
 
-        return {
-            "query": q,
-            "document_id": document_id,
-            "document_title": doc['filename'],
-            "results": formatted_results,
-            "total": len(formatted_results)
-        }
+    docs_by_id = {d['id']: d for d in docs}
+    if document_id and docs_by_id[document_id]['status'] != 'ready':
+        raise HTTPException(
+            status_code=400,
+            detail=f"Document is still processing. Status: {docs_by_id[document_id]['status']}"
+        )
+    # Notebook/multi-document searches skip documents that are not ready yet
+    ready_ids = [d for d in target_ids if docs_by_id[d]['status'] == 'ready']
+
+    # Perform keyword search (positional index: term, phrase or prefix*)
+    results, total = await indexed_keyword_search(ready_ids, query, limit, offset)
+    formatted_results = [
+        format_keyword_result(r, r['document_id'], docs_by_id[r['document_id']]['filename'])
+        for r in results
+    ]
+
+    response = {
+        "query": query,
+        "document_ids": ready_ids,
+        "results": formatted_results,
+        "total": total,
+        "offset": offset,
+        "limit": limit,
+        "has_more": offset + len(formatted_results) < total
+    }
+    if document_id:
+        response["document_id"] = document_id
+        response["document_title"] = docs_by_id[document_id]['filename']
+    if notebook_id:
+        response["notebook_id"] = notebook_id
+    return response
+
+
+@router.get("/search/keyword")
+async def keyword_search(
+    q: str = Query(..., description="Keyword to search for"),
+    document_id: Optional[str] = Query(None, description="Document ID to search in"),
+    document_ids: Optional[List[str]] = Query(None, description="Several document IDs (repeat the parameter)"),
+    notebook_id: Optional[str] = Query(None, description="Search every document in this notebook"),
+    limit: int = Query(10, description="Maximum number of results"),
+    offset: int = Query(0, description="Number of results to skip"),
+    x_user_id: str = Header(...),
+    loader: DocumentLoader = Depends(get_document_loader)
+):
+    """
+    Search document chunks with the positional keyword index.
+
+    `q` is an exact term, a phrase (several words, optionally quoted) or a
+    prefix (`zek*`); matching is case-insensitive with Turkish İ/ı rules.
+    Scope is one document, a list of documents or a whole notebook; results
+    from all documents are ranked together by number of matches and
+    paginated with limit/offset.
+    """
+    try:
+        scope = notebook_id or document_id or f"{len(document_ids or [])} documents"
+        print(f"[keyword] Searching for '{q}' in {scope}...")
 
+        return await run_keyword_search(
+            q, x_user_id,
+            document_id=document_id,
+            document_ids=document_ids,
+            notebook_id=notebook_id,
+            limit=limit,
+            offset=offset,
+            loader=loader
+        )
     except HTTPException:
         raise
     except Exception as e:
@@ -232,66 +455,26 @@ async def keyword_search(
 @router.post("/search/keyword")
 async def keyword_search_post(
     req: KeywordSearchRequest,
-    x_user_id: str = Header(...)
+    x_user_id: str = Header(...),
+    loader: DocumentLoader = Depends(get_document_loader)
 ):
     """
     Search for a keyword in document chunks (POST version).
     Same as GET but accepts body parameters.
     """
     try:
-        print(f"[keyword] POST: Searching for '{req.query}' in document {req.document_id[:8]}...")
-
-        # Check document exists and user has access
-        doc = vector_store.get_document(req.document_id)
-        if not doc:
-            raise HTTPException(status_code=404, detail="Document not found")
+        scope = req.notebook_id or req.document_id or f"{len(req.document_ids or [])} documents"
+        print(f"[keyword] POST: Searching for '{req.query}' in {scope}...")
 
-        if doc['user_id'] != x_user_id:
-            raise HTTPException(status_code=403, detail="Unauthorized")
-
-        if doc['status'] != 'ready':
-            raise HTTPException(
-                status_code=400,
-                detail=f"Document is still processing. Status: {doc['status']}"
-            )
-
-        # Perform keyword search
-        results = await vector_store.keyword_search(
+        return await run_keyword_search(
+            req.query, x_user_id,
             document_id=req.document_id,
-            query=req.query,
-            limit=req.limit
+            document_ids=req.document_ids,
+            notebook_id=req.notebook_id,
+            limit=req.limit,
+            offset=req.offset,
+            loader=loader
         )
-
-        # Format results
-        formatted_results = []
-        for r in results:
-            chunk_text = r.get('chunk_text', '')
-            preview = chunk_text[:300] + "..." if len(chunk_text) > 300 else chunk_text
-
-            import re
-            pattern = re.compile(re.escape(req.query), re.IGNORECASE)
-            highlighted_preview = pattern.sub(f"**{req.query}**", preview)
-
-            formatted_results.append({
-                "document_id": req.document_id,
-                "title": doc['filename'],
-                "chunk_id": str(r['id']),
-                "chunk_index": r.get('chunk_index', r.get('chunk_number', 0)),
-                "page": r.get('page_number'),
-                "line_start": r.get('line_start'),
-                "line_end": r.get('line_end'),
-                "preview": highlighted_preview,
-                "full_text": chunk_text
-            })
-
-        return {
-            "query": req.query,
-            "document_id": req.document_id,
-            "document_title": doc['filename'],
-            "results": formatted_results,
-            "total": len(formatted_results)
-        }
-
     except HTTPException:
         raise
     except Exception as e:
@@ -306,13 +489,11 @@ async def list_queries(
 ):
     """List recent queries for a user"""
     try:
-        response = supabase.table("queries").select("*").eq(
-            "user_id", x_user_id
-        ).order("created_at", desc=True).limit(limit).execute()
+        queries = vector_store.list_queries(x_user_id, limit)
 
         return {
-            "queries": response.data,
-            "total": len(response.data)
+            "queries": queries,
+            "total": len(queries)
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
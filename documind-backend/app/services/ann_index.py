@@ -0,0 +1,152 @@
+import json
+import os
+from typing import Dict, List, Optional
+import numpy as np
+from app.services.document_index_store import DocumentIndexStore, ROW_FIELDS
+from app.services.vector_math import cosine_top_k, stack_embeddings
+
+
+class IVFIndex:
+    """
+    IVF-flat approximate index over one document's chunk embeddings.
+
+    Vectors are L2-normalized and clustered with spherical k-means into
+    ~sqrt(n) inverted lists; a search scores only the `nprobe` lists whose
+    centroids are closest to the query. Small documents skip clustering and
+    are scanned exactly.
+    """
+
+    def __init__(
+        self,
+        vectors: np.ndarray,
+        rows: List[Dict],
+        centroids: Optional[np.ndarray] = None,
+        assignments: Optional[np.ndarray] = None
+    ):
+        self.vectors = vectors
+        self.rows = rows
+        self.centroids = centroids
+        self.assignments = assignments
+        self._lists: List[np.ndarray] = []
+        if centroids is not None and assignments is not None:
+            self._lists = [np.flatnonzero(assignments == c) for c in range(len(centroids))]
+
+    @classmethod
+    def build(cls, rows: List[Dict], min_train_size: int = 256, iterations: int = 10) -> "IVFIndex":
+        matrix, norms, kept = stack_embeddings(rows)
+        kept_rows = [{k: rows[i].get(k) for k in ROW_FIELDS} for i in kept]
+        if matrix.shape[0] == 0:
+            return cls(np.zeros((0, 0), dtype=np.float32), [])
+
+        norms[norms == 0] = 1.0
+        vectors = matrix / norms[:, None]
+
+        n = vectors.shape[0]
+        if n < min_train_size:
+            return cls(vectors, kept_rows)
+
+        # Spherical k-means
+        n_lists = max(2, int(np.sqrt(n)))
+        rng = np.random.default_rng(0)
+        centroids = vectors[rng.choice(n, n_lists, replace=False)].copy()
+        assignments = np.zeros(n, dtype=np.int32)
+        for _ in range(iterations):
+            assignments = np.argmax(vectors @ centroids.T, axis=1).astype(np.int32)
+            for c in range(n_lists):
+                members = vectors[assignments == c]
+                if len(members):
+                    centroid = members.sum(axis=0)
+                    norm = np.linalg.norm(centroid)
+                    centroids[c] = centroid / norm if norm else centroid
+
+        return cls(vectors, kept_rows, centroids, assignments)
+
+    def search(
+        self,
+        query: np.ndarray,
+        limit: int,
+        nprobe: int,
+        threshold: Optional[float] = None
+    ) -> List[Dict]:
+        if self.vectors.shape[0] == 0:
+            return []
+
+        if self.centroids is None:
+            candidates = np.arange(self.vectors.shape[0])
+        else:
+            nprobe = min(nprobe, len(self.centroids))
+            probe = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+            candidates = np.concatenate([self._lists[c] for c in probe])
+
+        sub = self.vectors[candidates]
+        top, sims = cosine_top_k(query, sub, np.ones(sub.shape[0], dtype=np.float32), limit, threshold)
+
+        result = []
+        for idx, sim in zip(top.tolist(), sims.tolist()):
+            row = dict(self.rows[candidates[idx]])
+            row["similarity"] = sim
+            result.append(row)
+        return result
+
+    def save(self, path_prefix: str) -> None:
+        """Persist as <prefix>.npz (vectors, clusters) + <prefix>.json (rows)"""
+        arrays = {"vectors": self.vectors}
+        if self.centroids is not None:
+            arrays["centroids"] = self.centroids
+            arrays["assignments"] = self.assignments
+
+        tmp_npz = f"{path_prefix}.npz.tmp"
+        with open(tmp_npz, "wb") as f:
+            np.savez(f, **arrays)
+        tmp_json = f"{path_prefix}.json.tmp"
+        with open(tmp_json, "w", encoding="utf-8") as f:
+            json.dump(self.rows, f, ensure_ascii=False)
+
+        os.replace(tmp_npz, f"{path_prefix}.npz")
+        os.replace(tmp_json, f"{path_prefix}.json")
+
+    @classmethod
+    def load(cls, path_prefix: str) -> "IVFIndex":
+        with np.load(f"{path_prefix}.npz") as data:
+            vectors = data["vectors"]
+            centroids = data["centroids"] if "centroids" in data else None
+            assignments = data["assignments"] if "assignments" in data else None
+        with open(f"{path_prefix}.json", encoding="utf-8") as f:
+            rows = json.load(f)
+        return cls(vectors, rows, centroids, assignments)
+
+
+class LocalVectorIndex(DocumentIndexStore[IVFIndex]):
+    """Per-document IVF indexes persisted under `directory`"""
+
+    suffixes = (".npz", ".json")
+    tag = "ann"
+
+    def __init__(self, directory: str, nprobe: int = 8, threshold: Optional[float] = None, max_loaded: int = 256):
+        super().__init__(directory, max_loaded)
+        self.nprobe = nprobe
+        self.threshold = threshold
+
+    def _build(self, document_id: str, rows: List[Dict]) -> IVFIndex:
+        return IVFIndex.build(rows)
+
+    def _load(self, prefix: str) -> IVFIndex:
+        return IVFIndex.load(prefix)
+
+    def search(self, query_embedding: List[float], document_ids: List[str], limit: int = 5) -> List[Dict]:
+        """Same contract as match_document_chunks, over the indexed documents"""
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = float(np.linalg.norm(query))
+        if norm == 0.0:
+            return []
+        query = query / norm
+
+        merged: List[Dict] = []
+        for document_id in document_ids:
+            index = self.get(document_id)
+            if index is None or index.vectors.shape[1:] != query.shape:
+                continue
+            merged.extend(index.search(query, limit, self.nprobe, self.threshold))
+
+        merged.sort(key=lambda r: r["similarity"], reverse=True)
+        return merged[:limit]
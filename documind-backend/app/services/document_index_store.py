@@ -0,0 +1,85 @@
+import os
+from typing import Dict, Generic, List, Optional, Tuple, TypeVar
+from app.services.lru_cache import LRUCache
+
+# Chunk columns kept next to an index so search results have the RPC shape
+ROW_FIELDS = [
+    "id", "document_id", "chunk_text", "chunk_number", "chunk_index",
+    "page_number", "line_start", "line_end"
+]
+
+IndexT = TypeVar("IndexT")
+
+
+class DocumentIndexStore(Generic[IndexT]):
+    """
+    Per-document search indexes persisted under `directory`.
+
+    Subclasses say how an index is built from a document's chunk rows and
+    how it is loaded back; the index object saves itself to a path prefix
+    and exposes its `rows`. Only the `max_loaded` most recently used
+    indexes stay in memory (LRU); the rest are reloaded from disk on their
+    next use, so memory does not grow with the whole corpus.
+
+    A notebook (or any document set) is searched by probing each member
+    document's index, so indexes never need rebuilding when documents are
+    linked to or removed from notebooks.
+    """
+
+    # Files written per document; the first one marks that an index exists
+    suffixes: Tuple[str, ...] = (".json",)
+    # Log prefix
+    tag = "index"
+
+    def __init__(self, directory: str, max_loaded: int):
+        self.directory = directory
+        self._loaded = LRUCache(maxsize=max_loaded)
+
+    def _prefix(self, document_id: str) -> str:
+        return os.path.join(self.directory, document_id)
+
+    def _build(self, document_id: str, rows: List[Dict]) -> IndexT:
+        raise NotImplementedError
+
+    def _load(self, prefix: str) -> Optional[IndexT]:
+        """Index saved under `prefix`, or None if it has to be rebuilt"""
+        raise NotImplementedError
+
+    def get(self, document_id: str) -> Optional[IndexT]:
+        """In-memory index, loading it from disk when not resident"""
+        index = self._loaded.get(document_id)
+        if index is not None:
+            return index
+        prefix = self._prefix(document_id)
+        if not os.path.exists(prefix + self.suffixes[0]):
+            return None
+        try:
+            index = self._load(prefix)
+        except Exception as e:
+            print(f"[{self.tag}] Failed to load index for doc {document_id[:8]}: {str(e)}")
+            return None
+        if index is not None:
+            self._loaded.set(document_id, index)
+        return index
+
+    def add_document(self, document_id: str, rows: List[Dict]) -> None:
+        """(Re)build and persist the index for a document's chunk rows"""
+        index = self._build(document_id, rows)
+        os.makedirs(self.directory, exist_ok=True)
+        index.save(self._prefix(document_id))
+        self._loaded.set(document_id, index)
+        print(f"[{self.tag}] Indexed {len(index.rows)} chunks for doc {document_id[:8]}")
+
+    def remove_document(self, document_id: str) -> None:
+        self._loaded.pop(document_id)
+        for suffix in self.suffixes:
+            try:
+                os.remove(self._prefix(document_id) + suffix)
+            except FileNotFoundError:
+                pass
+
+    def missing(self, document_ids: List[str]) -> List[str]:
+        return [d for d in document_ids if self.get(d) is None]
+
+    def stats(self) -> Dict:
+        return self._loaded.stats()
@@ -0,0 +1,65 @@
+from typing import Dict, Iterable, List, Optional
+from app.services.vector_store import vector_store
+from app.services.metadata_cache import metadata_cache, DOCUMENT_FIELDS
+
+# Metadata the routes need for access, readiness and source titles
+META_COLUMNS = ["id", "user_id", "notebook_id", "filename", "status"]
+SUMMARY_COLUMNS = META_COLUMNS + ["short_summary", "long_summary"]
+
+
+class DocumentLoader:
+    """
+    Request-scoped, batched document metadata loader.
+
+    `load_many` fetches every id not seen yet with a single IN query over
+    `columns`; results (including misses) are memoized for the rest of the
+    request, so repeated lookups of the same document are free. When the
+    columns are covered by the shared metadata cache, it is consulted
+    first and refilled from the query. Create one per request via the
+    `get_document_loader` dependency.
+    """
+
+    def __init__(self, columns: Optional[List[str]] = None):
+        self.columns = columns or META_COLUMNS
+        self.queries = 0
+        self._docs: Dict[str, Optional[Dict]] = {}
+        self._use_cache = set(self.columns) <= set(DOCUMENT_FIELDS)
+
+    async def load_many(self, document_ids: Iterable[str]) -> Dict[str, Optional[Dict]]:
+        """id -> document row (None if it does not exist), in input order"""
+        ids = list(dict.fromkeys(document_ids))
+        missing = [d for d in ids if d not in self._docs]
+        if missing and self._use_cache:
+            for document_id in missing:
+                cached = metadata_cache.get_document(document_id)
+                if cached is not None:
+                    self._docs[document_id] = dict(cached)
+            missing = [d for d in missing if d not in self._docs]
+        if missing:
+            self.queries += 1
+            generation = metadata_cache.generation
+            rows = await vector_store.aget_documents(missing, self.columns)
+            found = {str(row['id']): row for row in rows}
+            for document_id in missing:
+                self._docs[document_id] = found.get(document_id)
+            for row in rows:
+                metadata_cache.set_document(row, generation)
+        return {d: self._docs[d] for d in ids}
+
+    async def load(self, document_id: str) -> Optional[Dict]:
+        return (await self.load_many([document_id]))[document_id]
+
+    def prime(self, docs: Iterable[Dict]) -> None:
+        """Seed the memo with rows fetched elsewhere (e.g. a notebook listing)"""
+        for doc in docs:
+            self._docs[str(doc['id'])] = doc
+
+
+def get_document_loader() -> DocumentLoader:
+    """FastAPI dependency: a fresh loader per request"""
+    return DocumentLoader()
+
+
+def get_summary_loader() -> DocumentLoader:
+    """FastAPI dependency: loader that also fetches stored summaries"""
+    return DocumentLoader(SUMMARY_COLUMNS)
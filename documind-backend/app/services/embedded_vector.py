@@ -0,0 +1,376 @@
+import asyncio
+import os
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Tuple
+from uuid import uuid4
+import numpy as np
+from app.services.vector_math import cosine_top_k
+from app.services.metadata_cache import metadata_cache
+
+CHUNK_COLUMNS = "id, document_id, chunk_text, chunk_number, chunk_index, page_number, line_start, line_end"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS documents (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    notebook_id TEXT,
+    filename TEXT NOT NULL,
+    file_size INTEGER,
+    file_path TEXT,
+    status TEXT DEFAULT 'processing',
+    short_summary TEXT,
+    long_summary TEXT,
+    created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ', 'now')),
+    updated_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ', 'now'))
+);
+CREATE INDEX IF NOT EXISTS documents_user_idx ON documents (user_id, created_at);
+CREATE INDEX IF NOT EXISTS documents_notebook_idx ON documents (notebook_id);
+CREATE TABLE IF NOT EXISTS document_chunks (
+    id TEXT PRIMARY KEY,
+    document_id TEXT NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+    chunk_text TEXT NOT NULL,
+    chunk_number INTEGER NOT NULL,
+    chunk_index INTEGER,
+    page_number INTEGER,
+    line_start INTEGER,
+    line_end INTEGER,
+    vector_row INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS document_chunks_doc_idx ON document_chunks (document_id, chunk_number);
+CREATE UNIQUE INDEX IF NOT EXISTS document_chunks_vector_idx ON document_chunks (document_id, vector_row);
+CREATE TABLE IF NOT EXISTS queries (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    question TEXT NOT NULL,
+    created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ', 'now'))
+);
+"""
+
+
+class EmbeddedVector:
+    """
+    VectorStore for single-node deployments and load tests (no network).
+
+    Rows live in SQLite (<directory>/store.sqlite3). Each document's
+    embeddings are appended to <directory>/embeddings/<document_id>.f32 as raw
+    float32 rows and memory-mapped at search time; document_chunks.vector_row
+    points into that file.
+    """
+
+    def __init__(self, directory: str, similarity_threshold: float = 0.3):
+        self.threshold = similarity_threshold
+        self.directory = directory
+        self.vectors_dir = os.path.join(directory, "embeddings")
+        os.makedirs(self.vectors_dir, exist_ok=True)
+
+        self._conn = sqlite3.connect(
+            os.path.join(directory, "store.sqlite3"), check_same_thread=False
+        )
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.RLock()
+        # document_id -> (file size, memmap, norms), refreshed when the file grows
+        self._matrices: Dict[str, Tuple[int, np.ndarray, np.ndarray]] = {}
+
+    # ---------- helpers ----------
+
+    def _fetchall(self, sql: str, params: tuple = ()) -> List[Dict]:
+        with self._lock:
+            return [dict(r) for r in self._conn.execute(sql, params).fetchall()]
+
+    def _fetchone(self, sql: str, params: tuple = ()) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(sql, params).fetchone()
+        return dict(row) if row else None
+
+    def _vector_path(self, document_id: str) -> str:
+        return os.path.join(self.vectors_dir, f"{document_id}.f32")
+
+    def _dimension(self) -> Optional[int]:
+        row = self._fetchone("SELECT value FROM meta WHERE key = 'dimension'")
+        return int(row["value"]) if row else None
+
+    def _append_vectors(self, document_id: str, embeddings: List[List[float]]) -> int:
+        """Append rows to the document's vector file; returns the first row number"""
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        dim = self._dimension()
+        if dim is None:
+            dim = matrix.shape[1]
+            self._conn.execute("INSERT INTO meta (key, value) VALUES ('dimension', ?)", (str(dim),))
+        if matrix.ndim != 2 or matrix.shape[1] != dim:
+            raise ValueError(f"Expected {dim}-dim embeddings, got shape {matrix.shape}")
+
+        path = self._vector_path(document_id)
+        offset = os.path.getsize(path) if os.path.exists(path) else 0
+        with open(path, "ab") as f:
+            f.write(matrix.tobytes())
+        return offset // (4 * dim)
+
+    def _truncate_vectors(self, document_id: str, first_row: int) -> None:
+        dim = self._dimension()
+        path = self._vector_path(document_id)
+        if dim and os.path.exists(path):
+            with open(path, "r+b") as f:
+                f.truncate(first_row * 4 * dim)
+
+    def _matrix(self, document_id: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        path = self._vector_path(document_id)
+        dim = self._dimension()
+        if not dim or not os.path.exists(path):
+            return None
+        size = os.path.getsize(path)
+        if size == 0:
+            return None
+
+        cached = self._matrices.get(document_id)
+        if cached and cached[0] == size:
+            return cached[1], cached[2]
+
+        matrix = np.memmap(path, dtype=np.float32, mode="r", shape=(size // (4 * dim), dim))
+        norms = np.linalg.norm(matrix, axis=1)
+        self._matrices[document_id] = (size, matrix, norms)
+        return matrix, norms
+
+    # ---------- documents ----------
+
+    def create_document(self, doc_data: Dict) -> None:
+        columns = ["id", "user_id", "notebook_id", "filename", "file_size", "file_path", "status"]
+        values = [doc_data.get(c) for c in columns]
+        values[columns.index("status")] = doc_data.get("status", "processing")
+        with self._lock:
+            self._conn.execute(
+                f"INSERT INTO documents ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                values
+            )
+            self._conn.commit()
+
+    def get_document(self, document_id: str) -> Optional[Dict]:
+        return self._fetchone("SELECT * FROM documents WHERE id = ?", (document_id,))
+
+    async def aget_document(self, document_id: str) -> Optional[Dict]:
+        # Local SQLite primary-key lookup; cheaper inline than a thread hop
+        return self.get_document(document_id)
+
+    async def aget_documents(
+        self,
+        document_ids: List[str],
+        columns: Optional[List[str]] = None
+    ) -> List[Dict]:
+        return self.get_documents(document_ids, columns)
+
+    def get_documents(
+        self,
+        document_ids: List[str],
+        columns: Optional[List[str]] = None
+    ) -> List[Dict]:
+        if not document_ids:
+            return []
+        placeholders = ",".join("?" * len(document_ids))
+        select = ", ".join(columns) if columns else "*"
+        return self._fetchall(
+            f"SELECT {select} FROM documents WHERE id IN ({placeholders})", tuple(document_ids)
+        )
+
+    def list_notebook_documents(self, notebook_id: str) -> List[Dict]:
+        return self._fetchall(
+            "SELECT * FROM documents WHERE notebook_id = ? ORDER BY created_at", (notebook_id,)
+        )
+
+    def list_documents(self, user_id: str) -> List[Dict]:
+        return self._fetchall(
+            "SELECT id, filename, file_size, status, short_summary, long_summary, created_at, updated_at "
+            "FROM documents WHERE user_id = ? ORDER BY created_at DESC",
+            (user_id,)
+        )
+
+    def update_document_status(self, document_id: str, status: str) -> None:
+        metadata_cache.invalidate_document(document_id)
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "UPDATE documents SET status = ?, updated_at = strftime('%Y-%m-%dT%H:%M:%fZ', 'now') WHERE id = ?",
+                    (status, document_id)
+                )
+                self._conn.commit()
+            print(f"[embedded] Updated doc {document_id[:8]} status to {status}")
+        except Exception as e:
+            print(f"[embedded] Status update error: {str(e)}")
+
+    def save_document_summary(
+        self,
+        document_id: str,
+        short_summary: Optional[str] = None,
+        long_summary: Optional[str] = None
+    ) -> None:
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "UPDATE documents SET short_summary = COALESCE(?, short_summary), "
+                    "long_summary = COALESCE(?, long_summary), "
+                    "updated_at = strftime('%Y-%m-%dT%H:%M:%fZ', 'now') WHERE id = ?",
+                    (short_summary, long_summary, document_id)
+                )
+                self._conn.commit()
+        except Exception as e:
+            print(f"[embedded] Summary save error: {str(e)}")
+            raise Exception(f"Failed to save summary: {str(e)}")
+
+    def delete_document(self, document_id: str) -> None:
+        metadata_cache.invalidate_document(document_id)
+        with self._lock:
+            self._conn.execute("DELETE FROM documents WHERE id = ?", (document_id,))
+            self._conn.commit()
+            self._matrices.pop(document_id, None)
+            try:
+                os.remove(self._vector_path(document_id))
+            except FileNotFoundError:
+                pass
+
+    # ---------- chunks ----------
+
+    def store_chunk(
+        self,
+        document_id: str,
+        chunk_text: str,
+        chunk_number: int,
+        page_number: Optional[int],
+        embedding: List[float],
+        chunk_index: Optional[int] = None,
+        line_start: Optional[int] = None,
+        line_end: Optional[int] = None
+    ) -> str:
+        return self.store_chunks(document_id, [{
+            "text": chunk_text,
+            "chunk_number": chunk_number,
+            "chunk_index": chunk_index,
+            "page_number": page_number,
+            "line_start": line_start,
+            "line_end": line_end
+        }], [embedding])[0]
+
+    async def astore_chunks(
+        self,
+        document_id: str,
+        chunks: List[Dict],
+        embeddings: List[List[float]],
+        batch_size: Optional[int] = None
+    ) -> List[str]:
+        return await asyncio.to_thread(self.store_chunks, document_id, chunks, embeddings, batch_size)
+
+    def store_chunks(
+        self,
+        document_id: str,
+        chunks: List[Dict],
+        embeddings: List[List[float]],
+        batch_size: Optional[int] = None
+    ) -> List[str]:
+        """Append vectors to the document file and insert rows in one transaction"""
+        if len(chunks) != len(embeddings):
+            raise Exception(
+                f"Failed to store chunks: {len(chunks)} chunks but {len(embeddings)} embeddings"
+            )
+        if not chunks:
+            return []
+
+        ids = [str(uuid4()) for _ in chunks]
+        with self._lock:
+            first_row = None
+            try:
+                first_row = self._append_vectors(document_id, embeddings)
+                rows = []
+                for i, (chunk_id, chunk) in enumerate(zip(ids, chunks)):
+                    chunk_index = chunk.get('chunk_index')
+                    rows.append((
+                        chunk_id, document_id, chunk['text'], chunk['chunk_number'],
+                        chunk_index if chunk_index is not None else chunk['chunk_number'],
+                        chunk.get('page_number'), chunk.get('line_start'), chunk.get('line_end'),
+                        first_row + i
+                    ))
+                self._conn.executemany(
+                    f"INSERT INTO document_chunks ({CHUNK_COLUMNS}, vector_row) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+                self._conn.commit()
+            except Exception as e:
+                self._conn.rollback()
+                if first_row is not None:
+                    self._truncate_vectors(document_id, first_row)
+                raise Exception(f"Failed to store chunks: {str(e)}")
+
+        print(f"[embedded] Stored {len(ids)} chunks for doc {document_id[:8]}")
+        return ids
+
+    async def get_document_chunks(self, document_id: str) -> List[Dict]:
+        return self._fetchall(
+            "SELECT id, chunk_text, chunk_number, chunk_index, page_number, line_start, line_end "
+            "FROM document_chunks WHERE document_id = ? ORDER BY chunk_number",
+            (document_id,)
+        )
+
+    def get_chunk(self, document_id: str, chunk_id: str) -> Optional[Dict]:
+        return self._fetchone(
+            "SELECT id, chunk_text, chunk_number, chunk_index, page_number, line_start, line_end "
+            "FROM document_chunks WHERE id = ? AND document_id = ?",
+            (chunk_id, document_id)
+        )
+
+    # ---------- retrieval ----------
+
+    async def vector_search(
+        self,
+        query_embedding: List[float],
+        document_ids: List[str],
+        limit: int = 5
+    ) -> List[Dict]:
+        """Exact cosine search over the memory-mapped vectors of each document"""
+        hits: List[Tuple[float, str, int]] = []
+        for document_id in document_ids:
+            loaded = self._matrix(document_id)
+            if loaded is None:
+                continue
+            matrix, norms = loaded
+            top, sims = cosine_top_k(query_embedding, matrix, norms, limit, self.threshold)
+            hits.extend((sim, document_id, row) for row, sim in zip(top.tolist(), sims.tolist()))
+
+        hits.sort(key=lambda h: h[0], reverse=True)
+        hits = hits[:limit]
+
+        results = []
+        for sim, document_id, vector_row in hits:
+            row = self._fetchone(
+                f"SELECT {CHUNK_COLUMNS} FROM document_chunks WHERE document_id = ? AND vector_row = ?",
+                (document_id, vector_row)
+            )
+            if row:
+                row["similarity"] = sim
+                results.append(row)
+        return results
+
+    async def keyword_search(self, document_id: str, query: str, limit: int = 10) -> List[Dict]:
+        """Substring match (case-insensitive for ASCII), in chunk order"""
+        pattern = "%" + query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        return self._fetchall(
+            f"SELECT {CHUNK_COLUMNS} FROM document_chunks "
+            "WHERE document_id = ? AND chunk_text LIKE ? ESCAPE '\\' ORDER BY chunk_number LIMIT ?",
+            (document_id, pattern, limit)
+        )
+
+    # ---------- history ----------
+
+    def log_query(self, query_id: str, user_id: str, question: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO queries (id, user_id, question) VALUES (?, ?, ?)",
+                (query_id, user_id, question)
+            )
+            self._conn.commit()
+
+    def list_queries(self, user_id: str, limit: int = 10) -> List[Dict]:
+        return self._fetchall(
+            "SELECT * FROM queries WHERE user_id = ? ORDER BY created_at DESC LIMIT ?",
+            (user_id, limit)
+        )
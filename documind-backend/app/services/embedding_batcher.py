@@ -0,0 +1,100 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+# Upper bounds of the batch-size histogram buckets
+HISTOGRAM_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128]
+
+
+class EmbeddingBatcher:
+    """
+    Dynamic micro-batching for single-text embedding requests.
+
+    Concurrent `embed()` calls are collected for up to `max_wait_ms` (or until
+    `max_batch` texts are waiting) and encoded as one batch; each caller gets
+    back its own vector.
+    """
+
+    def __init__(
+        self,
+        encode_batch: Callable[[List[str]], Awaitable[List[List[float]]]],
+        max_wait_ms: float,
+        max_batch: int
+    ):
+        self._encode_batch = encode_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_batch = max_batch
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # The loop only keeps weak references to tasks: hold running flushes here
+        self._tasks: Set[asyncio.Task] = set()
+
+        # Metrics
+        self.batches = 0
+        self.texts = 0
+        self.histogram: Dict[str, int] = {self._bucket(b): 0 for b in HISTOGRAM_BUCKETS}
+        self.histogram[f">{HISTOGRAM_BUCKETS[-1]}"] = 0
+
+    @staticmethod
+    def _bucket(size: int) -> str:
+        for bound in HISTOGRAM_BUCKETS:
+            if size <= bound:
+                return f"<={bound}"
+        return f">{HISTOGRAM_BUCKETS[-1]}"
+
+    async def embed(self, text: str) -> List[float]:
+        """Queue one text and wait for its vector"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        self.batches += 1
+        self.texts += len(batch)
+        self.histogram[self._bucket(len(batch))] += 1
+        task = asyncio.ensure_future(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def close(self) -> None:
+        """Flush waiting texts and wait for every running batch (app shutdown)"""
+        self._flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _run(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        try:
+            vectors = await self._encode_batch([text for text, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), vector in zip(batch, vectors):
+            if not future.done():
+                future.set_result(vector)
+
+    def stats(self) -> Dict:
+        return {
+            "max_wait_ms": self.max_wait * 1000.0,
+            "max_batch": self.max_batch,
+            "batches": self.batches,
+            "texts": self.texts,
+            "avg_batch_size": round(self.texts / self.batches, 2) if self.batches else 0.0,
+            "batch_size_histogram": dict(self.histogram)
+        }
@@ -0,0 +1,155 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import unicodedata
+from typing import Dict, List, Optional
+import numpy as np
+from app.services.lru_cache import LRUCache
+
+
+def normalize_text(text: str) -> str:
+    """Unicode NFC + collapsed whitespace (tokenizers ignore whitespace runs)"""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+class EmbeddingCache:
+    """
+    Content-addressed embedding cache keyed by (model name, sha256 of normalized text).
+
+    Two tiers: a bounded in-memory LRU in front of a SQLite file that stores
+    vectors as raw float32/float16 bytes. The file remembers which model filled
+    it and is wiped automatically when EMBEDDING_MODEL changes.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        path: str,
+        memory_items: int = 10000,
+        dtype: str = "float32"
+    ):
+        if dtype not in ("float32", "float16"):
+            raise ValueError(f"Unsupported embedding cache dtype: {dtype}")
+        self.model_name = model_name
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.memory = LRUCache(maxsize=memory_items)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self.disk_hits = 0
+        self.disk_misses = 0
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+    def _db(self) -> sqlite3.Connection:
+        """Open (and if needed reset) the SQLite file on first use"""
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "model TEXT NOT NULL, digest TEXT NOT NULL, vector BLOB NOT NULL, "
+                "PRIMARY KEY (model, digest))"
+            )
+            row = conn.execute("SELECT value FROM meta WHERE key = 'model'").fetchone()
+            stored = row[0] if row else None
+            if stored != f"{self.model_name}:{self.dtype.name}":
+                if stored is not None:
+                    print(f"[embed-cache] Model changed ({stored} -> {self.model_name}), clearing cache")
+                conn.execute("DELETE FROM embeddings")
+                conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('model', ?)",
+                    (f"{self.model_name}:{self.dtype.name}",)
+                )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get_many(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """Cached vectors aligned with texts (None where missing)"""
+        keys = [self._key(t) for t in texts]
+        results: List[Optional[List[float]]] = [self.memory.get(k) for k in keys]
+
+        missing = list({k for k, r in zip(keys, results) if r is None})
+        if not missing:
+            return results
+
+        found: Dict[str, List[float]] = {}
+        try:
+            with self._lock:
+                conn = self._db()
+                # Stay well under SQLite's bound-parameter limit
+                for start in range(0, len(missing), 500):
+                    part = missing[start:start + 500]
+                    placeholders = ",".join("?" * len(part))
+                    rows = conn.execute(
+                        f"SELECT digest, vector FROM embeddings WHERE model = ? AND digest IN ({placeholders})",
+                        [self.model_name, *part]
+                    ).fetchall()
+                    for digest, blob in rows:
+                        found[digest] = np.frombuffer(blob, dtype=self.dtype).astype(np.float32).tolist()
+        except Exception as e:
+            # The cache must never break embedding: treat the lookup as all misses
+            print(f"[embed-cache] Read error: {str(e)}")
+            found = {}
+
+        self.disk_hits += len(found)
+        self.disk_misses += len(missing) - len(found)
+        for digest, vector in found.items():
+            self.memory.set(digest, vector)
+
+        return [r if r is not None else found.get(k) for k, r in zip(keys, results)]
+
+    def get(self, text: str) -> Optional[List[float]]:
+        return self.get_many([text])[0]
+
+    def put_many(self, texts: List[str], vectors: List[List[float]]) -> None:
+        rows = []
+        for text, vector in zip(texts, vectors):
+            if not vector:
+                continue
+            digest = self._key(text)
+            self.memory.set(digest, list(vector))
+            rows.append((self.model_name, digest, np.asarray(vector, dtype=self.dtype).tobytes()))
+
+        if not rows:
+            return
+        try:
+            with self._lock:
+                conn = self._db()
+                conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (model, digest, vector) VALUES (?, ?, ?)",
+                    rows
+                )
+                conn.commit()
+        except Exception as e:
+            # The cache must never break embedding
+            print(f"[embed-cache] Write error: {str(e)}")
+
+    def put(self, text: str, vector: List[float]) -> None:
+        self.put_many([text], [vector])
+
+    def stats(self) -> Dict:
+        memory = self.memory.stats()
+        lookups = memory["hits"] + memory["misses"]
+        hits = memory["hits"] + self.disk_hits
+        return {
+            "path": self.path,
+            "dtype": self.dtype.name,
+            "memory": memory,
+            "disk_hits": self.disk_hits,
+            "disk_misses": self.disk_misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -1,6 +1,13 @@
 from sentence_transformers import SentenceTransformer
 from app.config import settings
-from typing import List
+from app.services.embedding_batcher import EmbeddingBatcher
+from app.services.embedding_cache import EmbeddingCache, normalize_text
+from app.services.lru_cache import LRUCache
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import List, Optional
+import asyncio
+import threading
 
 class EmbeddingClient:
     """Local embedding using Sentence-Transformers"""
@@ -8,37 +15,144 @@ class EmbeddingClient:
     def __init__(self):
         self.model = None
         self.model_name = settings.EMBEDDING_MODEL
+        self._model_lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._batcher = EmbeddingBatcher(
+            self.aembed_batch,
+            max_wait_ms=settings.EMBEDDING_BATCH_MAX_WAIT_MS,
+            max_batch=settings.EMBEDDING_BATCH_MAX_SIZE
+        )
+        # Question vectors for /query, checked before batching or touching the executor
+        self.query_cache = LRUCache(
+            maxsize=settings.QUERY_EMBEDDING_CACHE_SIZE,
+            ttl=settings.QUERY_EMBEDDING_CACHE_TTL_SECONDS
+        )
+        self.cache: Optional[EmbeddingCache] = None
+        if settings.EMBEDDING_CACHE_ENABLED:
+            self.cache = EmbeddingCache(
+                self.model_name,
+                path=settings.EMBEDDING_CACHE_PATH,
+                memory_items=settings.EMBEDDING_CACHE_MEMORY_ITEMS,
+                dtype=settings.EMBEDDING_CACHE_DTYPE
+            )
 
     def _load_model(self):
         """Lazy load the model (only when first needed)"""
         if self.model is None:
-            print(f"[embedding] Loading model: {self.model_name}")
-            self.model = SentenceTransformer(self.model_name)
-            print(f"[embedding] Model loaded! Dimension: {self.model.get_sentence_embedding_dimension()}")
+            with self._model_lock:
+                if self.model is None:
+                    print(f"[embedding] Loading model: {self.model_name}")
+                    self.model = SentenceTransformer(self.model_name)
+                    print(f"[embedding] Model loaded! Dimension: {self.model.get_sentence_embedding_dimension()}")
         return self.model
 
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Dedicated threads for model.encode so torch never runs on the event loop"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=settings.EMBEDDING_EXECUTOR_WORKERS,
+                thread_name_prefix="embedding"
+            )
+        return self._executor
+
+    async def aembed(self, text: str) -> List[float]:
+        """
+        Async embed_text. Concurrent calls are micro-batched into one
+        model.encode on the embedding executor.
+        """
+        if not text or not text.strip():
+            return []
+        if self._batcher.max_batch <= 1:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), self.embed_text, text)
+        return await self._batcher.embed(text)
+
+    async def aembed_batch(self, texts: List[str], batch_size: Optional[int] = None) -> List[List[float]]:
+        """Async embed_batch: runs on the embedding executor"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._get_executor(), partial(self.embed_batch, texts, batch_size)
+        )
+
+    async def aembed_query(self, question: str) -> List[float]:
+        """aembed for user questions, memoized in the query LRU+TTL cache"""
+        key = (self.model_name, normalize_text(question))
+        cached = self.query_cache.get(key)
+        if cached is not None:
+            return cached
+
+        embedding = await self.aembed(question)
+        if embedding:
+            self.query_cache.set(key, embedding)
+        return embedding
+
+    def stats(self) -> dict:
+        """Embedding metrics for /metrics"""
+        return {
+            "model": self.model_name,
+            "executor_workers": settings.EMBEDDING_EXECUTOR_WORKERS,
+            "micro_batching": self._batcher.stats(),
+            "query_cache": self.query_cache.stats(),
+            "cache": self.cache.stats() if self.cache else None
+        }
+
+    async def close(self) -> None:
+        """Finish in-flight micro-batches, then stop executor threads (app shutdown)"""
+        await self._batcher.close()
+        self.shutdown()
+
+    def shutdown(self) -> None:
+        """Stop executor threads (called on app shutdown)"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        if self.cache is not None:
+            self.cache.close()
+
     def embed_text(self, text: str) -> List[float]:
         """Convert text to embedding vector"""
         try:
             if not text or not text.strip():
                 return []
 
+            if self.cache is not None:
+                cached = self.cache.get(text)
+                if cached is not None:
+                    return cached
+
             model = self._load_model()
-            embedding = model.encode(text, convert_to_numpy=True)
-            return embedding.tolist()
+            embedding = model.encode(text, convert_to_numpy=True).tolist()
+
+            if self.cache is not None:
+                self.cache.put(text, embedding)
+            return embedding
         except Exception as e:
             print(f"[embedding] Error: {repr(e)}")
             raise Exception(f"Embedding failed: {str(e)}")
 
-    def embed_batch(self, texts: List[str]) -> List[List[float]]:
+    def embed_batch(self, texts: List[str], batch_size: Optional[int] = None) -> List[List[float]]:
         """Convert multiple texts to embeddings (more efficient)"""
         try:
             if not texts:
                 return []
 
-            model = self._load_model()
-            embeddings = model.encode(texts, convert_to_numpy=True)
-            return [emb.tolist() for emb in embeddings]
+            results = self.cache.get_many(texts) if self.cache is not None else [None] * len(texts)
+
+            # Encode each distinct uncached text once (shared boilerplate pages etc.)
+            pending = list(dict.fromkeys(t for t, r in zip(texts, results) if r is None))
+            if pending:
+                model = self._load_model()
+                embeddings = model.encode(
+                    pending,
+                    batch_size=batch_size or settings.EMBEDDING_BATCH_SIZE,
+                    convert_to_numpy=True
+                )
+                computed = {t: emb.tolist() for t, emb in zip(pending, embeddings)}
+                if self.cache is not None:
+                    self.cache.put_many(pending, list(computed.values()))
+                results = [r if r is not None else computed[t] for t, r in zip(texts, results)]
+
+            return results
         except Exception as e:
             print(f"[embedding] Batch error: {repr(e)}")
             raise Exception(f"Batch embedding failed: {str(e)}")
@@ -0,0 +1,166 @@
+import asyncio
+from typing import Dict, List, Optional
+from app.config import settings
+from app.services.pdf_processor import pdf_processor
+from app.services.embedding_client import embedding_client
+from app.services.vector_store import vector_store
+from app.services.lexical_index import lexical_index
+from app.services.response_cache import response_cache
+
+
+class IngestionQueueFull(Exception):
+    """Raised when the ingestion queue has no room for another job"""
+
+
+class IngestionQueue:
+    """In-process worker pool for document ingestion (extract -> embed -> store)"""
+
+    def __init__(
+        self,
+        concurrency: Optional[int] = None,
+        max_size: Optional[int] = None
+    ):
+        self.concurrency = concurrency or settings.INGESTION_CONCURRENCY
+        self.max_size = max_size or settings.INGESTION_QUEUE_SIZE
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        # document_id -> {"stage", "chunks_done", "chunks_total"} for jobs not yet finished
+        self._progress: Dict[str, Dict] = {}
+
+    async def start(self) -> None:
+        """Create the queue and spawn workers (called on app startup)"""
+        if self._workers:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._workers = [
+            asyncio.create_task(self._worker(i)) for i in range(self.concurrency)
+        ]
+        print(f"[ingest] Started {self.concurrency} workers (queue size {self.max_size})")
+
+    async def stop(self) -> None:
+        """
+        Cancel workers (called on app shutdown). Queued and in-flight jobs
+        are lost with the process, so their documents are marked failed
+        instead of staying "processing" forever.
+        """
+        # Snapshot before cancelling: workers drop their job's progress on the way out
+        unfinished = list(self._progress)
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._progress.clear()
+        self._queue = None
+
+        for doc_id in unfinished:
+            try:
+                await asyncio.to_thread(vector_store.update_document_status, doc_id, "failed")
+            except Exception as e:
+                print(f"[ingest] Could not mark doc {doc_id[:8]} failed: {str(e)}")
+        if unfinished:
+            print(f"[ingest] Marked {len(unfinished)} unfinished documents failed")
+        print("[ingest] Workers stopped")
+
+    def is_full(self) -> bool:
+        return self._queue is not None and self._queue.full()
+
+    def enqueue(self, document_id: str, content: bytes, filename: str, is_pdf: bool) -> None:
+        """Queue a document for background processing"""
+        if self._queue is None:
+            raise Exception("Ingestion queue is not running")
+        try:
+            self._queue.put_nowait({
+                "document_id": document_id,
+                "content": content,
+                "filename": filename,
+                "is_pdf": is_pdf
+            })
+        except asyncio.QueueFull:
+            raise IngestionQueueFull(f"Ingestion queue is full ({self.max_size} jobs)")
+
+        self._progress[document_id] = {"stage": "queued", "chunks_done": 0, "chunks_total": 0}
+        print(f"[ingest] Queued doc {document_id[:8]} ({self._queue.qsize()} waiting)")
+
+    def get_progress(self, document_id: str) -> Optional[Dict]:
+        """Current stage and chunk counters, or None if the job is not in flight"""
+        progress = self._progress.get(document_id)
+        return dict(progress) if progress else None
+
+    async def _worker(self, worker_id: int) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._process(job)
+            except Exception as e:
+                print(f"[ingest] Worker {worker_id} error: {str(e)}")
+            finally:
+                self._progress.pop(job["document_id"], None)
+                self._queue.task_done()
+
+    async def _process(self, job: Dict) -> None:
+        doc_id = job["document_id"]
+        progress = self._progress.setdefault(
+            doc_id, {"stage": "queued", "chunks_done": 0, "chunks_total": 0}
+        )
+
+        try:
+            # Extract chunks with location metadata
+            progress["stage"] = "extracting"
+            if job["is_pdf"]:
+                chunks = await asyncio.to_thread(
+                    pdf_processor.extract_chunks, job["content"], job["filename"]
+                )
+            else:
+                text = job["content"].decode("utf-8", errors="ignore")
+                chunks = await asyncio.to_thread(
+                    pdf_processor.extract_text_chunks, text, job["filename"]
+                )
+            progress["chunks_total"] = len(chunks)
+
+            # Generate embeddings in batches
+            progress["stage"] = "embedding"
+            batch_size = settings.EMBEDDING_BATCH_SIZE
+            embeddings = []
+            for start in range(0, len(chunks), batch_size):
+                batch = chunks[start:start + batch_size]
+                embeddings.extend(
+                    await embedding_client.aembed_batch([c['text'] for c in batch], batch_size=batch_size)
+                )
+                progress["chunks_done"] = len(embeddings)
+
+            # Bulk insert
+            progress["stage"] = "storing"
+            chunk_ids = await vector_store.astore_chunks(doc_id, chunks, embeddings)
+
+            # BM25 index for hybrid retrieval (rebuilt lazily on first query if this fails)
+            try:
+                rows = [
+                    {
+                        "id": chunk_id,
+                        "chunk_text": c['text'],
+                        "chunk_number": c['chunk_number'],
+                        "chunk_index": c.get('chunk_index', c['chunk_number']),
+                        "page_number": c.get('page_number'),
+                        "line_start": c.get('line_start'),
+                        "line_end": c.get('line_end')
+                    }
+                    for chunk_id, c in zip(chunk_ids, chunks)
+                ]
+                await asyncio.to_thread(lexical_index.add_document, doc_id, rows)
+            except Exception as e:
+                print(f"[ingest] Lexical index failed for doc {doc_id[:8]}: {str(e)}")
+
+            # Answers/summaries built from an earlier version of this document are stale
+            response_cache.invalidate_document(doc_id)
+
+            await asyncio.to_thread(vector_store.update_document_status, doc_id, "ready")
+            print(f"[ingest] Doc {doc_id[:8]} ready ({len(chunks)} chunks)")
+        except Exception as e:
+            print(f"[ingest] Doc {doc_id[:8]} failed: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            await asyncio.to_thread(vector_store.update_document_status, doc_id, "failed")
+
+
+# Singleton instance
+ingestion_queue = IngestionQueue()
@@ -0,0 +1,237 @@
+import bisect
+import json
+import math
+import os
+import re
+from typing import Dict, List, Optional, Set, Tuple
+from app.config import settings
+from app.services.document_index_store import DocumentIndexStore, ROW_FIELDS
+
+# Bumped when the on-disk layout changes; older files are rebuilt lazily
+INDEX_VERSION = 2
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_QUERY_TOKEN_RE = re.compile(r"\w+\*?", re.UNICODE)
+
+
+def fold(text: str) -> str:
+    """
+    Turkish-aware case folding.
+
+    str.lower() turns 'İ' into 'i' + combining dot (which splits tokens) and
+    'I' into 'i' rather than 'ı'. We apply the Turkish rules first, then
+    conflate dotted/dotless i so 'İSTANBUL' matches 'istanbul' and 'IŞIK'
+    matches 'ışık' as well as 'işik' typed on a non-Turkish keyboard.
+    """
+    return text.replace("İ", "i").replace("I", "ı").lower().replace("ı", "i")
+
+
+def tokenize_spans(text: str) -> List[Tuple[str, int, int]]:
+    """(folded token, start, end) with character offsets into `text`"""
+    return [(fold(m.group()), m.start(), m.end()) for m in _TOKEN_RE.finditer(text)]
+
+
+def tokenize(text: str) -> List[str]:
+    """Folded word tokens"""
+    return [fold(t) for t in _TOKEN_RE.findall(text)]
+
+
+def parse_keyword_query(query: str) -> List[Tuple[str, bool]]:
+    """
+    Split a keyword query into phrase slots of (folded term, is_prefix).
+
+    One word is an exact-term query, several words (quoted or not) are a
+    phrase, and a trailing '*' makes that word a prefix: `yapay zek*`.
+    """
+    slots = []
+    for token in _QUERY_TOKEN_RE.findall(query):
+        is_prefix = token.endswith("*")
+        slots.append((fold(token.rstrip("*")), is_prefix))
+    return slots
+
+
+class BM25Document:
+    """
+    Positional inverted index over one document's chunks.
+
+    Stores term -> {row: [token positions]} plus chunk lengths. BM25 needs
+    corpus statistics (N, df, avgdl); these are summed across whichever
+    documents a query targets, so per-document indexes combine without
+    rebuilding. Positions serve phrase queries.
+    """
+
+    def __init__(self, rows: List[Dict], postings: Dict[str, Dict[int, List[int]]], lengths: List[int]):
+        self.rows = rows
+        self.postings = postings
+        self.lengths = lengths
+        self._vocabulary: Optional[List[str]] = None
+
+    @classmethod
+    def build(cls, rows: List[Dict]) -> "BM25Document":
+        kept_rows = [{k: row.get(k) for k in ROW_FIELDS} for row in rows]
+        postings: Dict[str, Dict[int, List[int]]] = {}
+        lengths = []
+        for i, row in enumerate(kept_rows):
+            tokens = tokenize(row.get("chunk_text") or "")
+            lengths.append(len(tokens))
+            for pos, term in enumerate(tokens):
+                postings.setdefault(term, {}).setdefault(i, []).append(pos)
+        return cls(kept_rows, postings, lengths)
+
+    @property
+    def total_length(self) -> int:
+        return sum(self.lengths)
+
+    def expand(self, term: str, is_prefix: bool) -> List[str]:
+        """Indexed terms matching an exact term or a prefix"""
+        if not is_prefix:
+            return [term] if term in self.postings else []
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self.postings)
+        start = bisect.bisect_left(self._vocabulary, term)
+        end = bisect.bisect_left(self._vocabulary, term + "\U0010ffff")
+        return self._vocabulary[start:end]
+
+    def match(self, slots: List[Tuple[str, bool]]) -> Dict[int, List[int]]:
+        """row -> start positions where all slots occur consecutively"""
+        slot_positions: List[Dict[int, Set[int]]] = []
+        for term, is_prefix in slots:
+            positions: Dict[int, Set[int]] = {}
+            for expanded in self.expand(term, is_prefix):
+                for row, pos in self.postings[expanded].items():
+                    positions.setdefault(row, set()).update(pos)
+            if not positions:
+                return {}
+            slot_positions.append(positions)
+
+        matches: Dict[int, List[int]] = {}
+        for row, first in slot_positions[0].items():
+            starts = sorted(
+                p for p in first
+                if all(p + k in slot_positions[k].get(row, ()) for k in range(1, len(slot_positions)))
+            )
+            if starts:
+                matches[row] = starts
+        return matches
+
+    def save(self, path_prefix: str) -> None:
+        """Persist as <prefix>.json"""
+        path = f"{path_prefix}.json"
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({
+                "version": INDEX_VERSION,
+                "rows": self.rows,
+                "lengths": self.lengths,
+                "postings": {t: [[i, pos] for i, pos in p.items()] for t, p in self.postings.items()}
+            }, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path_prefix: str) -> Optional["BM25Document"]:
+        """Load a saved index, or None if it was written by an older version"""
+        with open(f"{path_prefix}.json", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != INDEX_VERSION:
+            return None
+        postings = {t: {i: pos for i, pos in p} for t, p in data["postings"].items()}
+        return cls(data["rows"], postings, data["lengths"])
+
+
+class LexicalIndex(DocumentIndexStore[BM25Document]):
+    """
+    Per-document BM25 / positional indexes persisted under `directory`.
+
+    Indexes are written once at ingest; documents ingested earlier are
+    indexed lazily from their stored chunks on first search.
+    """
+
+    tag = "lexical"
+
+    def __init__(self, directory: str, k1: float = 1.2, b: float = 0.75, max_loaded: int = 256):
+        super().__init__(directory, max_loaded)
+        self.k1 = k1
+        self.b = b
+
+    def _build(self, document_id: str, rows: List[Dict]) -> BM25Document:
+        return BM25Document.build([dict(row, document_id=row.get("document_id") or document_id) for row in rows])
+
+    def _load(self, prefix: str) -> Optional[BM25Document]:
+        return BM25Document.load(prefix)
+
+    def search(self, query: str, document_ids: List[str], limit: int = 10) -> List[Dict]:
+        """BM25 top-k over the given documents; rows carry a `bm25` score"""
+        terms = list(dict.fromkeys(tokenize(query)))
+        indexes = [idx for idx in (self.get(d) for d in document_ids) if idx is not None]
+        if not terms or not indexes:
+            return []
+
+        n_chunks = sum(len(idx.rows) for idx in indexes)
+        if n_chunks == 0:
+            return []
+        avgdl = (sum(idx.total_length for idx in indexes) / n_chunks) or 1.0
+        df = {t: sum(len(idx.postings.get(t, ())) for idx in indexes) for t in terms}
+        idf = {
+            t: math.log(1 + (n_chunks - df[t] + 0.5) / (df[t] + 0.5))
+            for t in terms if df[t]
+        }
+
+        scored = []
+        for idx in indexes:
+            scores: Dict[int, float] = {}
+            for term, weight in idf.items():
+                for i, positions in idx.postings.get(term, {}).items():
+                    tf = len(positions)
+                    norm = self.k1 * (1 - self.b + self.b * idx.lengths[i] / avgdl)
+                    scores[i] = scores.get(i, 0.0) + weight * tf * (self.k1 + 1) / (tf + norm)
+            scored.extend((score, idx, i) for i, score in scores.items())
+
+        scored.sort(key=lambda s: s[0], reverse=True)
+        results = []
+        for score, idx, i in scored[:limit]:
+            row = dict(idx.rows[i])
+            row["bm25"] = score
+            results.append(row)
+        return results
+
+    def keyword_search(
+        self,
+        document_ids: List[str],
+        query: str,
+        limit: int = 10,
+        offset: int = 0
+    ) -> Tuple[List[Dict], int]:
+        """
+        Exact-term, phrase or prefix search across documents.
+
+        Hits from all documents are ranked together by number of matches
+        (then document order, then chunk order) and paginated with
+        offset/limit. Returns (rows, total hits). Each row gets `match_count`
+        and `matches`: [start, end] character offsets into `chunk_text`.
+        """
+        slots = parse_keyword_query(query)
+        if not slots:
+            return [], 0
+
+        hits = []
+        for doc_order, document_id in enumerate(document_ids):
+            index = self.get(document_id)
+            if index is None:
+                continue
+            for i, starts in index.match(slots).items():
+                hits.append((-len(starts), doc_order, i, index, starts))
+
+        hits.sort(key=lambda h: h[:3])
+        last = len(slots) - 1
+        results = []
+        for _, _, i, index, starts in hits[offset:offset + limit]:
+            row = dict(index.rows[i])
+            spans = tokenize_spans(row.get("chunk_text") or "")
+            row["match_count"] = len(starts)
+            row["matches"] = [[spans[p][1], spans[p + last][2]] for p in starts]
+            results.append(row)
+        return results, len(hits)
+
+
+# Singleton instance
+lexical_index = LexicalIndex(settings.LEXICAL_INDEX_DIR, max_loaded=settings.LEXICAL_INDEX_MAX_LOADED)
@@ -0,0 +1,214 @@
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict, Literal, Optional
+
+Priority = Literal["interactive", "summary", "background"]
+
+# Highest first: a free slot always goes to the most urgent waiter
+PRIORITIES = ("interactive", "summary", "background")
+
+
+class SchedulerQueueFull(Exception):
+    """Raised when a priority class already has its maximum number of waiters"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class Reservation:
+    """
+    A place taken in an LLMScheduler ahead of the generation that uses it.
+
+    Streaming routes reserve before the response starts, so a full queue
+    is still a plain 503. The holder then either waits for the slot (claim
+    + wait) or gives the place back with cancel(), which is a no-op once
+    claimed. Routes always cancel explicitly; garbage collection of an
+    unclaimed reservation is only a last resort.
+    """
+
+    def __init__(self, scheduler: "LLMScheduler", priority: str, future: Optional[asyncio.Future] = None):
+        self.scheduler = scheduler
+        self.priority = priority
+        self.claimed = False
+        # None once the slot is ours (free slot at reserve time, or handed over)
+        self._future = future
+        self._reserved_at = time.monotonic()
+        self._finished = False
+        try:
+            self._loop: Optional[asyncio.AbstractEventLoop] = asyncio.get_running_loop()
+        except RuntimeError:
+            self._loop = None
+
+    def claim(self) -> None:
+        """Hand ownership to the generation: cancel() from the reserving side is ignored from now on"""
+        self.claimed = True
+
+    async def wait(self) -> None:
+        """Until the slot is ours"""
+        if self._future is not None:
+            await self._future
+            self._future = None
+            self.scheduler._admit(self.priority, time.monotonic() - self._reserved_at)
+
+    def cancel(self) -> None:
+        """Give the place back unless a generation claimed it"""
+        if not self.claimed:
+            self._abandon()
+
+    def _abandon(self) -> None:
+        if self._finished:
+            return
+        self._finished = True
+        future, self._future = self._future, None
+        if future is None or (future.done() and not future.cancelled()):
+            # Holding the slot (possibly handed over just now): pass it on
+            self.scheduler._release_slot()
+        else:
+            future.cancel()
+            queue = self.scheduler._waiters[self.priority]
+            if future in queue:
+                queue.remove(future)
+
+    def _release(self, held: float) -> None:
+        """End of the generation that used the slot"""
+        if not self._finished:
+            self._finished = True
+            self.scheduler.release(held)
+
+    def __del__(self):
+        # Last resort for a place nobody gave back. A finalizer can run at any
+        # point (or on another thread), so the release is handed to the loop.
+        if self.claimed or self._finished or self._loop is None or self._loop.is_closed():
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._abandon)
+        except RuntimeError:
+            pass
+
+
+class LLMScheduler:
+    """
+    Priority-aware admission control for one LLM upstream.
+
+    At most `max_concurrency` generations run at once. Further requests
+    wait in a FIFO queue per priority class; a freed slot goes to the
+    oldest waiter of the highest non-empty class, so a chat answer never
+    queues behind bulk summaries. A class whose queue already holds
+    `queue_limits[priority]` waiters rejects new requests with
+    SchedulerQueueFull, carrying a Retry-After estimate from the recent
+    generation time.
+    """
+
+    def __init__(self, max_concurrency: int, queue_limits: Dict[str, int], retry_after: int = 5):
+        self.max_concurrency = max(1, max_concurrency)
+        self.queue_limits = {p: queue_limits.get(p, 0) for p in PRIORITIES}
+        self.retry_after = retry_after
+        self._active = 0
+        self._waiters: Dict[str, Deque[asyncio.Future]] = {p: deque() for p in PRIORITIES}
+        self._admitted = {p: 0 for p in PRIORITIES}
+        self._rejected = {p: 0 for p in PRIORITIES}
+        self._wait_total = {p: 0.0 for p in PRIORITIES}
+        self._wait_max = {p: 0.0 for p in PRIORITIES}
+        # Exponential moving average of how long a slot is held (seconds)
+        self._service_time: Optional[float] = None
+
+    def queued(self) -> int:
+        return sum(len(q) for q in self._waiters.values())
+
+    def _retry_after(self) -> int:
+        """Seconds until a queued request would likely get a slot"""
+        if self._service_time is None:
+            return self.retry_after
+        backlog = (self.queued() + 1) / self.max_concurrency
+        return max(1, math.ceil(self._service_time * backlog))
+
+    def reserve(self, priority: Priority) -> Reservation:
+        """
+        Take a free slot or a place in the priority's queue without waiting;
+        raises SchedulerQueueFull when that queue is at its limit.
+        """
+        if priority not in self._waiters:
+            raise ValueError(f"Unknown priority: {priority}")
+
+        if self._active < self.max_concurrency and not self.queued():
+            self._active += 1
+            self._admit(priority, 0.0)
+            return Reservation(self, priority)
+
+        queue = self._waiters[priority]
+        if len(queue) >= self.queue_limits[priority]:
+            self._rejected[priority] += 1
+            raise SchedulerQueueFull(
+                f"Ollama meşgul: {priority} kuyruğu dolu ({len(queue)} bekleyen). "
+                "Lütfen biraz sonra tekrar deneyin.",
+                self._retry_after()
+            )
+
+        future = asyncio.get_running_loop().create_future()
+        queue.append(future)
+        return Reservation(self, priority, future)
+
+    async def acquire(self, priority: Priority, reservation: Optional[Reservation] = None) -> Reservation:
+        """Wait for a slot, using `reservation` if one was taken earlier"""
+        reservation = reservation or self.reserve(priority)
+        reservation.claim()
+        try:
+            await reservation.wait()
+        except asyncio.CancelledError:
+            reservation._abandon()
+            raise
+        return reservation
+
+    def _admit(self, priority: str, waited: float) -> None:
+        self._admitted[priority] += 1
+        self._wait_total[priority] += waited
+        self._wait_max[priority] = max(self._wait_max[priority], waited)
+
+    def release(self, held: Optional[float] = None) -> None:
+        if held is not None:
+            self._service_time = held if self._service_time is None else 0.8 * self._service_time + 0.2 * held
+        self._release_slot()
+
+    def _release_slot(self) -> None:
+        """Hand the slot straight to the next waiter, or free it"""
+        for priority in PRIORITIES:
+            queue = self._waiters[priority]
+            while queue:
+                future = queue.popleft()
+                if not future.done():
+                    future.set_result(None)
+                    return
+        self._active -= 1
+
+    @asynccontextmanager
+    async def slot(self, priority: Priority, reservation: Optional[Reservation] = None) -> AsyncIterator[None]:
+        """Hold one generation slot for the duration of the block"""
+        reservation = await self.acquire(priority, reservation)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            reservation._release(time.monotonic() - started)
+
+    def stats(self) -> Dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "active": self._active,
+            "queued": self.queued(),
+            "service_time_ms": round(self._service_time * 1000, 1) if self._service_time is not None else None,
+            "classes": {
+                p: {
+                    "queued": len(self._waiters[p]),
+                    "queue_limit": self.queue_limits[p],
+                    "admitted": self._admitted[p],
+                    "rejected": self._rejected[p],
+                    "wait_avg_ms": round(self._wait_total[p] / self._admitted[p] * 1000, 1) if self._admitted[p] else 0.0,
+                    "wait_max_ms": round(self._wait_max[p] * 1000, 1)
+                }
+                for p in PRIORITIES
+            }
+        }
@@ -0,0 +1,68 @@
+from typing import Dict, Optional
+from app.config import settings
+from app.services.lru_cache import LRUCache
+
+# Document fields served from the cache (enough for access and readiness checks)
+DOCUMENT_FIELDS = ["id", "user_id", "notebook_id", "filename", "status"]
+
+
+class MetadataCache:
+    """
+    Process-wide TTL cache of document and notebook ownership metadata.
+
+    Entries are bounded by an LRU and expire after a short TTL so other
+    workers' writes are picked up; writes made by this process invalidate
+    the affected entries immediately (status updates, deletes, renames,
+    notebook links).
+
+    A read that started before an invalidation must not put its (possibly
+    stale) row back: readers take `generation` before querying and pass it
+    to set_document, which drops the fill if anything was invalidated since.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = LRUCache(maxsize, ttl)
+        # Bumped by every invalidation
+        self.generation = 0
+
+    # ---------- documents ----------
+
+    def get_document(self, document_id: str) -> Optional[Dict]:
+        return self._cache.get(("document", document_id))
+
+    def set_document(self, doc: Dict, generation: Optional[int] = None) -> None:
+        if not all(field in doc for field in DOCUMENT_FIELDS):
+            return
+        if generation is not None and generation != self.generation:
+            return
+        self._cache.set(("document", str(doc["id"])), {f: doc[f] for f in DOCUMENT_FIELDS})
+
+    def invalidate_document(self, document_id: str) -> None:
+        self.generation += 1
+        self._cache.pop(("document", document_id))
+
+    # ---------- notebooks ----------
+
+    def get_notebook_owner(self, notebook_id: str) -> Optional[str]:
+        return self._cache.get(("notebook", notebook_id))
+
+    def set_notebook_owner(self, notebook_id: str, user_id: str) -> None:
+        self._cache.set(("notebook", notebook_id), user_id)
+
+    def invalidate_notebook(self, notebook_id: str) -> None:
+        """Drop the notebook and every cached document linked to it"""
+        self.generation += 1
+        self._cache.pop(("notebook", notebook_id))
+        self._cache.pop_where(
+            lambda key, value: key[0] == "document" and value.get("notebook_id") == notebook_id
+        )
+
+    def stats(self) -> Dict:
+        return self._cache.stats()
+
+
+# Singleton instance
+metadata_cache = MetadataCache(
+    settings.METADATA_CACHE_SIZE,
+    settings.METADATA_CACHE_TTL_SECONDS
+)
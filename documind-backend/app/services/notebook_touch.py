@@ -0,0 +1,93 @@
+import asyncio
+from typing import Dict, List, Optional, Set
+from app.config import settings
+from app.database import supabase
+from app.services.postgres_client import postgres_client
+
+
+class NotebookTouchBuffer:
+    """
+    Write-behind buffer for notebook `updated_at` bumps.
+
+    Saving a chat message only marks its notebook dirty; a background task
+    flushes every `interval` seconds with a single UPDATE ... WHERE id IN
+    (...), so a burst of messages costs one write per notebook instead of
+    one per message. Failed flushes are retried on the next tick and
+    pending touches are flushed on shutdown. With interval 0 (or before
+    start()) touches are written immediately.
+    """
+
+    def __init__(self, interval: Optional[float] = None):
+        self.interval = settings.NOTEBOOK_TOUCH_FLUSH_SECONDS if interval is None else interval
+        self._dirty: Set[str] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._touches = 0
+        self._flushes = 0
+        self._written = 0
+
+    async def start(self) -> None:
+        """Start the periodic flush (called on app startup)"""
+        if self._task is not None or self.interval <= 0:
+            return
+        self._task = asyncio.create_task(self._run())
+        print(f"[touch] Flushing notebook updates every {self.interval}s")
+
+    async def stop(self) -> None:
+        """Stop the flush task and write what is still pending (called on app shutdown)"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+    async def touch(self, notebook_id: str) -> None:
+        """Mark a notebook as updated now"""
+        self._touches += 1
+        self._dirty.add(notebook_id)
+        if self._task is None:
+            await self.flush()
+
+    async def flush(self) -> int:
+        """Write all pending touches in one UPDATE; returns notebooks written"""
+        if not self._dirty:
+            return 0
+        notebook_ids = sorted(self._dirty)
+        self._dirty.clear()
+        try:
+            await self._write(notebook_ids)
+        except Exception as e:
+            # Keep them for the next tick
+            self._dirty.update(notebook_ids)
+            print(f"[touch] Flush of {len(notebook_ids)} notebooks failed: {str(e)}")
+            return 0
+        self._flushes += 1
+        self._written += len(notebook_ids)
+        return len(notebook_ids)
+
+    async def _write(self, notebook_ids: List[str]) -> None:
+        if postgres_client.available:
+            await postgres_client.touch_notebooks(notebook_ids)
+        else:
+            await asyncio.to_thread(
+                lambda: supabase.table("notebooks").update({
+                    "updated_at": "now()"
+                }).in_("id", notebook_ids).execute()
+            )
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.flush()
+
+    def stats(self) -> Dict:
+        return {
+            "interval_seconds": self.interval,
+            "pending": len(self._dirty),
+            "touches": self._touches,
+            "flushes": self._flushes,
+            "notebooks_written": self._written
+        }
+
+
+# Singleton instance
+notebook_touch_buffer = NotebookTouchBuffer()
@@ -1,14 +1,103 @@
+import asyncio
+import json
 import httpx
-from typing import Literal, Optional
+from typing import AsyncIterator, Dict, Iterable, List, Literal, Optional, Tuple
 from app.config import settings
+from app.services.response_cache import ResponseCache, response_cache
+from app.services.llm_scheduler import LLMScheduler, Priority, Reservation, SchedulerQueueFull
+
+EMPTY_SUMMARY_REPLY = "Özet oluşturmak için doküman içeriği bulunamadı."
+SMALLTALK_REPLY = "Merhaba! Ben DocuMind asistanıyım. Yüklediğin belgeler hakkında sorularını yanıtlayabilirim. Ne öğrenmek istersin?"
+
+
+class OllamaBusy(Exception):
+    """
+    Raised when Ollama cannot take the request now: its admission queue is
+    full or no pooled connection freed up within the pool timeout.
+    `retry_after` (seconds) goes into the 503's Retry-After header.
+    """
+
+    def __init__(self, message: str, retry_after: Optional[int] = None):
+        super().__init__(message)
+        self.retry_after = retry_after if retry_after is not None else settings.OLLAMA_RETRY_AFTER_SECONDS
+
+
+class _Flight:
+    """One shared upstream generation and the fragments it has produced so far"""
+
+    def __init__(self, key: str):
+        self.key = key
+        self.parts: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.task: Optional[asyncio.Task] = None
+        self.changed = asyncio.Event()
+
+    def _notify(self) -> None:
+        # Wake current waiters; later waiters get a fresh event
+        event, self.changed = self.changed, asyncio.Event()
+        event.set()
+
+    def publish(self, text: str) -> None:
+        self.parts.append(text)
+        self._notify()
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        self.done = True
+        self.error = error
+        self._notify()
 
 
 class OllamaClient:
-    """Local LLM chat using Ollama (RAG-friendly)"""
+    """
+    Local LLM chat using Ollama (RAG-friendly).
+
+    All calls share one pooled httpx.AsyncClient (opened on app startup,
+    closed on shutdown). OLLAMA_MAX_CONNECTIONS bounds concurrent
+    generations; further requests wait up to OLLAMA_POOL_TIMEOUT_SECONDS
+    for a connection and then fail with OllamaBusy.
+
+    Completions are cached by prompt fingerprint (see ResponseCache) and
+    tagged with the documents they were built from. Identical requests that
+    miss the cache while one is already running join that generation
+    instead of starting another (single-flight).
 
-    def __init__(self):
+    Generations are admitted by an LLMScheduler: OLLAMA_MAX_CONCURRENCY
+    run at once, the rest queue by priority (interactive answers before
+    summaries before background jobs) up to per-class limits.
+    """
+
+    def __init__(self, cache: Optional[ResponseCache] = None, scheduler: Optional[LLMScheduler] = None):
         self.base_url = settings.OLLAMA_BASE_URL.rstrip("/")
         self.model = settings.OLLAMA_MODEL
+        self.cache = cache if cache is not None else ResponseCache(
+            memory_items=settings.LLM_CACHE_MEMORY_ITEMS if settings.LLM_CACHE_ENABLED else 0,
+            ttl=settings.LLM_CACHE_TTL_SECONDS
+        )
+
+        self.limits = httpx.Limits(
+            max_connections=settings.OLLAMA_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.OLLAMA_MAX_KEEPALIVE,
+            keepalive_expiry=settings.OLLAMA_KEEPALIVE_SECONDS
+        )
+        self._client: Optional[httpx.AsyncClient] = None
+        self._in_flight = 0
+        self._requests = 0
+        self._busy_rejections = 0
+        self.scheduler = scheduler or LLMScheduler(
+            max_concurrency=settings.OLLAMA_MAX_CONCURRENCY,
+            queue_limits={
+                "interactive": settings.OLLAMA_QUEUE_INTERACTIVE,
+                "summary": settings.OLLAMA_QUEUE_SUMMARY,
+                "background": settings.OLLAMA_QUEUE_BACKGROUND
+            },
+            retry_after=settings.OLLAMA_RETRY_AFTER_SECONDS
+        )
+        # prompt fingerprint -> shared in-flight generation
+        self._flights: Dict[str, _Flight] = {}
+        self._flights_started = 0
+        self._coalesced = 0
 
         self.smalltalk = {
             "selam", "merhaba", "hello", "hi", "naber", "nasılsın",
@@ -21,8 +110,267 @@ class OllamaClient:
         self.max_ctx_chars_summary_long = 10000
 
         # Timeoutlar (artırıldı)
-        self.timeout_chat = httpx.Timeout(connect=10.0, read=600.0, write=600.0, pool=10.0)
-        self.timeout_summary = httpx.Timeout(connect=10.0, read=600.0, write=600.0, pool=10.0)
+        pool_wait = settings.OLLAMA_POOL_TIMEOUT_SECONDS
+        self.timeout_chat = httpx.Timeout(connect=10.0, read=600.0, write=600.0, pool=pool_wait)
+        self.timeout_summary = httpx.Timeout(connect=10.0, read=600.0, write=600.0, pool=pool_wait)
+        self.timeout_health = httpx.Timeout(5.0)
+
+    async def start(self) -> None:
+        """Open the shared connection pool (called on app startup)"""
+        self._http()
+        print(
+            f"[ollama] Connection pool ready (max {self.limits.max_connections}, "
+            f"keep-alive {self.limits.max_keepalive_connections})"
+        )
+
+    async def close(self) -> None:
+        """Close the shared connection pool (called on app shutdown)"""
+        for flight in list(self._flights.values()):
+            if flight.task is not None:
+                flight.task.cancel()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        self.cache.close()
+
+    def _http(self) -> httpx.AsyncClient:
+        """Shared pooled client, created on first use if start() was not called"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                limits=self.limits,
+                timeout=self.timeout_chat
+            )
+        return self._client
+
+    async def _generate(self, payload: Dict, timeout: httpx.Timeout) -> httpx.Response:
+        """POST /api/generate through the pool, mapping pool exhaustion to OllamaBusy"""
+        self._requests += 1
+        self._in_flight += 1
+        try:
+            resp = await self._http().post(f"{self.base_url}/api/generate", json=payload, timeout=timeout)
+        except httpx.PoolTimeout:
+            self._busy_rejections += 1
+            raise OllamaBusy("Ollama meşgul: tüm bağlantılar kullanımda. Lütfen biraz sonra tekrar deneyin.")
+        finally:
+            self._in_flight -= 1
+        resp.raise_for_status()
+        return resp
+
+    async def _stream_generate(self, payload: Dict, timeout: httpx.Timeout) -> AsyncIterator[Dict]:
+        """
+        POST /api/generate with stream=True and yield Ollama's NDJSON records.
+
+        Closing the generator early (client went away) closes the response,
+        which makes Ollama stop generating.
+        """
+        self._requests += 1
+        self._in_flight += 1
+        try:
+            try:
+                async with self._http().stream(
+                    "POST", f"{self.base_url}/api/generate", json=dict(payload, stream=True), timeout=timeout
+                ) as resp:
+                    resp.raise_for_status()
+                    async for line in resp.aiter_lines():
+                        if not line.strip():
+                            continue
+                        record = json.loads(line)
+                        if record.get("error"):
+                            raise RuntimeError(record["error"])
+                        yield record
+                        if record.get("done"):
+                            break
+            except httpx.PoolTimeout:
+                self._busy_rejections += 1
+                raise OllamaBusy("Ollama meşgul: tüm bağlantılar kullanımda. Lütfen biraz sonra tekrar deneyin.")
+        finally:
+            self._in_flight -= 1
+
+    async def _complete(
+        self,
+        payload: Dict,
+        timeout: httpx.Timeout,
+        document_ids: Iterable[str] = (),
+        priority: Priority = "interactive"
+    ) -> Tuple[str, bool]:
+        """Non-streaming completion through the response cache: (text, from_cache)"""
+        key = ResponseCache.key(payload)
+        cached = self.cache.get(key)
+        if cached is not None:
+            print(f"[ollama] Cache hit {key[:12]}")
+            return cached, True
+
+        flight = self._join_flight(key, payload, timeout, document_ids, priority, None, stream=False)
+        parts = [text async for text in self._follow(flight)]
+        return "".join(parts).strip(), False
+
+    async def _stream_complete(
+        self,
+        payload: Dict,
+        timeout: httpx.Timeout,
+        document_ids: Iterable[str] = (),
+        meta: Optional[Dict] = None,
+        priority: Priority = "interactive",
+        reservation: Optional[Reservation] = None
+    ) -> AsyncIterator[str]:
+        """
+        Streaming completion through the response cache. A hit is yielded in
+        one piece; a miss is cached only once the stream has completed.
+        `meta["cached"]` tells the caller which one happened. A reservation
+        is used by a new generation and given back otherwise.
+        """
+        meta = meta if meta is not None else {}
+        try:
+            key = ResponseCache.key(payload)
+            cached = self.cache.get(key)
+            meta["cached"] = cached is not None
+            if cached is not None:
+                print(f"[ollama] Cache hit {key[:12]}")
+                if reservation is not None:
+                    reservation.cancel()
+                yield cached
+                return
+
+            flight = self._join_flight(key, payload, timeout, document_ids, priority, reservation, stream=True)
+            async for text in self._follow(flight):
+                yield text
+        finally:
+            if reservation is not None:
+                reservation.cancel()
+
+    # ---------- single-flight ----------
+
+    def _join_flight(
+        self,
+        key: str,
+        payload: Dict,
+        timeout: httpx.Timeout,
+        document_ids: Iterable[str],
+        priority: Priority,
+        reservation: Optional[Reservation],
+        stream: bool
+    ) -> "_Flight":
+        """
+        The in-flight generation for `key`, starting one if there is none.
+
+        Identical concurrent requests (same prompt fingerprint) share one
+        upstream generation whether they stream or not; followers replay
+        what the leader has produced so far, then receive the rest live.
+        The generation is queued with the leader's priority (using the
+        leader's reservation if it has one); followers give theirs back.
+        """
+        flight = self._flights.get(key)
+        if flight is not None:
+            if reservation is not None:
+                reservation.cancel()
+            self._coalesced += 1
+            print(f"[ollama] Joined in-flight generation {key[:12]} ({flight.subscribers + 1} waiting)")
+            return flight
+
+        flight = _Flight(key)
+        self._flights[key] = flight
+        self._flights_started += 1
+        if reservation is not None:
+            reservation.claim()
+        flight.task = asyncio.create_task(
+            self._fly(flight, payload, timeout, list(document_ids), priority, reservation, stream)
+        )
+        return flight
+
+    async def _fly(
+        self,
+        flight: "_Flight",
+        payload: Dict,
+        timeout: httpx.Timeout,
+        document_ids: List[str],
+        priority: Priority,
+        reservation: Optional[Reservation],
+        stream: bool
+    ) -> None:
+        """Run one upstream generation once admitted, publishing fragments to every follower"""
+        try:
+            async with self.scheduler.slot(priority, reservation):
+                if stream:
+                    async for record in self._stream_generate(payload, timeout):
+                        if record.get("response"):
+                            flight.publish(record["response"])
+                else:
+                    resp = await self._generate(payload, timeout)
+                    data = resp.json()
+                    text = self._parse_ollama_response(data)
+                    if not text:
+                        raise RuntimeError(f"Unexpected Ollama response payload: {data}")
+                    flight.publish(text)
+
+            text = "".join(flight.parts).strip()
+            if text:
+                self.cache.put(flight.key, text, document_ids)
+            flight.finish()
+        except SchedulerQueueFull as e:
+            self._busy_rejections += 1
+            print(f"[ollama] Rejected {priority} request: queue full (retry after {e.retry_after}s)")
+            flight.finish(error=OllamaBusy(str(e), e.retry_after))
+        except asyncio.CancelledError:
+            flight.finish(error=RuntimeError("Generation cancelled"))
+        except Exception as e:
+            flight.finish(error=e)
+        finally:
+            if self._flights.get(flight.key) is flight:
+                del self._flights[flight.key]
+
+    async def _follow(self, flight: "_Flight") -> AsyncIterator[str]:
+        """
+        Yield a flight's fragments from the beginning. When the last
+        follower goes away before the end, the upstream request is cancelled
+        (closing the connection stops Ollama generating).
+        """
+        flight.subscribers += 1
+        index = 0
+        try:
+            while True:
+                while index < len(flight.parts):
+                    index += 1
+                    yield flight.parts[index - 1]
+                if flight.error is not None:
+                    raise flight.error
+                if flight.done:
+                    return
+                await flight.changed.wait()
+        finally:
+            flight.subscribers -= 1
+            if flight.subscribers == 0 and not flight.done and flight.task is not None:
+                if self._flights.get(flight.key) is flight:
+                    del self._flights[flight.key]
+                flight.task.cancel()
+
+    def reserve(self, priority: Priority) -> Reservation:
+        """
+        Take an admission place before a streaming response starts, so a full
+        queue surfaces as OllamaBusy (503 + Retry-After) rather than as an
+        error event inside a 200 stream. Pass it to stream_answer or
+        stream_summary; it is given back when no new generation needs it.
+        """
+        try:
+            return self.scheduler.reserve(priority)
+        except SchedulerQueueFull as e:
+            self._busy_rejections += 1
+            print(f"[ollama] Rejected {priority} request: queue full (retry after {e.retry_after}s)")
+            raise OllamaBusy(str(e), e.retry_after)
+
+    def stats(self) -> Dict:
+        return {
+            "max_connections": self.limits.max_connections,
+            "in_flight": self._in_flight,
+            "requests": self._requests,
+            "busy_rejections": self._busy_rejections,
+            "scheduler": self.scheduler.stats(),
+            "single_flight": {
+                "active": len(self._flights),
+                "started": self._flights_started,
+                "coalesced": self._coalesced
+            },
+            "response_cache": self.cache.stats()
+        }
 
     def _truncate(self, text: str, limit: int) -> str:
         if not text:
@@ -43,26 +391,17 @@ class OllamaClient:
 
         return ""
 
-    async def generate_answer(
+    def _answer_payload(
         self,
         question: str,
         context: str,
         system_prompt: Optional[str] = None,
-        sources_hint: Optional[str] = None,  # istersen “Kaynaklar: Page 5...” gibi eklersin
-    ) -> str:
-        """
-        Chat/Q&A: Belge sorularında sadece context'e dayanır.
-        Selamlaşma vb. küçük konuşmayı sadece context YOKSA serbest bırakır.
-        """
-
+        sources_hint: Optional[str] = None,
+    ) -> Dict:
+        """Prompt + options for a RAG answer (shared by generate_answer and stream_answer)"""
         q = (question or "").strip()
-        q_lower = q.lower()
         ctx = (context or "").strip()
 
-        # ✅ Selamlaşma istisnası: Context olsa bile smalltalk'a cevap ver
-        if q_lower in self.smalltalk:
-            return "Merhaba! Ben DocuMind asistanıyım. Yüklediğin belgeler hakkında sorularını yanıtlayabilirim. Ne öğrenmek istersin?"
-
         # Context çok uzunsa kırp
         ctx = self._truncate(ctx, self.max_ctx_chars_chat)
 
@@ -97,30 +436,60 @@ Cevap (sonunda kaynak belirt):
         # Debug
         print(f"[ollama] MODEL={self.model} CTX_LEN={len(ctx)} Q_LEN={len(q)}")
 
+        return {
+            "model": self.model,
+            "prompt": full_prompt,
+            "stream": False,
+            "options": {
+                "temperature": 0.3,
+                "top_p": 0.9,
+                "num_predict": 512,  # Düşürüldü - hız için
+            },
+        }
+
+    def _is_smalltalk(self, question: str) -> bool:
+        return (question or "").strip().lower() in self.smalltalk
+
+    async def generate_answer(
+        self,
+        question: str,
+        context: str,
+        system_prompt: Optional[str] = None,
+        sources_hint: Optional[str] = None,  # istersen “Kaynaklar: Page 5...” gibi eklersin
+        document_ids: Iterable[str] = (),
+        priority: Priority = "interactive",
+    ) -> str:
+        """
+        Chat/Q&A: Belge sorularında sadece context'e dayanır.
+        Selamlaşma vb. küçük konuşmayı sadece context YOKSA serbest bırakır.
+        """
+        answer, _ = await self.generate_answer_cached(
+            question, context, system_prompt, sources_hint, document_ids, priority
+        )
+        return answer
+
+    async def generate_answer_cached(
+        self,
+        question: str,
+        context: str,
+        system_prompt: Optional[str] = None,
+        sources_hint: Optional[str] = None,
+        document_ids: Iterable[str] = (),
+        priority: Priority = "interactive",
+    ) -> Tuple[str, bool]:
+        """generate_answer that also reports whether the response cache served it"""
+
+        # ✅ Selamlaşma istisnası: Context olsa bile smalltalk'a cevap ver
+        if self._is_smalltalk(question):
+            return SMALLTALK_REPLY, False
+
+        payload = self._answer_payload(question, context, system_prompt, sources_hint)
+
         try:
-            async with httpx.AsyncClient(timeout=self.timeout_chat) as client:
-                resp = await client.post(
-                    f"{self.base_url}/api/generate",
-                    json={
-                        "model": self.model,
-                        "prompt": full_prompt,
-                        "stream": False,
-                        "options": {
-                            "temperature": 0.3,
-                            "top_p": 0.9,
-                            "num_predict": 512,  # Düşürüldü - hız için
-                        },
-                    },
-                )
-                resp.raise_for_status()
-                data = resp.json()
-                text = self._parse_ollama_response(data)
-
-                if not text:
-                    raise RuntimeError(f"Unexpected Ollama response payload: {data}")
-
-                return text
+            return await self._complete(payload, self.timeout_chat, document_ids, priority)
 
+        except OllamaBusy:
+            raise
         except httpx.ConnectError:
             raise Exception("Ollama servisi çalışmıyor. Terminalde `ollama serve` açık mı?")
         except httpx.TimeoutException:
@@ -129,18 +498,51 @@ Cevap (sonunda kaynak belirt):
             print(f"[ollama] Error: {repr(e)}")
             raise Exception(f"Answer generation failed: {str(e)}")
 
-    async def generate_summary(
+    async def stream_answer(
         self,
-        content: str,
-        mode: Literal["short", "long"] = "short",
-        document_name: str = "",
-    ) -> str:
-        """Document summary: short/long"""
+        question: str,
+        context: str,
+        system_prompt: Optional[str] = None,
+        sources_hint: Optional[str] = None,
+        document_ids: Iterable[str] = (),
+        meta: Optional[Dict] = None,
+        priority: Priority = "interactive",
+        reservation: Optional[Reservation] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Same prompt as generate_answer, yielding text fragments as Ollama
+        produces them. Pass a dict as `meta` to learn whether the response
+        cache served the answer (`meta["cached"]`), and a reservation from
+        reserve() to generate with the place it holds.
+        """
+        if self._is_smalltalk(question):
+            if reservation is not None:
+                reservation.cancel()
+            if meta is not None:
+                meta["cached"] = False
+            yield SMALLTALK_REPLY
+            return
 
-        text = (content or "").strip()
-        if not text:
-            return "Özet oluşturmak için doküman içeriği bulunamadı."
+        payload = self._answer_payload(question, context, system_prompt, sources_hint)
+
+        try:
+            async for text in self._stream_complete(
+                payload, self.timeout_chat, document_ids, meta, priority, reservation
+            ):
+                yield text
+
+        except OllamaBusy:
+            raise
+        except httpx.ConnectError:
+            raise Exception("Ollama servisi çalışmıyor. Terminalde `ollama serve` açık mı?")
+        except httpx.TimeoutException:
+            raise Exception("Ollama timeout. Model yavaş olabilir veya context çok uzundur.")
+        except Exception as e:
+            print(f"[ollama] Stream error: {repr(e)}")
+            raise Exception(f"Answer generation failed: {str(e)}")
 
+    def _summary_payload(self, text: str, mode: Literal["short", "long"], document_name: str) -> Dict:
+        """Prompt + options for a document summary (shared by generate_summary and stream_summary)"""
         # Context limitleri mode'a göre
         if mode == "short":
             text = self._truncate(text, self.max_ctx_chars_summary_short)
@@ -179,30 +581,41 @@ Doküman İçeriği:
 
         print(f"[ollama] Summary mode={mode} CONTENT_LEN={len(text)} MODEL={self.model}")
 
+        return {
+            "model": self.model,
+            "prompt": full_prompt,
+            "stream": False,
+            "options": {
+                "temperature": temperature,
+                "top_p": 0.9,
+                "num_predict": num_predict,
+            },
+        }
+
+    async def generate_summary(
+        self,
+        content: str,
+        mode: Literal["short", "long"] = "short",
+        document_name: str = "",
+        document_id: Optional[str] = None,
+        priority: Priority = "summary",
+    ) -> str:
+        """Document summary: short/long"""
+
+        text = (content or "").strip()
+        if not text:
+            return EMPTY_SUMMARY_REPLY
+
+        payload = self._summary_payload(text, mode, document_name)
+
         try:
-            async with httpx.AsyncClient(timeout=self.timeout_summary) as client:
-                resp = await client.post(
-                    f"{self.base_url}/api/generate",
-                    json={
-                        "model": self.model,
-                        "prompt": full_prompt,
-                        "stream": False,
-                        "options": {
-                            "temperature": temperature,
-                            "top_p": 0.9,
-                            "num_predict": num_predict,
-                        },
-                    },
-                )
-                resp.raise_for_status()
-                data = resp.json()
-                out = self._parse_ollama_response(data)
-
-                if not out:
-                    raise RuntimeError(f"Unexpected Ollama response payload: {data}")
-
-                return out
+            out, _ = await self._complete(
+                payload, self.timeout_summary, [document_id] if document_id else (), priority
+            )
+            return out
 
+        except OllamaBusy:
+            raise
         except httpx.ConnectError:
             raise Exception("Ollama servisi çalışmıyor. `ollama serve` açık mı?")
         except httpx.TimeoutException:
@@ -211,14 +624,49 @@ Doküman İçeriği:
             print(f"[ollama] Summary error: {repr(e)}")
             raise Exception(f"Summary generation failed: {str(e)}")
 
+    async def stream_summary(
+        self,
+        content: str,
+        mode: Literal["short", "long"] = "short",
+        document_name: str = "",
+        document_id: Optional[str] = None,
+        priority: Priority = "summary",
+        reservation: Optional[Reservation] = None,
+    ) -> AsyncIterator[str]:
+        """Same prompt as generate_summary, yielding text fragments as Ollama produces them"""
+        text = (content or "").strip()
+        if not text:
+            if reservation is not None:
+                reservation.cancel()
+            yield EMPTY_SUMMARY_REPLY
+            return
+
+        payload = self._summary_payload(text, mode, document_name)
+
+        try:
+            async for fragment in self._stream_complete(
+                payload, self.timeout_summary, [document_id] if document_id else (),
+                priority=priority, reservation=reservation
+            ):
+                yield fragment
+
+        except OllamaBusy:
+            raise
+        except httpx.ConnectError:
+            raise Exception("Ollama servisi çalışmıyor. `ollama serve` açık mı?")
+        except httpx.TimeoutException:
+            raise Exception("Ollama timeout. Özet için içerik çok uzun olabilir.")
+        except Exception as e:
+            print(f"[ollama] Summary stream error: {repr(e)}")
+            raise Exception(f"Summary generation failed: {str(e)}")
+
     async def check_health(self) -> bool:
         """Check if Ollama is running"""
         try:
-            async with httpx.AsyncClient(timeout=httpx.Timeout(5.0)) as client:
-                r = await client.get(f"{self.base_url}/api/tags")
-                return r.status_code == 200
+            r = await self._http().get(f"{self.base_url}/api/tags", timeout=self.timeout_health)
+            return r.status_code == 200
         except Exception:
             return False
 
 
-ollama_client = OllamaClient()
+ollama_client = OllamaClient(cache=response_cache)
@@ -0,0 +1,303 @@
+import json
+import struct
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+import numpy as np
+from app.config import settings
+
+try:
+    import asyncpg
+except ImportError:  # Optional: without asyncpg every call goes through the Supabase REST client
+    asyncpg = None
+
+
+# document_chunks columns written by the COPY loader, in order
+CHUNK_COLUMNS = [
+    "id", "document_id", "chunk_text", "chunk_number", "chunk_index",
+    "page_number", "line_start", "line_end", "embedding"
+]
+
+
+def _encode_vector(value) -> bytes:
+    """pgvector binary format: int16 dim, int16 unused, dim x big-endian float32"""
+    vec = np.asarray(value, dtype=">f4")
+    return struct.pack(">HH", vec.shape[0], 0) + vec.tobytes()
+
+
+def _decode_vector(data: bytes) -> List[float]:
+    dim, _ = struct.unpack_from(">HH", data)
+    return np.frombuffer(data, dtype=">f4", count=dim, offset=4).astype(np.float32).tolist()
+
+
+def _plain(value: Any) -> Any:
+    """Match PostgREST JSON: UUIDs and timestamps become strings"""
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _row(record) -> Dict:
+    return {k: _plain(v) for k, v in record.items()}
+
+
+class PostgresClient:
+    """
+    Async, pooled Postgres access over DATABASE_URL (asyncpg).
+
+    Covers the hot queries (document lookup, chunk insert,
+    match_document_chunks, chat history) without a PostgREST round trip
+    or blocking the event loop. `available` is False when the pool is
+    disabled, asyncpg is missing or the connection failed; callers then
+    use the Supabase REST client.
+    """
+
+    def __init__(self):
+        self._pool = None
+
+    @property
+    def available(self) -> bool:
+        return self._pool is not None
+
+    async def connect(self) -> None:
+        """Open the pool (called on app startup)"""
+        if self._pool is not None or not settings.DATABASE_POOL_ENABLED:
+            return
+        if asyncpg is None:
+            print("[postgres] asyncpg is not installed, using Supabase REST")
+            return
+        if not settings.DATABASE_URL:
+            print("[postgres] DATABASE_URL is empty, using Supabase REST")
+            return
+        try:
+            self._pool = await asyncpg.create_pool(
+                settings.DATABASE_URL,
+                min_size=settings.DATABASE_POOL_MIN_SIZE,
+                max_size=settings.DATABASE_POOL_MAX_SIZE,
+                # Set to 0 behind PgBouncer in transaction mode (Supabase pooler port 6543)
+                statement_cache_size=settings.DATABASE_STATEMENT_CACHE_SIZE,
+                init=self._init_connection
+            )
+            print(
+                f"[postgres] Pool ready ({settings.DATABASE_POOL_MIN_SIZE}-"
+                f"{settings.DATABASE_POOL_MAX_SIZE} connections)"
+            )
+        except Exception as e:
+            print(f"[postgres] Pool unavailable, using Supabase REST: {str(e)}")
+            self._pool = None
+
+    async def close(self) -> None:
+        """Close the pool (called on app shutdown)"""
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+            print("[postgres] Pool closed")
+
+    @staticmethod
+    async def _init_connection(conn) -> None:
+        # json/jsonb <-> Python objects (chat_messages.sources)
+        for json_type in ("json", "jsonb"):
+            await conn.set_type_codec(json_type, encoder=json.dumps, decoder=json.loads, schema="pg_catalog")
+        # pgvector <-> list[float] in binary (needed by COPY); the extension may
+        # live in "public" or "extensions"
+        schema = await conn.fetchval(
+            "SELECT n.nspname FROM pg_type t JOIN pg_namespace n ON n.oid = t.typnamespace "
+            "WHERE t.typname = 'vector'"
+        )
+        if schema:
+            await conn.set_type_codec(
+                "vector", encoder=_encode_vector, decoder=_decode_vector, schema=schema, format="binary"
+            )
+
+    def stats(self) -> Dict:
+        if self._pool is None:
+            return {"enabled": False}
+        return {
+            "enabled": True,
+            "size": self._pool.get_size(),
+            "idle": self._pool.get_idle_size(),
+            "max_size": self._pool.get_max_size()
+        }
+
+    # ---------- documents ----------
+
+    async def get_document(self, document_id: str) -> Optional[Dict]:
+        record = await self._pool.fetchrow(
+            "SELECT * FROM documents WHERE id = $1", document_id
+        )
+        return _row(record) if record else None
+
+    async def get_documents(self, document_ids: List[str], columns: Optional[List[str]] = None) -> List[Dict]:
+        """`columns` are trusted names from code, not user input"""
+        select = ", ".join(columns) if columns else "*"
+        records = await self._pool.fetch(
+            f"SELECT {select} FROM documents WHERE id = ANY($1)", document_ids
+        )
+        return [_row(r) for r in records]
+
+    # ---------- chunks ----------
+
+    async def insert_chunks(self, rows: List[Dict]) -> None:
+        """Insert chunk rows (SupabaseVector.store_chunks shape) in one transaction"""
+        async with self._pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.executemany(
+                    "INSERT INTO document_chunks (id, document_id, chunk_text, chunk_number, "
+                    "chunk_index, page_number, line_start, line_end, embedding) "
+                    "VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9)",
+                    [
+                        (
+                            r["id"], r["document_id"], r["chunk_text"], r["chunk_number"],
+                            r["chunk_index"], r["page_number"], r["line_start"], r["line_end"],
+                            r["embedding"]
+                        )
+                        for r in rows
+                    ]
+                )
+
+    async def copy_chunks(self, document_id: str, rows: List[Dict]) -> None:
+        """
+        Bulk-load a document's chunks with binary COPY.
+
+        Runs in one transaction that first clears any existing chunks of the
+        document, so readers see either the old set or the complete new one,
+        never a half-loaded document.
+        """
+        async with self._pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute("DELETE FROM document_chunks WHERE document_id = $1", document_id)
+                await conn.copy_records_to_table(
+                    "document_chunks",
+                    records=[
+                        (
+                            UUID(r["id"]), UUID(r["document_id"]), r["chunk_text"], r["chunk_number"],
+                            r["chunk_index"], r["page_number"], r["line_start"], r["line_end"],
+                            r["embedding"]
+                        )
+                        for r in rows
+                    ],
+                    columns=CHUNK_COLUMNS
+                )
+
+    async def match_document_chunks(
+        self,
+        query_embedding: List[float],
+        match_threshold: float,
+        match_count: int,
+        document_ids: List[str]
+    ) -> List[Dict]:
+        records = await self._pool.fetch(
+            "SELECT * FROM match_document_chunks($1, $2, $3, $4)",
+            query_embedding, match_threshold, match_count, document_ids
+        )
+        return [_row(r) for r in records]
+
+    # ---------- notebooks ----------
+
+    async def list_notebooks_with_counts(
+        self,
+        user_id: str,
+        limit: Optional[int] = None,
+        cursor_created_at: Optional[str] = None,
+        cursor_id: Optional[str] = None
+    ) -> List[Dict]:
+        """Migration 002 RPC: one page of notebooks with document counts"""
+        records = await self._pool.fetch(
+            "SELECT * FROM list_notebooks_with_counts($1, $2, $3, $4)",
+            user_id, limit,
+            datetime.fromisoformat(cursor_created_at) if cursor_created_at else None,
+            cursor_id
+        )
+        return [_row(r) for r in records]
+
+    # ---------- chat history ----------
+
+    async def get_notebook_owner(self, notebook_id: str) -> Optional[str]:
+        return await self._pool.fetchval(
+            "SELECT user_id FROM notebooks WHERE id = $1", notebook_id
+        )
+
+    async def list_messages(
+        self,
+        notebook_id: str,
+        limit: int = 100,
+        before: Optional[Tuple[str, str]] = None,
+        after: Optional[Tuple[str, str]] = None,
+        since: Optional[str] = None
+    ) -> List[Dict]:
+        """
+        One page of messages, returned oldest first.
+
+        `before` / `after` are (created_at, id) keysets; `since` returns
+        messages created strictly after a timestamp. With neither `after`
+        nor `since` the newest page is returned. Served by
+        chat_messages_notebook_created_idx (migration 003).
+        """
+        columns = "SELECT id, role, content, sources, created_at FROM chat_messages WHERE notebook_id = $1"
+        if after:
+            records = await self._pool.fetch(
+                f"{columns} AND (created_at, id) > ($2, $3) ORDER BY created_at, id LIMIT $4",
+                notebook_id, datetime.fromisoformat(after[0]), after[1], limit
+            )
+        elif since:
+            records = await self._pool.fetch(
+                f"{columns} AND created_at > $2 ORDER BY created_at, id LIMIT $3",
+                notebook_id, datetime.fromisoformat(since), limit
+            )
+        elif before:
+            records = await self._pool.fetch(
+                f"{columns} AND (created_at, id) < ($2, $3) ORDER BY created_at DESC, id DESC LIMIT $4",
+                notebook_id, datetime.fromisoformat(before[0]), before[1], limit
+            )
+            records = list(reversed(records))
+        else:
+            records = await self._pool.fetch(
+                f"{columns} ORDER BY created_at DESC, id DESC LIMIT $2",
+                notebook_id, limit
+            )
+            records = list(reversed(records))
+        return [_row(r) for r in records]
+
+    async def insert_message(self, message: Dict) -> Dict:
+        """Insert one chat message (the notebook touch goes through notebook_touch_buffer)"""
+        return (await self.insert_messages([message]))[0]
+
+    async def insert_messages(self, messages: List[Dict]) -> List[Dict]:
+        """
+        Insert chat messages with one multi-row INSERT, in input order.
+
+        Rows without created_at get the database clock, a microsecond apart
+        in list order, so they sort the same way as single inserts.
+        """
+        values = []
+        args: List[Any] = []
+        for i, message in enumerate(messages):
+            n = len(args)
+            values.append(
+                f"(${n + 1}, ${n + 2}, ${n + 3}, ${n + 4}, ${n + 5}, "
+                f"COALESCE(${n + 6}, NOW() + interval '{i} microseconds'))"
+            )
+            created_at = message.get("created_at")
+            args.extend([
+                message["id"], message["notebook_id"], message["role"],
+                message["content"], message.get("sources"),
+                datetime.fromisoformat(created_at) if created_at else None
+            ])
+        records = await self._pool.fetch(
+            "INSERT INTO chat_messages (id, notebook_id, role, content, sources, created_at) "
+            f"VALUES {', '.join(values)} RETURNING *",
+            *args
+        )
+        by_id = {str(r["id"]): _row(r) for r in records}
+        return [by_id[str(m["id"])] for m in messages]
+
+    async def touch_notebooks(self, notebook_ids: List[str]) -> None:
+        await self._pool.execute(
+            "UPDATE notebooks SET updated_at = NOW() WHERE id = ANY($1)", notebook_ids
+        )
+
+
+# Singleton instance
+postgres_client = PostgresClient()
@@ -0,0 +1,176 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Optional
+from app.config import settings
+from app.services.lru_cache import LRUCache
+
+
+class ResponseCache:
+    """
+    Exact-match cache of LLM completions keyed by sha256 of (model, options, prompt).
+
+    A bounded in-memory LRU sits in front of an optional SQLite file (`path`
+    empty = memory only); both tiers honour `ttl`. Every entry remembers the
+    documents whose content went into the prompt, so deleting or
+    re-ingesting a document drops the answers built from it.
+    """
+
+    def __init__(self, path: str = "", memory_items: int = 512, ttl: Optional[float] = None):
+        self.path = path
+        self.ttl = ttl
+        # value: (response text, frozenset of document ids)
+        self.memory = LRUCache(maxsize=memory_items, ttl=ttl)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self.disk_hits = 0
+        self.invalidated = 0
+
+    @staticmethod
+    def key(payload: Dict) -> str:
+        """Fingerprint of everything that determines the completion"""
+        material = json.dumps(
+            {"model": payload.get("model"), "options": payload.get("options"), "prompt": payload.get("prompt")},
+            sort_keys=True,
+            ensure_ascii=False
+        )
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def _db(self) -> Optional[sqlite3.Connection]:
+        """Open the SQLite tier on first use (None when disabled)"""
+        if not self.path:
+            return None
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "digest TEXT PRIMARY KEY, response TEXT NOT NULL, expires_at REAL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS response_documents ("
+                "digest TEXT NOT NULL, document_id TEXT NOT NULL, PRIMARY KEY (digest, document_id))"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS response_documents_document_idx "
+                "ON response_documents (document_id)"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get(self, digest: str) -> Optional[str]:
+        entry = self.memory.get(digest)
+        if entry is not None:
+            return entry[0]
+
+        try:
+            with self._lock:
+                conn = self._db()
+                if conn is None:
+                    return None
+                row = conn.execute(
+                    "SELECT response, expires_at FROM responses WHERE digest = ?", (digest,)
+                ).fetchone()
+                if row is None:
+                    return None
+                response, expires_at = row
+                if expires_at is not None and expires_at <= time.time():
+                    conn.execute("DELETE FROM responses WHERE digest = ?", (digest,))
+                    conn.execute("DELETE FROM response_documents WHERE digest = ?", (digest,))
+                    conn.commit()
+                    return None
+                document_ids = frozenset(
+                    d for (d,) in conn.execute(
+                        "SELECT document_id FROM response_documents WHERE digest = ?", (digest,)
+                    )
+                )
+        except Exception as e:
+            # The cache must never break generation
+            print(f"[llm-cache] Read error: {str(e)}")
+            return None
+
+        self.disk_hits += 1
+        self.memory.set(digest, (response, document_ids))
+        return response
+
+    def put(self, digest: str, response: str, document_ids: Iterable[str] = ()) -> None:
+        document_ids = frozenset(str(d) for d in document_ids)
+        self.memory.set(digest, (response, document_ids))
+        try:
+            with self._lock:
+                conn = self._db()
+                if conn is None:
+                    return
+                expires_at = time.time() + self.ttl if self.ttl else None
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (digest, response, expires_at) VALUES (?, ?, ?)",
+                    (digest, response, expires_at)
+                )
+                conn.execute("DELETE FROM response_documents WHERE digest = ?", (digest,))
+                conn.executemany(
+                    "INSERT INTO response_documents (digest, document_id) VALUES (?, ?)",
+                    [(digest, d) for d in document_ids]
+                )
+                conn.commit()
+        except Exception as e:
+            print(f"[llm-cache] Write error: {str(e)}")
+
+    def invalidate_document(self, document_id: str) -> int:
+        """Drop every cached response built from a document; returns entries removed"""
+        document_id = str(document_id)
+        removed = self.memory.pop_where(lambda _, entry: document_id in entry[1])
+        try:
+            with self._lock:
+                conn = self._db()
+                if conn is not None:
+                    digests = [
+                        d for (d,) in conn.execute(
+                            "SELECT digest FROM response_documents WHERE document_id = ?", (document_id,)
+                        )
+                    ]
+                    for start in range(0, len(digests), 500):
+                        part = digests[start:start + 500]
+                        placeholders = ",".join("?" * len(part))
+                        conn.execute(f"DELETE FROM responses WHERE digest IN ({placeholders})", part)
+                        conn.execute(f"DELETE FROM response_documents WHERE digest IN ({placeholders})", part)
+                    conn.commit()
+                    removed = max(removed, len(digests))
+        except Exception as e:
+            print(f"[llm-cache] Invalidation error: {str(e)}")
+        if removed:
+            self.invalidated += removed
+            print(f"[llm-cache] Dropped {removed} responses for doc {document_id[:8]}")
+        return removed
+
+    def stats(self) -> Dict:
+        memory = self.memory.stats()
+        lookups = memory["hits"] + memory["misses"]
+        hits = memory["hits"] + self.disk_hits
+        return {
+            "path": self.path or None,
+            "memory": memory,
+            "disk_hits": self.disk_hits,
+            "invalidated": self.invalidated,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+# Singleton instance
+response_cache = ResponseCache(
+    path=settings.LLM_CACHE_PATH if settings.LLM_CACHE_ENABLED else "",
+    memory_items=settings.LLM_CACHE_MEMORY_ITEMS if settings.LLM_CACHE_ENABLED else 0,
+    ttl=settings.LLM_CACHE_TTL_SECONDS
+)
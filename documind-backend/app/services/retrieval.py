@@ -0,0 +1,84 @@
+import asyncio
+from typing import Dict, List, Tuple
+from app.config import settings
+from app.services.lexical_index import lexical_index
+from app.services.vector_store import vector_store
+
+
+def reciprocal_rank_fusion(result_lists: List[List[Dict]], k: int = 60, limit: int = 5) -> List[Dict]:
+    """
+    Merge ranked chunk lists by summing 1 / (k + rank) per chunk id.
+
+    Rows keep the fields of their first appearance (so vector similarity is
+    preserved when present) and gain an `rrf_score`.
+    """
+    fused: Dict[str, Dict] = {}
+    for results in result_lists:
+        for rank, row in enumerate(results, start=1):
+            key = str(row["id"])
+            entry = fused.get(key)
+            if entry is None:
+                entry = fused[key] = dict(row, rrf_score=0.0)
+            else:
+                for field, value in row.items():
+                    entry.setdefault(field, value)
+            entry["rrf_score"] += 1.0 / (k + rank)
+
+    ranked = sorted(fused.values(), key=lambda r: r["rrf_score"], reverse=True)
+    return ranked[:limit]
+
+
+async def ensure_lexical_indexed(document_ids: List[str]) -> None:
+    """Build BM25 indexes for documents ingested before the lexical index existed"""
+    for document_id in lexical_index.missing(document_ids):
+        rows = await vector_store.get_document_chunks(document_id)
+        await asyncio.to_thread(lexical_index.add_document, document_id, rows)
+
+
+async def hybrid_search(
+    question: str,
+    query_embedding: List[float],
+    document_ids: List[str],
+    limit: int = 5
+) -> List[Dict]:
+    """Run vector and BM25 retrieval concurrently and fuse them with RRF"""
+    candidates = limit * settings.HYBRID_CANDIDATE_MULTIPLIER
+
+    async def lexical() -> List[Dict]:
+        await ensure_lexical_indexed(document_ids)
+        return await asyncio.to_thread(lexical_index.search, question, document_ids, candidates)
+
+    dense, sparse = await asyncio.gather(
+        vector_store.vector_search(
+            query_embedding=query_embedding,
+            document_ids=document_ids,
+            limit=candidates
+        ),
+        lexical()
+    )
+    print(f"[hybrid] {len(dense)} vector + {len(sparse)} BM25 candidates")
+    return reciprocal_rank_fusion([dense, sparse], k=settings.HYBRID_RRF_K, limit=limit)
+
+
+async def keyword_search(
+    document_ids: List[str],
+    query: str,
+    limit: int = 10,
+    offset: int = 0
+) -> Tuple[List[Dict], int]:
+    """
+    Positional-index keyword search over several documents in one pass.
+
+    Falls back to the vector store's per-document text search (unranked,
+    merged in document order) if the index cannot be used.
+    """
+    try:
+        await ensure_lexical_indexed(document_ids)
+        return await asyncio.to_thread(lexical_index.keyword_search, document_ids, query, limit, offset)
+    except Exception as e:
+        print(f"[keyword] Index search failed, using vector store: {str(e)}")
+        rows: List[Dict] = []
+        for document_id in document_ids:
+            found = await vector_store.keyword_search(document_id=document_id, query=query, limit=offset + limit)
+            rows.extend(dict(r, document_id=document_id) for r in found)
+        return rows[offset:offset + limit], len(rows)
@@ -1,12 +1,29 @@
 from app.database import supabase
+from app.config import settings
+from app.services.vector_math import rank_rows
+from app.services.ann_index import LocalVectorIndex
+from app.services.postgres_client import postgres_client
+from app.services.metadata_cache import metadata_cache
 from typing import List, Dict, Optional
-import math
 from uuid import uuid4
+import asyncio
 
 class SupabaseVector:
+    """VectorStore backed by Supabase tables and pgvector RPCs"""
+
     def __init__(self, similarity_threshold: float = 0.3):  # Düşürüldü: 0.7 -> 0.3
         self.threshold = similarity_threshold
 
+        # Optional in-process ANN index; Supabase stays the source of truth
+        self.local_index: Optional[LocalVectorIndex] = None
+        if settings.LOCAL_VECTOR_INDEX_ENABLED:
+            self.local_index = LocalVectorIndex(
+                settings.LOCAL_VECTOR_INDEX_DIR,
+                nprobe=settings.LOCAL_VECTOR_INDEX_NPROBE,
+                threshold=similarity_threshold,
+                max_loaded=settings.LOCAL_VECTOR_INDEX_MAX_LOADED
+            )
+
     def store_chunk(
         self,
         document_id: str,
@@ -37,6 +54,118 @@ class SupabaseVector:
         except Exception as e:
             raise Exception(f"Failed to store chunk: {str(e)}")
 
+    def store_chunks(
+        self,
+        document_id: str,
+        chunks: List[Dict],
+        embeddings: List[List[float]],
+        batch_size: Optional[int] = None
+    ) -> List[str]:
+        """
+        Store many chunks with a few multi-row inserts.
+
+        `chunks` are pdf_processor dicts (text, chunk_number, page_number, ...)
+        aligned with `embeddings`. If any batch fails, rows already written
+        for this call are deleted so the document never keeps a partial set.
+        """
+        if len(chunks) != len(embeddings):
+            raise Exception(
+                f"Failed to store chunks: {len(chunks)} chunks but {len(embeddings)} embeddings"
+            )
+
+        batch_size = batch_size or settings.CHUNK_INSERT_BATCH_SIZE
+        rows = self._chunk_rows(document_id, chunks, embeddings)
+
+        written: List[str] = []
+        try:
+            for start in range(0, len(rows), batch_size):
+                batch = rows[start:start + batch_size]
+                supabase.table("document_chunks").insert(batch).execute()
+                written.extend(row["id"] for row in batch)
+            print(f"[vector] Stored {len(written)} chunks for doc {document_id[:8]} in batches of {batch_size}")
+        except Exception as e:
+            print(f"[vector] Bulk insert failed after {len(written)} rows: {str(e)}")
+            self._delete_chunks(written)
+            raise Exception(f"Failed to store chunks: {str(e)}")
+
+        self._update_local_index(document_id, rows)
+        return written
+
+    async def astore_chunks(
+        self,
+        document_id: str,
+        chunks: List[Dict],
+        embeddings: List[List[float]],
+        batch_size: Optional[int] = None
+    ) -> List[str]:
+        """
+        store_chunks over the asyncpg pool, else REST in a thread.
+
+        With CHUNK_BULK_COPY the rows are streamed with binary COPY (atomic
+        swap of the document's chunks); otherwise one multi-row INSERT
+        transaction is used.
+        """
+        if not postgres_client.available:
+            return await asyncio.to_thread(self.store_chunks, document_id, chunks, embeddings, batch_size)
+
+        if len(chunks) != len(embeddings):
+            raise Exception(
+                f"Failed to store chunks: {len(chunks)} chunks but {len(embeddings)} embeddings"
+            )
+        rows = self._chunk_rows(document_id, chunks, embeddings)
+        try:
+            if settings.CHUNK_BULK_COPY:
+                await postgres_client.copy_chunks(document_id, rows)
+            else:
+                await postgres_client.insert_chunks(rows)
+            print(f"[vector] Stored {len(rows)} chunks for doc {document_id[:8]} via pool")
+        except Exception as e:
+            raise Exception(f"Failed to store chunks: {str(e)}")
+
+        await asyncio.to_thread(self._update_local_index, document_id, rows)
+        return [row["id"] for row in rows]
+
+    @staticmethod
+    def _chunk_rows(document_id: str, chunks: List[Dict], embeddings: List[List[float]]) -> List[Dict]:
+        """document_chunks rows for pdf_processor chunks and their embeddings"""
+        rows = []
+        for chunk, embedding in zip(chunks, embeddings):
+            chunk_index = chunk.get('chunk_index')
+            rows.append({
+                "id": str(uuid4()),
+                "document_id": document_id,
+                "chunk_text": chunk['text'],
+                "chunk_number": chunk['chunk_number'],
+                "chunk_index": chunk_index if chunk_index is not None else chunk['chunk_number'],
+                "page_number": chunk.get('page_number'),
+                "line_start": chunk.get('line_start'),
+                "line_end": chunk.get('line_end'),
+                "embedding": embedding
+            })
+        return rows
+
+    def _update_local_index(self, document_id: str, rows: List[Dict]) -> None:
+        if self.local_index is not None:
+            try:
+                self.local_index.add_document(document_id, rows)
+            except Exception as e:
+                # Not fatal: the index is rebuilt from document_chunks on first search
+                print(f"[vector] Local index update failed: {str(e)}")
+
+    def _delete_chunks(self, chunk_ids: List[str]) -> None:
+        """Best-effort rollback of rows written by a failed bulk insert"""
+        if not chunk_ids:
+            return
+        batch_size = settings.CHUNK_INSERT_BATCH_SIZE
+        try:
+            for start in range(0, len(chunk_ids), batch_size):
+                supabase.table("document_chunks").delete().in_(
+                    "id", chunk_ids[start:start + batch_size]
+                ).execute()
+            print(f"[vector] Rolled back {len(chunk_ids)} chunks")
+        except Exception as e:
+            print(f"[vector] Rollback error: {str(e)}")
+
     async def vector_search(
         self,
         query_embedding: List[float],
@@ -44,6 +173,15 @@ class SupabaseVector:
         limit: int = 5
     ) -> List[Dict]:
         """Search similar chunks using pgvector cosine similarity"""
+        if self.local_index is not None:
+            try:
+                await self._ensure_indexed(document_ids)
+                results = self.local_index.search(query_embedding, document_ids, limit)
+                print(f"[vector] Local index found {len(results)} chunks")
+                return results
+            except Exception as e:
+                print(f"[vector] Local index search failed, using RPC: {str(e)}")
+
         try:
             print(f"[vector] Searching in {len(document_ids)} documents...")
             print(f"[vector] Document IDs: {document_ids}")
@@ -59,6 +197,13 @@ class SupabaseVector:
             print(f"[vector] RPC params: threshold={self.threshold}, count={limit}")
             print(f"[vector] filter_document_ids type: {type(document_ids)}, value: {document_ids}")
 
+            if postgres_client.available:
+                results = await postgres_client.match_document_chunks(
+                    query_embedding, self.threshold, limit, document_ids
+                )
+                print(f"[vector] Found {len(results)} chunks via pool")
+                return results
+
             response = supabase.rpc('match_document_chunks', params).execute()
 
             print(f"[vector] Response data: {response.data}")
@@ -79,33 +224,8 @@ class SupabaseVector:
 
                 rows = resp.data or []
 
-                # Compute cosine similarity locally
-                def cosine(a: List[float], b: List[float]) -> float:
-                    try:
-                        dot = 0.0
-                        na = 0.0
-                        nb = 0.0
-                        for x, y in zip(a, b):
-                            dot += x * y
-                            na += x * x
-                            nb += y * y
-                        if na == 0 or nb == 0:
-                            return 0.0
-                        return dot / (math.sqrt(na) * math.sqrt(nb))
-                    except Exception:
-                        return 0.0
-
-                scored = []
-                for r in rows:
-                    emb = r.get('embedding')
-                    if not emb:
-                        continue
-                    sim = cosine(query_embedding, emb)
-                    r['similarity'] = sim
-                    scored.append(r)
-
-                scored.sort(key=lambda x: x.get('similarity', 0), reverse=True)
-                result = scored[:limit]
+                # Vectorized cosine + top-k, same threshold as the RPC
+                result = rank_rows(query_embedding, rows, limit, self.threshold)
 
                 print(f"[vector] Local fallback found {len(result)} chunks")
                 return result
@@ -113,6 +233,16 @@ class SupabaseVector:
                 print(f"[vector] Local fallback failed: {str(e2)}")
                 raise Exception(f"Vector search failed: {err}")
 
+    async def _ensure_indexed(self, document_ids: List[str]) -> None:
+        """Build local indexes for documents ingested before the index existed"""
+        for document_id in self.local_index.missing(document_ids):
+            def build():
+                resp = supabase.table("document_chunks").select(
+                    "id, document_id, chunk_text, chunk_number, chunk_index, page_number, line_start, line_end, embedding"
+                ).eq("document_id", document_id).execute()
+                self.local_index.add_document(document_id, resp.data or [])
+            await asyncio.to_thread(build)
+
     async def keyword_search(
         self,
         document_id: str,
@@ -165,8 +295,94 @@ class SupabaseVector:
             print(f"[vector] Get chunks error: {str(e)}")
             raise Exception(f"Failed to get document chunks: {str(e)}")
 
+    def get_chunk(self, document_id: str, chunk_id: str) -> Optional[Dict]:
+        """Get a single chunk (without embedding)"""
+        try:
+            response = supabase.table("document_chunks").select(
+                "id, chunk_text, chunk_number, chunk_index, page_number, line_start, line_end"
+            ).eq("id", chunk_id).eq("document_id", document_id).execute()
+            return response.data[0] if response.data else None
+        except Exception as e:
+            print(f"[vector] Get chunk error: {str(e)}")
+            raise Exception(f"Failed to get chunk: {str(e)}")
+
+    def create_document(self, doc_data: Dict) -> None:
+        """Insert a document row (status=processing at upload)"""
+        supabase.table("documents").insert(doc_data).execute()
+
+    def list_documents(self, user_id: str) -> List[Dict]:
+        """All documents of a user, newest first"""
+        response = supabase.table("documents").select(
+            "id, filename, file_size, status, short_summary, long_summary, created_at, updated_at"
+        ).eq(
+            "user_id", user_id
+        ).order("created_at", desc=True).execute()
+        return response.data or []
+
+    async def aget_document(self, document_id: str) -> Optional[Dict]:
+        """get_document without blocking the event loop (pool, else REST in a thread)"""
+        if postgres_client.available:
+            try:
+                return await postgres_client.get_document(document_id)
+            except Exception as e:
+                print(f"[vector] Pool document lookup failed, using REST: {str(e)}")
+        return await asyncio.to_thread(self.get_document, document_id)
+
+    async def aget_documents(
+        self,
+        document_ids: List[str],
+        columns: Optional[List[str]] = None
+    ) -> List[Dict]:
+        """get_documents without blocking the event loop (pool, else REST in a thread)"""
+        if postgres_client.available and document_ids:
+            try:
+                return await postgres_client.get_documents(document_ids, columns)
+            except Exception as e:
+                print(f"[vector] Pool document lookup failed, using REST: {str(e)}")
+        return await asyncio.to_thread(self.get_documents, document_ids, columns)
+
+    def get_documents(
+        self,
+        document_ids: List[str],
+        columns: Optional[List[str]] = None
+    ) -> List[Dict]:
+        """
+        Metadata for several documents in one IN query (missing ids are skipped).
+
+        `columns` limits the selected fields (trusted names from code, not user input).
+        """
+        if not document_ids:
+            return []
+        response = supabase.table("documents").select(
+            ", ".join(columns) if columns else "*"
+        ).in_("id", document_ids).execute()
+        return response.data or []
+
+    def list_notebook_documents(self, notebook_id: str) -> List[Dict]:
+        """All documents linked to a notebook"""
+        response = supabase.table("documents").select("*").eq(
+            "notebook_id", notebook_id
+        ).order("created_at").execute()
+        return response.data or []
+
+    def log_query(self, query_id: str, user_id: str, question: str) -> None:
+        """Record a question in query history"""
+        supabase.table("queries").insert({
+            "id": query_id,
+            "user_id": user_id,
+            "question": question
+        }).execute()
+
+    def list_queries(self, user_id: str, limit: int = 10) -> List[Dict]:
+        """Recent questions of a user"""
+        response = supabase.table("queries").select("*").eq(
+            "user_id", user_id
+        ).order("created_at", desc=True).limit(limit).execute()
+        return response.data or []
+
     def update_document_status(self, document_id: str, status: str) -> None:
         """Update document status (processing, ready, failed)"""
+        metadata_cache.invalidate_document(document_id)
         try:
             supabase.table("documents").update({
                 "status": status,
@@ -196,6 +412,17 @@ class SupabaseVector:
             print(f"[vector] Summary save error: {str(e)}")
             raise Exception(f"Failed to save summary: {str(e)}")
 
+    def delete_document(self, document_id: str) -> None:
+        """Delete a document (chunks cascade) and drop its local index"""
+        metadata_cache.invalidate_document(document_id)
+        try:
+            supabase.table("documents").delete().eq("id", document_id).execute()
+        except Exception as e:
+            print(f"[vector] Delete document error: {str(e)}")
+            raise Exception(f"Failed to delete document: {str(e)}")
+        if self.local_index is not None:
+            self.local_index.remove_document(document_id)
+
     def get_document(self, document_id: str) -> Optional[Dict]:
         """Get document metadata including summaries"""
         try:
@@ -206,5 +433,3 @@ class SupabaseVector:
         except Exception as e:
             print(f"[vector] Get document error: {str(e)}")
             return None
-
-vector_store = SupabaseVector()
@@ -0,0 +1,105 @@
+import json
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+import numpy as np
+
+
+def parse_embedding(value: Union[str, Sequence[float], None]) -> Optional[Sequence[float]]:
+    """pgvector columns come back from PostgREST as '[0.1,0.2,...]' strings"""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return None
+    return value if len(value) else None
+
+
+def stack_embeddings(rows: List[Dict], key: str = "embedding") -> Tuple[np.ndarray, np.ndarray, List[int]]:
+    """
+    Stack row embeddings into a float32 matrix.
+
+    Returns (matrix, norms, row_indices) where row_indices maps matrix rows
+    back to `rows`. Rows with missing or mismatched-dimension vectors are skipped.
+    """
+    vectors = []
+    kept = []
+    dim = None
+    for i, row in enumerate(rows):
+        emb = parse_embedding(row.get(key))
+        if emb is None:
+            continue
+        if dim is None:
+            dim = len(emb)
+        if len(emb) != dim:
+            continue
+        vectors.append(emb)
+        kept.append(i)
+
+    if not vectors:
+        return np.zeros((0, 0), dtype=np.float32), np.zeros(0, dtype=np.float32), []
+
+    matrix = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1)
+    return matrix, norms, kept
+
+
+def cosine_top_k(
+    query: Sequence[float],
+    matrix: np.ndarray,
+    norms: np.ndarray,
+    limit: int,
+    threshold: Optional[float] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Top-k cosine similarity with one matrix-vector product and argpartition.
+
+    Matches match_document_chunks: only similarities strictly above
+    `threshold` are kept, best first. Returns (indices, similarities).
+    """
+    empty = (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32))
+    if limit <= 0 or matrix.shape[0] == 0:
+        return empty
+
+    q = np.asarray(query, dtype=np.float32)
+    if q.shape[0] != matrix.shape[1]:
+        return empty
+    q_norm = float(np.linalg.norm(q))
+    if q_norm == 0.0:
+        return empty
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sims = (matrix @ q) / (norms * q_norm)
+    sims = np.nan_to_num(sims, nan=0.0, posinf=0.0, neginf=0.0)
+
+    candidates = np.arange(sims.shape[0])
+    if threshold is not None:
+        candidates = np.flatnonzero(sims > threshold)
+    if candidates.size == 0:
+        return empty
+
+    if candidates.size > limit:
+        part = np.argpartition(-sims[candidates], limit - 1)[:limit]
+        candidates = candidates[part]
+
+    order = np.argsort(-sims[candidates], kind="stable")
+    top = candidates[order]
+    return top, sims[top]
+
+
+def rank_rows(
+    query_embedding: Sequence[float],
+    rows: List[Dict],
+    limit: int,
+    threshold: Optional[float] = None
+) -> List[Dict]:
+    """Score chunk rows against the query and return the best `limit` (RPC-shaped)"""
+    matrix, norms, kept = stack_embeddings(rows)
+    top, sims = cosine_top_k(query_embedding, matrix, norms, limit, threshold)
+
+    result = []
+    for idx, sim in zip(top.tolist(), sims.tolist()):
+        row = {k: v for k, v in rows[kept[idx]].items() if k != "embedding"}
+        row["similarity"] = sim
+        result.append(row)
+    return result
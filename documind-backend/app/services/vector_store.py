@@ -0,0 +1,92 @@
+from typing import Dict, List, Optional, Protocol
+from app.config import settings
+
+
+class VectorStore(Protocol):
+    """
+    Storage backend for documents, chunks and their embeddings.
+
+    Implementations: SupabaseVector (Supabase/pgvector, default) and
+    EmbeddedVector (SQLite + memory-mapped float32 files, no network).
+    Selected with VECTOR_STORE_BACKEND.
+    """
+
+    threshold: float
+
+    # Documents
+    def create_document(self, doc_data: Dict) -> None: ...
+    def get_document(self, document_id: str) -> Optional[Dict]: ...
+    def get_documents(self, document_ids: List[str], columns: Optional[List[str]] = None) -> List[Dict]: ...
+    async def aget_document(self, document_id: str) -> Optional[Dict]: ...
+    async def aget_documents(
+        self,
+        document_ids: List[str],
+        columns: Optional[List[str]] = None
+    ) -> List[Dict]: ...
+    def list_notebook_documents(self, notebook_id: str) -> List[Dict]: ...
+    def list_documents(self, user_id: str) -> List[Dict]: ...
+    def update_document_status(self, document_id: str, status: str) -> None: ...
+    def save_document_summary(
+        self,
+        document_id: str,
+        short_summary: Optional[str] = None,
+        long_summary: Optional[str] = None
+    ) -> None: ...
+    def delete_document(self, document_id: str) -> None: ...
+
+    # Chunks
+    def store_chunk(
+        self,
+        document_id: str,
+        chunk_text: str,
+        chunk_number: int,
+        page_number: Optional[int],
+        embedding: List[float],
+        chunk_index: Optional[int] = None,
+        line_start: Optional[int] = None,
+        line_end: Optional[int] = None
+    ) -> str: ...
+    def store_chunks(
+        self,
+        document_id: str,
+        chunks: List[Dict],
+        embeddings: List[List[float]],
+        batch_size: Optional[int] = None
+    ) -> List[str]: ...
+    async def astore_chunks(
+        self,
+        document_id: str,
+        chunks: List[Dict],
+        embeddings: List[List[float]],
+        batch_size: Optional[int] = None
+    ) -> List[str]: ...
+    async def get_document_chunks(self, document_id: str) -> List[Dict]: ...
+    def get_chunk(self, document_id: str, chunk_id: str) -> Optional[Dict]: ...
+
+    # Retrieval
+    async def vector_search(
+        self,
+        query_embedding: List[float],
+        document_ids: List[str],
+        limit: int = 5
+    ) -> List[Dict]: ...
+    async def keyword_search(self, document_id: str, query: str, limit: int = 10) -> List[Dict]: ...
+
+    # History
+    def log_query(self, query_id: str, user_id: str, question: str) -> None: ...
+    def list_queries(self, user_id: str, limit: int = 10) -> List[Dict]: ...
+
+
+def create_vector_store() -> VectorStore:
+    """Instantiate the backend named by VECTOR_STORE_BACKEND"""
+    backend = settings.VECTOR_STORE_BACKEND.lower()
+    if backend == "supabase":
+        from app.services.supabase_vector import SupabaseVector
+        return SupabaseVector()
+    if backend == "embedded":
+        from app.services.embedded_vector import EmbeddedVector
+        return EmbeddedVector(settings.EMBEDDED_STORE_DIR)
+    raise ValueError(f"Unknown VECTOR_STORE_BACKEND: {settings.VECTOR_STORE_BACKEND}")
+
+
+vector_store: VectorStore = create_vector_store()
@@ -0,0 +1,65 @@
+"""
+Microbenchmark: local IVF index vs exact NumPy search.
+
+Builds a per-document index over synthetic clustered 384-dim chunks and
+reports build time, per-query latency and recall@k against exact search.
+
+    python -m benchmarks.bench_ann_index --rows 20000 --queries 200
+"""
+
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from app.services.ann_index import LocalVectorIndex
+from app.services.vector_math import cosine_top_k
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--limit", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--nprobe", type=int, default=8)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(64, args.dim))
+    vectors = (centers[rng.integers(0, 64, args.rows)] + 0.3 * rng.normal(size=(args.rows, args.dim))).astype(np.float32)
+    rows = [{"id": str(i), "document_id": "doc", "embedding": v} for i, v in enumerate(vectors)]
+    queries = vectors[rng.integers(0, args.rows, args.queries)] + 0.05 * rng.normal(size=(args.queries, args.dim))
+    norms = np.linalg.norm(vectors, axis=1)
+
+    with tempfile.TemporaryDirectory() as directory:
+        index = LocalVectorIndex(directory, nprobe=args.nprobe)
+        start = time.perf_counter()
+        index.add_document("doc", rows)
+        build = time.perf_counter() - start
+
+        exact_time = 0.0
+        ann_time = 0.0
+        recall = 0.0
+        for q in queries:
+            start = time.perf_counter()
+            exact, _ = cosine_top_k(q, vectors, norms, args.limit)
+            exact_time += time.perf_counter() - start
+
+            start = time.perf_counter()
+            approx = index.search(q.tolist(), ["doc"], args.limit)
+            ann_time += time.perf_counter() - start
+
+            recall += len({str(i) for i in exact.tolist()} & {r["id"] for r in approx}) / args.limit
+
+    n = len(queries)
+    print(f"rows={args.rows} dim={args.dim} limit={args.limit} nprobe={args.nprobe}")
+    print(f"  build          : {build * 1000:9.1f} ms")
+    print(f"  exact / query  : {exact_time / n * 1000:9.3f} ms")
+    print(f"  ivf / query    : {ann_time / n * 1000:9.3f} ms")
+    print(f"  recall@{args.limit}       : {recall / n:9.3f}")
+
+
+if __name__ == "__main__":
+    main()
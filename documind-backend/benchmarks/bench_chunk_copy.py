@@ -0,0 +1,95 @@
+"""
+Benchmark: loading document_chunks via PostgREST vs binary COPY.
+
+Needs a real database: SUPABASE_URL/SUPABASE_KEY for the REST paths and
+DATABASE_URL (plus asyncpg) for COPY. Each path writes synthetic chunks for
+a scratch document, which is deleted afterwards.
+
+    python -m benchmarks.bench_chunk_copy --rows 2000 --per-row 200
+"""
+
+import argparse
+import asyncio
+import time
+from uuid import uuid4
+
+import numpy as np
+
+from app.config import settings
+from app.database import supabase
+from app.services.postgres_client import postgres_client
+from app.services.supabase_vector import SupabaseVector
+
+
+def make_chunks(n: int, dim: int):
+    rng = np.random.default_rng(0)
+    chunks = [
+        {"text": f"synthetic chunk {i} " + "lorem ipsum " * 40, "chunk_number": i, "page_number": 1}
+        for i in range(n)
+    ]
+    embeddings = rng.normal(size=(n, dim)).astype(np.float32).tolist()
+    return chunks, embeddings
+
+
+def scratch_document() -> str:
+    document_id = str(uuid4())
+    supabase.table("documents").insert({
+        "id": document_id,
+        "user_id": "benchmark",
+        "filename": "bench_chunk_copy.txt",
+        "status": "processing"
+    }).execute()
+    return document_id
+
+
+def report(label: str, rows: int, seconds: float) -> None:
+    print(f"  {label:<22}: {rows:6d} rows in {seconds:7.2f} s = {rows / seconds:9.0f} rows/s")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2000, help="rows for the batched REST and COPY paths")
+    parser.add_argument("--per-row", type=int, default=200, help="rows for the one-request-per-row store_chunk path")
+    parser.add_argument("--dim", type=int, default=384)
+    args = parser.parse_args()
+
+    vector = SupabaseVector()
+    settings.DATABASE_POOL_ENABLED = True
+    await postgres_client.connect()
+    documents = []
+
+    try:
+        print(f"dim={args.dim}")
+
+        chunks, embeddings = make_chunks(args.per_row, args.dim)
+        document_id = scratch_document()
+        documents.append(document_id)
+        start = time.perf_counter()
+        for chunk, embedding in zip(chunks, embeddings):
+            vector.store_chunk(document_id, chunk["text"], chunk["chunk_number"], chunk["page_number"], embedding)
+        report("store_chunk (REST/row)", args.per_row, time.perf_counter() - start)
+
+        chunks, embeddings = make_chunks(args.rows, args.dim)
+        document_id = scratch_document()
+        documents.append(document_id)
+        start = time.perf_counter()
+        vector.store_chunks(document_id, chunks, embeddings)
+        report("store_chunks (REST)", args.rows, time.perf_counter() - start)
+
+        if not postgres_client.available:
+            print("  binary COPY           : skipped (pool unavailable)")
+            return
+        document_id = scratch_document()
+        documents.append(document_id)
+        rows = vector._chunk_rows(document_id, chunks, embeddings)
+        start = time.perf_counter()
+        await postgres_client.copy_chunks(document_id, rows)
+        report("binary COPY (pool)", args.rows, time.perf_counter() - start)
+    finally:
+        for document_id in documents:
+            supabase.table("documents").delete().eq("id", document_id).execute()
+        await postgres_client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,100 @@
+"""
+Microbenchmark: SupabaseVector local fallback search.
+
+Compares the old pure-Python cosine loop with the NumPy implementation in
+app.services.vector_math on synthetic 384-dim chunks. No database needed.
+
+    python -m benchmarks.bench_vector_fallback --rows 5000 --repeat 5
+"""
+
+import argparse
+import math
+import random
+import time
+from typing import Dict, List
+
+from app.services.vector_math import cosine_top_k, rank_rows, stack_embeddings
+
+
+def legacy_rank(query_embedding: List[float], rows: List[Dict], limit: int) -> List[Dict]:
+    """The previous fallback: per-row zip/math.sqrt loop + full sort"""
+    def cosine(a: List[float], b: List[float]) -> float:
+        dot = 0.0
+        na = 0.0
+        nb = 0.0
+        for x, y in zip(a, b):
+            dot += x * y
+            na += x * x
+            nb += y * y
+        if na == 0 or nb == 0:
+            return 0.0
+        return dot / (math.sqrt(na) * math.sqrt(nb))
+
+    scored = []
+    for r in rows:
+        emb = r.get('embedding')
+        if not emb:
+            continue
+        r = dict(r, similarity=cosine(query_embedding, emb))
+        scored.append(r)
+
+    scored.sort(key=lambda x: x.get('similarity', 0), reverse=True)
+    return scored[:limit]
+
+
+def make_rows(n: int, dim: int, as_text: bool) -> List[Dict]:
+    rows = []
+    for i in range(n):
+        emb = [random.gauss(0, 1) for _ in range(dim)]
+        rows.append({
+            "id": f"chunk-{i}",
+            "document_id": "doc",
+            "chunk_text": "...",
+            "chunk_number": i,
+            # pgvector prints float4 values with ~7 significant digits
+            "embedding": "[" + ",".join(f"{x:.7g}" for x in emb) + "]" if as_text else emb
+        })
+    return rows
+
+
+def timed(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--limit", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    random.seed(0)
+    rows = make_rows(args.rows, args.dim, as_text=False)
+    text_rows = make_rows(args.rows, args.dim, as_text=True)
+    query = [random.gauss(0, 1) for _ in range(args.dim)]
+
+    legacy = timed(lambda: legacy_rank(query, rows, args.limit), args.repeat)
+    vectorized = timed(lambda: rank_rows(query, rows, args.limit), args.repeat)
+    matrix, norms, _ = stack_embeddings(rows)
+    scoring_only = timed(lambda: cosine_top_k(query, matrix, norms, args.limit), args.repeat)
+    vectorized_text = timed(lambda: rank_rows(query, text_rows, args.limit), args.repeat)
+
+    expected = [r["id"] for r in legacy_rank(query, rows, args.limit)]
+    actual = [r["id"] for r in rank_rows(query, rows, args.limit)]
+
+    print(f"rows={args.rows} dim={args.dim} limit={args.limit} (best of {args.repeat})")
+    print(f"  python loop          : {legacy * 1000:9.2f} ms")
+    print(f"  numpy (list rows)    : {vectorized * 1000:9.2f} ms  ({legacy / vectorized:.1f}x)")
+    print(f"  numpy (pre-stacked)  : {scoring_only * 1000:9.2f} ms  ({legacy / scoring_only:.0f}x, matmul + argpartition only)")
+    print(f"  numpy (PostgREST str): {vectorized_text * 1000:9.2f} ms  (includes parsing vector text)")
+    print(f"  same top-{args.limit}: {expected == actual}")
+
+
+if __name__ == "__main__":
+    main()
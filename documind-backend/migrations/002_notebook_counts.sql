@@ -0,0 +1,69 @@
+-- DocuMind Migration 002: Notebook list with document counts (no N+1)
+-- Run this in Supabase SQL Editor after migration 001
+-- The backend falls back to two plain queries if this function is missing.
+
+-- ============================================
+-- 1. Indexes for the aggregated notebook listing
+-- ============================================
+-- Keyset pagination: WHERE user_id = ? ORDER BY created_at DESC, id DESC
+-- (created_at never changes; updated_at moves on every chat touch, which
+-- would shift a notebook across a page boundary mid-listing)
+DROP INDEX IF EXISTS notebooks_user_updated_idx;
+CREATE INDEX IF NOT EXISTS notebooks_user_created_idx
+ON notebooks (user_id, created_at DESC, id DESC);
+
+-- Per-notebook document count / last activity
+CREATE INDEX IF NOT EXISTS documents_notebook_idx
+ON documents (notebook_id);
+
+-- ============================================
+-- 2. Notebooks with document counts (one round trip)
+-- ============================================
+-- p_limit NULL returns every notebook. For the next page pass the
+-- created_at and id of the last row as p_cursor_created_at / p_cursor_id.
+DROP FUNCTION IF EXISTS list_notebooks_with_counts(text, int, timestamptz, uuid);
+CREATE OR REPLACE FUNCTION list_notebooks_with_counts(
+    p_user_id text,
+    p_limit int DEFAULT NULL,
+    p_cursor_created_at timestamptz DEFAULT NULL,
+    p_cursor_id uuid DEFAULT NULL
+)
+RETURNS TABLE (
+    id uuid,
+    title text,
+    accent text,
+    created_at timestamptz,
+    updated_at timestamptz,
+    document_count bigint,
+    last_activity_at timestamptz
+)
+LANGUAGE sql
+STABLE
+AS $$
+    WITH page AS (
+        SELECT n.id, n.title, n.accent, n.created_at, n.updated_at
+        FROM notebooks n
+        WHERE n.user_id = p_user_id
+          AND (
+              p_cursor_created_at IS NULL
+              OR (n.created_at, n.id) < (p_cursor_created_at, p_cursor_id)
+          )
+        ORDER BY n.created_at DESC, n.id DESC
+        LIMIT p_limit
+    )
+    SELECT
+        page.id,
+        page.title,
+        page.accent,
+        page.created_at,
+        page.updated_at,
+        COALESCE(docs.document_count, 0) AS document_count,
+        GREATEST(page.updated_at, docs.last_document_at) AS last_activity_at
+    FROM page
+    LEFT JOIN LATERAL (
+        SELECT COUNT(*) AS document_count, MAX(d.updated_at) AS last_document_at
+        FROM documents d
+        WHERE d.notebook_id = page.id
+    ) docs ON TRUE
+    ORDER BY page.created_at DESC, page.id DESC;
+$$;
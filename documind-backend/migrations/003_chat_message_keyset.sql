@@ -0,0 +1,12 @@
+-- DocuMind Migration 003: Keyset pagination for chat history
+-- Run this in Supabase SQL Editor after migration 002
+
+-- ============================================
+-- 1. Index for paging / syncing a notebook's messages
+-- ============================================
+-- Serves all GET /notebooks/{id}/messages modes as an index range scan:
+--   newest page:  WHERE notebook_id = ? ORDER BY created_at DESC, id DESC LIMIT n
+--   before:       ... AND (created_at, id) < (?, ?) ORDER BY created_at DESC, id DESC
+--   after/since:  ... AND (created_at, id) > (?, ?) ORDER BY created_at, id
+CREATE INDEX IF NOT EXISTS chat_messages_notebook_created_idx
+ON chat_messages (notebook_id, created_at, id);
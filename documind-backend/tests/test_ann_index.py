@@ -0,0 +1,83 @@
+"""
+DocuMind - Local ANN Index Unit Tests
+
+Test framework: pytest (index files in tmp_path)
+"""
+
+import numpy as np
+import pytest
+
+
+def make_rows(n, dim, document_id="doc-1", seed=0):
+    rng = np.random.default_rng(seed)
+    # Clustered data so IVF lists are meaningful
+    centers = rng.normal(size=(8, dim))
+    vectors = centers[rng.integers(0, 8, n)] + 0.1 * rng.normal(size=(n, dim))
+    return [
+        {"id": f"{document_id}-{i}", "document_id": document_id, "chunk_text": f"text {i}",
+         "chunk_number": i, "embedding": v.tolist()}
+        for i, v in enumerate(vectors)
+    ]
+
+
+class TestLocalVectorIndex:
+    """Test cases for the per-document IVF index"""
+
+    def test_recall_against_exact_search(self, tmp_path):
+        """IVF top-10 mostly agrees with exact cosine ranking"""
+        from app.services.ann_index import LocalVectorIndex
+        from app.services.vector_math import rank_rows
+
+        rows = make_rows(2000, 32)
+        index = LocalVectorIndex(str(tmp_path), nprobe=8)
+        index.add_document("doc-1", rows)
+        assert index.get("doc-1").centroids is not None
+
+        query = rows[5]["embedding"]
+        exact = {r["id"] for r in rank_rows(query, rows, 10)}
+        approx = index.search(query, ["doc-1"], limit=10)
+
+        assert approx[0]["id"] == "doc-1-5"
+        assert "embedding" not in approx[0]
+        assert len(exact & {r["id"] for r in approx}) >= 8
+
+    def test_persists_and_merges_documents(self, tmp_path):
+        """Indexes reload from disk and multi-document results are merged by similarity"""
+        from app.services.ann_index import LocalVectorIndex
+
+        LocalVectorIndex(str(tmp_path)).add_document("doc-a", [
+            {"id": "a1", "document_id": "doc-a", "embedding": [1.0, 0.0]},
+        ])
+        LocalVectorIndex(str(tmp_path)).add_document("doc-b", [
+            {"id": "b1", "document_id": "doc-b", "embedding": "[0.8,0.6]"},
+        ])
+
+        reopened = LocalVectorIndex(str(tmp_path), threshold=0.3)
+        result = reopened.search([1.0, 0.0], ["doc-a", "doc-b"], limit=5)
+
+        assert [r["id"] for r in result] == ["a1", "b1"]
+        assert result[1]["similarity"] == pytest.approx(0.8, abs=1e-6)
+
+    def test_remove_document(self, tmp_path):
+        """Deleted documents disappear from memory and disk"""
+        from app.services.ann_index import LocalVectorIndex
+
+        index = LocalVectorIndex(str(tmp_path))
+        index.add_document("doc-a", [{"id": "a1", "document_id": "doc-a", "embedding": [1.0, 0.0]}])
+        index.remove_document("doc-a")
+
+        assert index.missing(["doc-a"]) == ["doc-a"]
+        assert LocalVectorIndex(str(tmp_path)).search([1.0, 0.0], ["doc-a"]) == []
+
+    def test_loaded_indexes_are_bounded(self, tmp_path):
+        """Only max_loaded indexes stay in memory; evicted ones reload from disk"""
+        from app.services.ann_index import LocalVectorIndex
+
+        index = LocalVectorIndex(str(tmp_path), max_loaded=1)
+        index.add_document("doc-a", [{"id": "a1", "document_id": "doc-a", "embedding": [1.0, 0.0]}])
+        index.add_document("doc-b", [{"id": "b1", "document_id": "doc-b", "embedding": [0.0, 1.0]}])
+        assert index.stats()["size"] == 1
+
+        result = index.search([1.0, 0.0], ["doc-a", "doc-b"], limit=5)
+        assert result[0]["id"] == "a1"
+        assert index.stats()["size"] == 1
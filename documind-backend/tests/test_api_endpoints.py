@@ -50,7 +50,7 @@ class TestDocumentEndpoints:
             )
 
             # Note: Actual response depends on implementation
-            assert response.status_code in [200, 201, 422]
+            assert response.status_code in [200, 201, 202, 422]
 
     def test_upload_invalid_file_type(self, client):
         """Test upload with unsupported file type"""
@@ -383,7 +383,7 @@ class TestEdgeCases:
         )
 
         # Should either accept or reject with size limit error
-        assert response.status_code in [200, 201, 400, 413, 422]
+        assert response.status_code in [200, 201, 202, 400, 413, 422]
 
 
 # ==================== HEALTH CHECK TESTS ====================
@@ -0,0 +1,96 @@
+"""
+DocuMind - Document Loader Unit Tests
+
+Test framework: pytest + pytest-asyncio (vector store mocked)
+"""
+
+import pytest
+from unittest.mock import patch, AsyncMock
+
+
+def doc(doc_id, status="ready"):
+    return {"id": doc_id, "user_id": "user-1", "filename": f"{doc_id}.txt", "status": status}
+
+
+class TestDocumentLoader:
+    """Test cases for the request-scoped batched metadata loader"""
+
+    @pytest.fixture(autouse=True)
+    def empty_metadata_cache(self):
+        from app.services.metadata_cache import MetadataCache
+        with patch('app.services.document_loader.metadata_cache', MetadataCache(maxsize=10, ttl=60)):
+            yield
+
+    @pytest.mark.asyncio
+    async def test_one_query_for_many_ids(self):
+        """Unseen ids are fetched with one IN query; repeats are memoized"""
+        from app.services.document_loader import DocumentLoader, META_COLUMNS
+
+        with patch('app.services.document_loader.vector_store') as mock_store:
+            mock_store.aget_documents = AsyncMock(return_value=[doc("b"), doc("a")])
+            loader = DocumentLoader()
+
+            docs = await loader.load_many(["a", "b", "missing", "a"])
+            again = await loader.load("b")
+            missing = await loader.load("missing")
+
+        mock_store.aget_documents.assert_awaited_once_with(["a", "b", "missing"], META_COLUMNS)
+        assert list(docs) == ["a", "b", "missing"]
+        assert docs["missing"] is None and missing is None
+        assert again["filename"] == "b.txt"
+        assert loader.queries == 1
+
+    @pytest.mark.asyncio
+    async def test_invalidation_wins_over_in_flight_fill(self):
+        """A row read before a status update is not cached after it"""
+        from app.services import document_loader
+        from app.services.document_loader import DocumentLoader
+
+        cache = document_loader.metadata_cache
+        stale = dict(doc("a", status="processing"), notebook_id=None)
+
+        async def read_then_invalidate(ids, columns):
+            # Ingestion marks the document ready while this read is in flight
+            cache.invalidate_document("a")
+            return [stale]
+
+        with patch('app.services.document_loader.vector_store') as mock_store:
+            mock_store.aget_documents = AsyncMock(side_effect=read_then_invalidate)
+            await DocumentLoader().load("a")
+            assert cache.get_document("a") is None
+
+            mock_store.aget_documents = AsyncMock(return_value=[dict(doc("a"), notebook_id=None)])
+            await DocumentLoader().load("a")
+        assert cache.get_document("a")["status"] == "ready"
+
+    @pytest.mark.asyncio
+    async def test_only_new_ids_are_fetched(self):
+        """A later call queries just the ids not seen (or primed) before"""
+        from app.services.document_loader import DocumentLoader
+
+        with patch('app.services.document_loader.vector_store') as mock_store:
+            mock_store.aget_documents = AsyncMock(return_value=[doc("c")])
+            loader = DocumentLoader()
+            loader.prime([doc("a")])
+
+            docs = await loader.load_many(["a", "c"])
+
+        assert mock_store.aget_documents.call_args.args[0] == ["c"]
+        assert docs["a"]["id"] == "a"
+
+    @pytest.mark.asyncio
+    async def test_query_route_loads_documents_once(self):
+        """POST /query checks every document with a single batched lookup"""
+        from fastapi import HTTPException
+        from app.routes.queries import query_documents, QueryRequest
+        from app.services.document_loader import DocumentLoader
+
+        with patch('app.services.document_loader.vector_store') as mock_store:
+            mock_store.aget_documents = AsyncMock(return_value=[doc("a"), doc("b", status="processing")])
+            loader = DocumentLoader()
+
+            with pytest.raises(HTTPException) as exc_info:
+                await query_documents(QueryRequest(question="q", document_ids=["a", "b"]), "user-1", loader)
+
+        assert exc_info.value.status_code == 400
+        mock_store.aget_documents.assert_awaited_once()
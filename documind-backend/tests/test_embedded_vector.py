@@ -0,0 +1,85 @@
+"""
+DocuMind - Embedded Vector Store Unit Tests
+
+Test framework: pytest + pytest-asyncio (SQLite + mmap files in tmp_path)
+"""
+
+import os
+import pytest
+
+
+def make_chunks(texts):
+    return [{"text": t, "chunk_number": i, "page_number": 1} for i, t in enumerate(texts)]
+
+
+class TestEmbeddedVector:
+    """Test cases for the SQLite + memory-mapped VectorStore backend"""
+
+    @pytest.fixture
+    def store(self, tmp_path):
+        from app.services.embedded_vector import EmbeddedVector
+        store = EmbeddedVector(str(tmp_path))
+        store.create_document({"id": "doc-1", "user_id": "user-1", "filename": "a.txt"})
+        store.create_document({"id": "doc-2", "user_id": "user-1", "filename": "b.txt", "notebook_id": "nb-1"})
+        return store
+
+    def test_documents_and_status(self, store):
+        """Documents start as processing and status updates persist"""
+        assert store.get_document("doc-1")["status"] == "processing"
+
+        store.update_document_status("doc-1", "ready")
+        store.save_document_summary("doc-1", short_summary="short")
+
+        doc = store.get_document("doc-1")
+        assert doc["status"] == "ready"
+        assert doc["short_summary"] == "short"
+        assert {d["id"] for d in store.list_documents("user-1")} == {"doc-1", "doc-2"}
+        assert {d["id"] for d in store.get_documents(["doc-1", "doc-2", "nope"])} == {"doc-1", "doc-2"}
+        assert [d["id"] for d in store.list_notebook_documents("nb-1")] == ["doc-2"]
+
+    @pytest.mark.asyncio
+    async def test_vector_search_across_documents(self, store):
+        """Search merges documents, applies the threshold and returns RPC-shaped rows"""
+        store.store_chunks("doc-1", make_chunks(["x axis", "y axis"]), [[1.0, 0.0], [0.0, 1.0]])
+        store.store_chunk("doc-2", "diagonal", 0, 1, [0.8, 0.6])
+
+        results = await store.vector_search([1.0, 0.0], ["doc-1", "doc-2"], limit=5)
+
+        assert [r["chunk_text"] for r in results] == ["x axis", "diagonal"]
+        assert results[1]["similarity"] == pytest.approx(0.8, abs=1e-6)
+        assert results[0]["document_id"] == "doc-1"
+
+    @pytest.mark.asyncio
+    async def test_chunks_and_keyword_search(self, store):
+        """Chunk listing is ordered; keyword search is a case-insensitive substring match"""
+        ids = store.store_chunks("doc-1", make_chunks(["Alpha beta", "gamma", "BETA 100%"]), [[1.0, 0.0]] * 3)
+
+        chunks = await store.get_document_chunks("doc-1")
+        assert [c["chunk_number"] for c in chunks] == [0, 1, 2]
+        assert store.get_chunk("doc-1", ids[1])["chunk_text"] == "gamma"
+
+        results = await store.keyword_search("doc-1", "beta", limit=10)
+        assert [r["chunk_number"] for r in results] == [0, 2]
+        assert [r["chunk_number"] for r in await store.keyword_search("doc-1", "100%")] == [2]
+
+    @pytest.mark.asyncio
+    async def test_failed_store_leaves_nothing(self, store, tmp_path):
+        """A bad batch rolls back rows and truncates the vector file"""
+        store.store_chunks("doc-1", make_chunks(["ok"]), [[1.0, 0.0]])
+
+        with pytest.raises(Exception):
+            store.store_chunks("doc-1", make_chunks(["bad"]), [[1.0, 0.0, 0.0]])
+
+        assert len(await store.get_document_chunks("doc-1")) == 1
+        assert os.path.getsize(tmp_path / "embeddings" / "doc-1.f32") == 2 * 4
+
+    @pytest.mark.asyncio
+    async def test_delete_document(self, store, tmp_path):
+        """Deleting a document removes its rows and vector file"""
+        store.store_chunks("doc-1", make_chunks(["a"]), [[1.0, 0.0]])
+
+        store.delete_document("doc-1")
+
+        assert store.get_document("doc-1") is None
+        assert await store.get_document_chunks("doc-1") == []
+        assert not os.path.exists(tmp_path / "embeddings" / "doc-1.f32")
@@ -0,0 +1,95 @@
+"""
+DocuMind - Embedding Cache Unit Tests
+
+Test framework: pytest (SQLite file in tmp_path)
+"""
+
+import pytest
+from tests.test_embedding_client import FakeModel
+
+
+class TestEmbeddingCache:
+    """Test cases for the persistent content-addressed cache"""
+
+    @pytest.fixture
+    def cache_path(self, tmp_path):
+        return str(tmp_path / "cache" / "embeddings.sqlite3")
+
+    def test_round_trip_through_disk(self, cache_path):
+        """Vectors survive a new process (fresh memory tier)"""
+        from app.services.embedding_cache import EmbeddingCache
+
+        cache = EmbeddingCache("model-a", cache_path)
+        cache.put("Hello   world", [0.5, 0.25, -1.0])
+        cache.close()
+
+        reopened = EmbeddingCache("model-a", cache_path)
+        assert reopened.get("Hello world") == [0.5, 0.25, -1.0]
+        assert reopened.disk_hits == 1
+        assert reopened.get("Hello world") == [0.5, 0.25, -1.0]
+        assert reopened.stats()["memory"]["hits"] == 1
+
+    def test_model_change_invalidates(self, cache_path):
+        """Switching EMBEDDING_MODEL clears old vectors"""
+        from app.services.embedding_cache import EmbeddingCache
+
+        cache = EmbeddingCache("model-a", cache_path)
+        cache.put("text", [1.0, 2.0])
+        cache.close()
+
+        other = EmbeddingCache("model-b", cache_path)
+        assert other.get("text") is None
+
+    def test_float16_storage(self, cache_path):
+        """float16 storage keeps vectors close to the originals"""
+        from app.services.embedding_cache import EmbeddingCache
+
+        EmbeddingCache("model-a", cache_path, dtype="float16").put("text", [0.1, 0.2])
+        value = EmbeddingCache("model-a", cache_path, dtype="float16").get("text")
+
+        assert value == pytest.approx([0.1, 0.2], abs=1e-3)
+
+
+    def test_unusable_disk_tier_degrades_to_misses(self, tmp_path):
+        """An unopenable cache file never breaks embedding"""
+        from app.services.embedding_cache import EmbeddingCache
+
+        blocker = tmp_path / "not-a-dir"
+        blocker.write_text("")
+        cache = EmbeddingCache("model-a", str(blocker / "embeddings.sqlite3"))
+
+        assert cache.get_many(["a", "b"]) == [None, None]
+        cache.put("a", [1.0])
+        assert cache.get("a") == [1.0]
+
+
+class TestEmbeddingClientCache:
+    """Test cases for the cache in front of embed_text/embed_batch"""
+
+    @pytest.fixture
+    def client(self, tmp_path):
+        from app.services.embedding_client import EmbeddingClient
+        from app.services.embedding_cache import EmbeddingCache
+        client = EmbeddingClient()
+        client.model = FakeModel()
+        client.cache = EmbeddingCache(client.model_name, str(tmp_path / "cache.sqlite3"))
+        yield client
+        client.shutdown()
+
+    def test_embed_batch_encodes_only_new_text(self, client):
+        """Cached and duplicate texts are not re-encoded"""
+        client.embed_text("page header")
+
+        result = client.embed_batch(["page header", "body", "body"])
+
+        assert [r[0] for r in result] == [11.0, 4.0, 4.0]
+        assert client.model.calls == ["page header", ["body"]]
+
+    def test_embed_text_hits_cache(self, client):
+        """Repeated embed_text calls reuse the stored vector"""
+        first = client.embed_text("question")
+        second = client.embed_text("question")
+
+        assert first == second
+        assert len(client.model.calls) == 1
+        assert client.stats()["cache"]["hit_rate"] > 0
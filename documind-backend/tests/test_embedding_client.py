@@ -0,0 +1,161 @@
+"""
+DocuMind - Embedding Client Unit Tests
+
+Test framework: pytest + pytest-asyncio (SentenceTransformer mocked)
+"""
+
+import asyncio
+import threading
+import numpy as np
+import pytest
+from unittest.mock import MagicMock
+
+
+class FakeModel:
+    """Stands in for SentenceTransformer: 3-dim vectors, records calling threads"""
+
+    def __init__(self):
+        self.threads = []
+        self.calls = []
+
+    def encode(self, texts, batch_size=32, convert_to_numpy=True):
+        self.threads.append(threading.current_thread().name)
+        self.calls.append(texts)
+        if isinstance(texts, str):
+            return np.array([len(texts), 1.0, 0.0], dtype=np.float32)
+        return np.array([[len(t), 1.0, 0.0] for t in texts], dtype=np.float32)
+
+    def get_sentence_embedding_dimension(self):
+        return 3
+
+
+class TestAsyncEmbedding:
+    """Test cases for the executor-backed async facade"""
+
+    @pytest.fixture
+    def client(self):
+        from app.services.embedding_client import EmbeddingClient
+        client = EmbeddingClient()
+        client.model = FakeModel()
+        client.cache = None
+        yield client
+        client.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_aembed_runs_on_executor(self, client):
+        """aembed returns the vector and encodes off the event loop thread"""
+        result = await client.aembed("hello")
+
+        assert result == [5.0, 1.0, 0.0]
+        assert client.model.threads[0].startswith("embedding")
+
+    @pytest.mark.asyncio
+    async def test_aembed_batch(self, client):
+        """aembed_batch keeps input order"""
+        result = await client.aembed_batch(["a", "abc"])
+
+        assert [r[0] for r in result] == [1.0, 3.0]
+        assert client.model.threads[0].startswith("embedding")
+
+
+class TestMicroBatching:
+    """Test cases for coalescing concurrent aembed calls"""
+
+    @pytest.fixture
+    def client(self):
+        from app.services.embedding_client import EmbeddingClient
+        client = EmbeddingClient()
+        client.model = FakeModel()
+        client.cache = None
+        yield client
+        client.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_share_one_encode(self, client):
+        """Concurrent single-text embeds run as one batch, each caller gets its own vector"""
+        texts = ["a", "bb", "ccc", "dddd"]
+
+        results = await asyncio.gather(*(client.aembed(t) for t in texts))
+
+        assert [r[0] for r in results] == [1.0, 2.0, 3.0, 4.0]
+        assert client.model.calls == [texts]
+        stats = client.stats()["micro_batching"]
+        assert stats["batches"] == 1
+        assert stats["batch_size_histogram"]["<=4"] == 1
+
+    @pytest.mark.asyncio
+    async def test_flushes_at_max_batch(self, client):
+        """A full batch is flushed without waiting for the timer"""
+        client._batcher.max_batch = 2
+        client._batcher.max_wait = 10.0  # would time out the test if the size trigger failed
+
+        results = await asyncio.wait_for(
+            asyncio.gather(client.aembed("a"), client.aembed("bb")), timeout=2
+        )
+
+        assert [r[0] for r in results] == [1.0, 2.0]
+
+    @pytest.mark.asyncio
+    async def test_errors_reach_every_caller(self, client):
+        """An encode failure is raised in every waiting caller"""
+        client.model.encode = MagicMock(side_effect=RuntimeError("oom"))
+
+        results = await asyncio.gather(
+            client.aembed("a"), client.aembed("b"), return_exceptions=True
+        )
+
+        assert all(isinstance(r, Exception) for r in results)
+
+    @pytest.mark.asyncio
+    async def test_running_flushes_are_held_until_done(self, client):
+        """Flush tasks are strongly referenced and close() waits for them"""
+        client._batcher.max_wait = 10.0
+
+        pending = [asyncio.create_task(client.aembed(t)) for t in ("a", "bb")]
+        await asyncio.sleep(0)
+        await client.close()
+
+        assert client._batcher._tasks == set()
+        assert [(await p)[0] for p in pending] == [1.0, 2.0]
+
+    @pytest.mark.asyncio
+    async def test_blank_text_skips_model(self, client):
+        """Blank questions return an empty vector without encoding"""
+        assert await client.aembed("   ") == []
+        assert client.model.calls == []
+
+
+class TestQueryEmbeddingCache:
+    """Test cases for the question-embedding LRU+TTL cache"""
+
+    @pytest.fixture
+    def client(self):
+        from app.services.embedding_client import EmbeddingClient
+        client = EmbeddingClient()
+        client.model = FakeModel()
+        client.cache = None
+        yield client
+        client.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_repeated_question_is_not_re_embedded(self, client):
+        """Whitespace variants of the same question share one entry"""
+        first = await client.aembed_query("What is RAG?")
+        second = await client.aembed_query("  What is   RAG? ")
+
+        assert first == second
+        assert len(client.model.calls) == 1
+        stats = client.stats()["query_cache"]
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+
+    @pytest.mark.asyncio
+    async def test_expired_entries_are_recomputed(self, client):
+        """Entries older than the TTL miss"""
+        client.query_cache.ttl = 0.01
+
+        await client.aembed_query("question")
+        await asyncio.sleep(0.05)
+        await client.aembed_query("question")
+
+        assert len(client.model.calls) == 2
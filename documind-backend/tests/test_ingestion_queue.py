@@ -0,0 +1,102 @@
+"""
+DocuMind - Ingestion Queue Unit Tests
+
+Test framework: pytest + pytest-asyncio (pdf/embedding/vector store mocked)
+"""
+
+import asyncio
+import pytest
+from unittest.mock import patch, AsyncMock, call
+
+
+class TestIngestionQueue:
+    """Test cases for the background ingestion worker pool"""
+
+    @pytest.mark.asyncio
+    async def test_job_marks_document_ready(self):
+        """A queued TXT upload is chunked, embedded, stored and marked ready"""
+        from app.services.ingestion_queue import IngestionQueue
+
+        chunks = [{"text": "a", "chunk_number": 0}, {"text": "b", "chunk_number": 1}]
+        queue = IngestionQueue(concurrency=1, max_size=4)
+
+        with patch('app.services.ingestion_queue.pdf_processor') as mock_pdf, \
+             patch('app.services.ingestion_queue.embedding_client') as mock_embed, \
+             patch('app.services.ingestion_queue.vector_store') as mock_store, \
+             patch('app.services.ingestion_queue.lexical_index') as mock_lexical:
+            mock_pdf.extract_text_chunks.return_value = chunks
+            mock_embed.aembed_batch = AsyncMock(return_value=[[0.1], [0.2]])
+            mock_store.astore_chunks = AsyncMock(return_value=["c0", "c1"])
+
+            await queue.start()
+            queue.enqueue("doc-123", b"hello", "notes.txt", is_pdf=False)
+            assert queue.get_progress("doc-123")["stage"] == "queued"
+
+            await asyncio.wait_for(queue._queue.join(), timeout=5)
+            await queue.stop()
+
+            mock_store.astore_chunks.assert_awaited_once_with("doc-123", chunks, [[0.1], [0.2]])
+            mock_store.update_document_status.assert_called_once_with("doc-123", "ready")
+            indexed_rows = mock_lexical.add_document.call_args.args[1]
+            assert [r["id"] for r in indexed_rows] == ["c0", "c1"]
+            assert queue.get_progress("doc-123") is None
+
+    @pytest.mark.asyncio
+    async def test_failure_marks_document_failed(self):
+        """Errors during processing set status=failed"""
+        from app.services.ingestion_queue import IngestionQueue
+
+        queue = IngestionQueue(concurrency=1, max_size=4)
+
+        with patch('app.services.ingestion_queue.pdf_processor') as mock_pdf, \
+             patch('app.services.ingestion_queue.vector_store') as mock_store:
+            mock_pdf.extract_chunks.side_effect = Exception("bad pdf")
+
+            await queue.start()
+            queue.enqueue("doc-123", b"%PDF-1.4", "broken.pdf", is_pdf=True)
+            await asyncio.wait_for(queue._queue.join(), timeout=5)
+            await queue.stop()
+
+            mock_store.update_document_status.assert_called_once_with("doc-123", "failed")
+
+    @pytest.mark.asyncio
+    async def test_full_queue_rejects(self):
+        """enqueue raises once max_size jobs are waiting"""
+        from app.services.ingestion_queue import IngestionQueue, IngestionQueueFull
+
+        queue = IngestionQueue(concurrency=1, max_size=1)
+        queue._queue = asyncio.Queue(maxsize=1)  # no workers, so nothing drains
+
+        queue.enqueue("doc-1", b"a", "a.txt", is_pdf=False)
+        assert queue.is_full()
+        with pytest.raises(IngestionQueueFull):
+            queue.enqueue("doc-2", b"b", "b.txt", is_pdf=False)
+
+    @pytest.mark.asyncio
+    async def test_stop_fails_unfinished_documents(self):
+        """Jobs cut off by shutdown do not stay "processing" forever"""
+        from app.services.ingestion_queue import IngestionQueue
+
+        queue = IngestionQueue(concurrency=1, max_size=4)
+        started = asyncio.Event()
+
+        async def hang(*args, **kwargs):
+            started.set()
+            await asyncio.Event().wait()
+
+        with patch('app.services.ingestion_queue.pdf_processor') as mock_pdf, \
+             patch('app.services.ingestion_queue.embedding_client') as mock_embed, \
+             patch('app.services.ingestion_queue.vector_store') as mock_store:
+            mock_pdf.extract_text_chunks.return_value = [{"text": "a", "chunk_number": 0}]
+            mock_embed.aembed_batch = AsyncMock(side_effect=hang)
+
+            await queue.start()
+            queue.enqueue("doc-running", b"a", "a.txt", is_pdf=False)
+            queue.enqueue("doc-waiting", b"b", "b.txt", is_pdf=False)
+            await asyncio.wait_for(started.wait(), timeout=5)
+            await queue.stop()
+
+        mock_store.update_document_status.assert_has_calls(
+            [call("doc-running", "failed"), call("doc-waiting", "failed")], any_order=True
+        )
+        assert mock_store.update_document_status.call_count == 2
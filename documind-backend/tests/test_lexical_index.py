@@ -0,0 +1,258 @@
+"""
+DocuMind - Lexical Index & Hybrid Retrieval Unit Tests
+
+Test framework: pytest + pytest-asyncio (vector store mocked)
+"""
+
+import pytest
+from unittest.mock import patch, AsyncMock
+
+
+def make_rows(texts):
+    return [
+        {"id": f"c{i}", "chunk_text": t, "chunk_number": i, "page_number": 1}
+        for i, t in enumerate(texts)
+    ]
+
+
+class TestLexicalIndex:
+    """Test cases for the per-document BM25 index"""
+
+    @pytest.fixture
+    def index(self, tmp_path):
+        from app.services.lexical_index import LexicalIndex
+        return LexicalIndex(str(tmp_path))
+
+    def test_bm25_ranking(self, index):
+        """Rare terms and higher term frequency rank first"""
+        index.add_document("doc-1", make_rows([
+            "the cat sat on the mat",
+            "the quantum cat and the quantum dog",
+            "the dog barked",
+        ]))
+
+        results = index.search("quantum cat", ["doc-1"], limit=5)
+
+        assert [r["id"] for r in results] == ["c1", "c0"]
+        assert results[0]["document_id"] == "doc-1"
+        assert results[0]["bm25"] > results[1]["bm25"] > 0
+        assert index.search("unicorn", ["doc-1"]) == []
+
+    def test_statistics_span_documents(self, index):
+        """Scores across documents share one corpus (N, df, avgdl)"""
+        index.add_document("doc-1", make_rows(["alpha beta"]))
+        index.add_document("doc-2", [dict(r, id="d0") for r in make_rows(["alpha alpha gamma"])])
+
+        results = index.search("alpha", ["doc-1", "doc-2"], limit=5)
+
+        assert [r["id"] for r in results] == ["d0", "c0"]
+
+    def test_persisted_and_removed(self, index, tmp_path):
+        """Indexes survive a restart and are dropped on delete"""
+        from app.services.lexical_index import LexicalIndex
+
+        index.add_document("doc-1", make_rows(["persisted text"]))
+        reloaded = LexicalIndex(str(tmp_path))
+        assert [r["id"] for r in reloaded.search("persisted", ["doc-1"])] == ["c0"]
+
+        reloaded.remove_document("doc-1")
+        assert reloaded.missing(["doc-1"]) == ["doc-1"]
+
+    def test_loaded_indexes_are_bounded(self, tmp_path):
+        """Only max_loaded indexes stay in memory; evicted ones reload from disk"""
+        from app.services.lexical_index import LexicalIndex
+
+        index = LexicalIndex(str(tmp_path), max_loaded=1)
+        index.add_document("doc-1", make_rows(["first text"]))
+        index.add_document("doc-2", [dict(r, id="d0") for r in make_rows(["second text"])])
+        assert index.stats()["size"] == 1
+
+        assert [r["id"] for r in index.search("first", ["doc-1"])] == ["c0"]
+        assert index.stats()["size"] == 1
+        assert index.stats()["misses"] == 1
+
+
+class TestKeywordSearch:
+    """Test cases for positional term / phrase / prefix search"""
+
+    @pytest.fixture
+    def index(self, tmp_path):
+        from app.services.lexical_index import LexicalIndex
+        index = LexicalIndex(str(tmp_path))
+        index.add_document("doc-1", make_rows([
+            "İSTANBUL ve Ankara. Istanbul trafiği yoğundur.",
+            "Yapay zeka ve yapay zekâ araştırmaları",
+            "zeka yapay; Istanbul",
+        ]))
+        return index
+
+    def test_turkish_case_folding(self, index):
+        """İ/I/ı/i fold together; chunks rank by number of matches"""
+        from app.services.lexical_index import fold
+        assert fold("İSTANBUL") == fold("istanbul") == "istanbul"
+        assert fold("IŞIK") == fold("ışık")
+
+        results, total = index.keyword_search(["doc-1"], "istanbul")
+
+        assert [r["id"] for r in results] == ["c0", "c2"]
+        assert results[0]["match_count"] == 2
+        text = results[0]["chunk_text"]
+        assert [text[s:e] for s, e in results[0]["matches"]] == ["İSTANBUL", "Istanbul"]
+
+    def test_phrase_requires_adjacency(self, index):
+        """Multi-word queries match consecutive tokens only"""
+        results, _ = index.keyword_search(["doc-1"], '"yapay zeka"')
+
+        assert [r["id"] for r in results] == ["c1"]
+        text = results[0]["chunk_text"]
+        assert [text[s:e] for s, e in results[0]["matches"]] == ["Yapay zeka"]
+
+    def test_prefix(self, index):
+        """A trailing * expands to every indexed term with that prefix"""
+        results, _ = index.keyword_search(["doc-1"], "yapay zek*")
+
+        assert results[0]["id"] == "c1"
+        assert results[0]["match_count"] == 2
+        assert index.keyword_search(["doc-1"], "zek") == ([], 0)
+
+    def test_multi_document_merge_and_pagination(self, index):
+        """Hits from several documents rank together and page with offset/limit"""
+        index.add_document("doc-2", [dict(r, id=f"d{i}") for i, r in enumerate(make_rows([
+            "istanbul istanbul istanbul",
+        ]))])
+
+        page1, total = index.keyword_search(["doc-1", "doc-2"], "istanbul", limit=2)
+        page2, _ = index.keyword_search(["doc-1", "doc-2"], "istanbul", limit=2, offset=2)
+
+        assert total == 3
+        assert [(r["document_id"], r["id"]) for r in page1] == [("doc-2", "d0"), ("doc-1", "c0")]
+        assert [r["id"] for r in page2] == ["c2"]
+
+    def test_old_index_version_is_rebuilt(self, tmp_path):
+        """Files from an older layout count as missing so they get rebuilt"""
+        import json
+        from app.services.lexical_index import LexicalIndex
+
+        (tmp_path / "doc-1.json").write_text(json.dumps({"rows": [], "lengths": [], "postings": {}}))
+
+        assert LexicalIndex(str(tmp_path)).missing(["doc-1"]) == ["doc-1"]
+
+    def test_snippet_offsets(self):
+        """The preview is a window around the first hit with hits highlighted"""
+        from app.routes.queries import format_keyword_result
+
+        text = "x" * 500 + " needle " + "y" * 500
+        start = text.index("needle")
+        row = {"id": "c0", "chunk_text": text, "chunk_number": 0, "matches": [[start, start + 6]]}
+
+        result = format_keyword_result(row, "doc-1", "a.txt")
+
+        assert result["snippet_start"] == start - 100
+        assert result["snippet_end"] == start + 200
+        assert "**needle**" in result["preview"]
+        assert result["preview"].startswith("...") and result["preview"].endswith("...")
+        assert result["match_count"] == 1
+
+
+class TestKeywordSearchRoute:
+    """Test cases for notebook / multi-document scope handling"""
+
+    def docs(self, owner="user-1"):
+        return [
+            {"id": "doc-1", "user_id": owner, "filename": "a.txt", "status": "ready"},
+            {"id": "doc-2", "user_id": owner, "filename": "b.txt", "status": "processing"},
+        ]
+
+    @pytest.mark.asyncio
+    async def test_notebook_scope_searches_ready_documents(self):
+        """One metadata query, one search call over the ready documents"""
+        from app.routes.queries import run_keyword_search
+
+        hit = {"id": "c0", "document_id": "doc-1", "chunk_text": "kedi", "matches": [[0, 4]]}
+        with patch('app.routes.queries.vector_store') as mock_store, \
+             patch('app.routes.queries.check_notebook_owner', AsyncMock()) as mock_owner, \
+             patch('app.routes.queries.indexed_keyword_search', AsyncMock(return_value=([hit], 7))) as mock_search:
+            mock_store.list_notebook_documents.return_value = self.docs()
+
+            response = await run_keyword_search("kedi", "user-1", notebook_id="nb-1", limit=1)
+
+        mock_owner.assert_awaited_once_with("nb-1", "user-1")
+        mock_search.assert_awaited_once_with(["doc-1"], "kedi", 1, 0)
+        assert response["total"] == 7
+        assert response["has_more"] is True
+        assert response["results"][0]["title"] == "a.txt"
+
+    @pytest.mark.asyncio
+    async def test_foreign_notebook_rejected(self):
+        """An empty notebook of someone else is 403, not an empty result"""
+        from fastapi import HTTPException
+        from app.routes.queries import run_keyword_search
+
+        with patch('app.routes.queries.vector_store') as mock_store, \
+             patch('app.routes.notebooks.get_notebook_owner', AsyncMock(return_value="user-2")):
+            mock_store.list_notebook_documents.return_value = []
+
+            with pytest.raises(HTTPException) as exc_info:
+                await run_keyword_search("kedi", "user-1", notebook_id="nb-1")
+
+        assert exc_info.value.status_code == 403
+        mock_store.list_notebook_documents.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_access_checked_for_every_document(self):
+        """Any foreign or missing document rejects the whole request"""
+        from fastapi import HTTPException
+        from app.routes.queries import run_keyword_search
+
+        with patch('app.services.document_loader.vector_store') as mock_store:
+            mock_store.aget_documents = AsyncMock(return_value=self.docs(owner="someone-else"))
+            with pytest.raises(HTTPException) as exc_info:
+                await run_keyword_search("kedi", "user-1", document_ids=["doc-1", "doc-2"])
+            assert exc_info.value.status_code == 403
+
+            mock_store.aget_documents = AsyncMock(return_value=self.docs()[:1])
+            with pytest.raises(HTTPException) as exc_info:
+                await run_keyword_search("kedi", "user-1", document_ids=["doc-1", "doc-2"])
+            assert exc_info.value.status_code == 404
+
+        with pytest.raises(HTTPException) as exc_info:
+            await run_keyword_search("kedi", "user-1", document_id="doc-1", notebook_id="nb-1")
+        assert exc_info.value.status_code == 400
+
+
+class TestHybridRetrieval:
+    """Test cases for reciprocal rank fusion and hybrid_search"""
+
+    def test_rrf_rewards_agreement(self):
+        """A chunk ranked by both retrievers beats single-list leaders"""
+        from app.services.retrieval import reciprocal_rank_fusion
+
+        dense = [{"id": "a", "similarity": 0.9}, {"id": "b", "similarity": 0.8}]
+        sparse = [{"id": "c", "bm25": 4.0}, {"id": "b", "bm25": 3.0}]
+
+        fused = reciprocal_rank_fusion([dense, sparse], k=60, limit=3)
+
+        assert [r["id"] for r in fused] == ["b", "a", "c"]
+        assert fused[0]["similarity"] == 0.8
+        assert fused[0]["bm25"] == 3.0
+        assert fused[0]["rrf_score"] == pytest.approx(1 / 62 + 1 / 62)
+
+    @pytest.mark.asyncio
+    async def test_hybrid_search_builds_missing_index(self, tmp_path):
+        """Older documents get a BM25 index from their stored chunks on first query"""
+        from app.services.lexical_index import LexicalIndex
+
+        index = LexicalIndex(str(tmp_path))
+        with patch('app.services.retrieval.lexical_index', index), \
+             patch('app.services.retrieval.vector_store') as mock_store:
+            mock_store.vector_search = AsyncMock(return_value=[
+                {"id": "c0", "document_id": "doc-1", "chunk_text": "vectors", "similarity": 0.7}
+            ])
+            mock_store.get_document_chunks = AsyncMock(return_value=make_rows(["vectors", "keyword match"]))
+
+            from app.services.retrieval import hybrid_search
+            results = await hybrid_search("keyword", [1.0, 0.0], ["doc-1"], limit=2)
+
+        assert {r["id"] for r in results} == {"c0", "c1"}
+        assert index.missing(["doc-1"]) == []
+        assert mock_store.vector_search.call_args.kwargs["limit"] == 8
@@ -0,0 +1,297 @@
+"""
+DocuMind - LLM Admission Scheduler Unit Tests
+
+Test framework: pytest + pytest-asyncio (Ollama mocked)
+"""
+
+import asyncio
+import pytest
+from unittest.mock import patch, AsyncMock, MagicMock
+
+
+LIMITS = {"interactive": 4, "summary": 4, "background": 4}
+
+
+class TestLLMScheduler:
+    """Test cases for priority admission"""
+
+    @pytest.mark.asyncio
+    async def test_free_slot_admits_immediately(self):
+        from app.services.llm_scheduler import LLMScheduler
+
+        scheduler = LLMScheduler(max_concurrency=2, queue_limits=LIMITS)
+        async with scheduler.slot("summary"):
+            assert scheduler.stats()["active"] == 1
+
+        stats = scheduler.stats()
+        assert stats["active"] == 0
+        assert stats["classes"]["summary"]["admitted"] == 1
+        assert stats["classes"]["summary"]["wait_max_ms"] < 50
+
+    @pytest.mark.asyncio
+    async def test_freed_slot_goes_to_highest_priority(self):
+        """Waiters are served interactive > summary > background, FIFO within a class"""
+        from app.services.llm_scheduler import LLMScheduler
+
+        scheduler = LLMScheduler(max_concurrency=1, queue_limits=LIMITS)
+        order = []
+
+        async def job(priority, name):
+            async with scheduler.slot(priority):
+                order.append(name)
+
+        await scheduler.acquire("summary")
+        tasks = [
+            asyncio.create_task(job("background", "bg")),
+            asyncio.create_task(job("summary", "sum-1")),
+            asyncio.create_task(job("summary", "sum-2")),
+            asyncio.create_task(job("interactive", "chat")),
+        ]
+        await asyncio.sleep(0)
+        assert scheduler.stats()["queued"] == 4
+
+        scheduler.release()
+        await asyncio.gather(*tasks)
+
+        assert order == ["chat", "sum-1", "sum-2", "bg"]
+        assert scheduler.stats()["active"] == 0
+
+    @pytest.mark.asyncio
+    async def test_full_class_rejects_with_retry_after(self):
+        from app.services.llm_scheduler import LLMScheduler, SchedulerQueueFull
+
+        scheduler = LLMScheduler(
+            max_concurrency=1, queue_limits={"interactive": 4, "summary": 1, "background": 0}, retry_after=7
+        )
+        await scheduler.acquire("summary")
+        waiting = asyncio.create_task(scheduler.acquire("summary"))
+        await asyncio.sleep(0)
+
+        with pytest.raises(SchedulerQueueFull) as exc_info:
+            await scheduler.acquire("summary")
+        assert exc_info.value.retry_after == 7
+
+        # Other classes keep their own limits
+        chat = asyncio.create_task(scheduler.acquire("interactive"))
+        await asyncio.sleep(0)
+        assert scheduler.stats()["classes"]["interactive"]["queued"] == 1
+
+        scheduler.release()
+        await chat
+        scheduler.release()
+        await waiting
+        scheduler.release()
+        assert scheduler.stats()["classes"]["summary"]["rejected"] == 1
+
+    def test_retry_after_follows_service_time(self):
+        from app.services.llm_scheduler import LLMScheduler
+
+        scheduler = LLMScheduler(max_concurrency=2, queue_limits=LIMITS, retry_after=3)
+        assert scheduler._retry_after() == 3  # nothing measured yet
+
+        scheduler._active = 1
+        scheduler.release(held=10.0)
+        assert scheduler._retry_after() == 5  # 10s per slot, 1 request over 2 slots
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_leaves_queue(self):
+        from app.services.llm_scheduler import LLMScheduler
+
+        scheduler = LLMScheduler(max_concurrency=1, queue_limits=LIMITS)
+        await scheduler.acquire("interactive")
+        waiter = asyncio.create_task(scheduler.acquire("interactive"))
+        await asyncio.sleep(0)
+
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        assert scheduler.stats()["queued"] == 0
+
+        scheduler.release()
+        assert scheduler.stats()["active"] == 0
+
+    @pytest.mark.asyncio
+    async def test_wait_time_is_recorded(self):
+        from app.services.llm_scheduler import LLMScheduler
+
+        scheduler = LLMScheduler(max_concurrency=1, queue_limits=LIMITS)
+        await scheduler.acquire("interactive")
+        waiter = asyncio.create_task(scheduler.acquire("background"))
+        await asyncio.sleep(0.05)
+        scheduler.release()
+        await waiter
+        scheduler.release()
+
+        background = scheduler.stats()["classes"]["background"]
+        assert background["admitted"] == 1
+        assert background["wait_max_ms"] >= 40
+
+
+    @pytest.mark.asyncio
+    async def test_reserve_raises_without_waiting(self):
+        from app.services.llm_scheduler import LLMScheduler, SchedulerQueueFull
+
+        scheduler = LLMScheduler(
+            max_concurrency=1, queue_limits={"interactive": 1, "summary": 0, "background": 0}, retry_after=4
+        )
+        held = scheduler.reserve("interactive")
+        queued = scheduler.reserve("interactive")
+        assert scheduler.stats()["queued"] == 1
+
+        with pytest.raises(SchedulerQueueFull) as exc_info:
+            scheduler.reserve("interactive")
+        assert exc_info.value.retry_after == 4
+
+        queued.cancel()
+        held.cancel()
+        assert scheduler.stats()["queued"] == 0
+        assert scheduler.stats()["active"] == 0
+
+    @pytest.mark.asyncio
+    async def test_reservation_is_used_by_slot(self):
+        from app.services.llm_scheduler import LLMScheduler
+
+        scheduler = LLMScheduler(max_concurrency=1, queue_limits=LIMITS)
+        first = scheduler.reserve("summary")
+        second = scheduler.reserve("interactive")
+
+        async def job(reservation):
+            async with scheduler.slot(reservation.priority, reservation):
+                pass
+
+        waiting = asyncio.create_task(job(second))
+        await asyncio.sleep(0)
+        # Claimed: the reserving side can no longer give it back
+        second.cancel()
+        assert scheduler.stats()["queued"] == 1
+
+        await job(first)
+        await waiting
+        stats = scheduler.stats()
+        assert stats["active"] == 0
+        assert stats["classes"]["interactive"]["admitted"] == 1
+
+    @pytest.mark.asyncio
+    async def test_cancelled_reservation_hands_slot_on(self):
+        from app.services.llm_scheduler import LLMScheduler
+
+        scheduler = LLMScheduler(max_concurrency=1, queue_limits=LIMITS)
+        unused = scheduler.reserve("interactive")
+        waiter = asyncio.create_task(scheduler.acquire("summary"))
+        await asyncio.sleep(0)
+
+        unused.cancel()
+        unused.cancel()  # idempotent
+        reservation = await waiter
+        assert scheduler.stats()["active"] == 1
+
+        reservation._release(0.1)
+        assert scheduler.stats()["active"] == 0
+
+
+    @pytest.mark.asyncio
+    async def test_collected_reservation_is_released_on_the_loop(self):
+        """Last resort: an unreleased place comes back via the loop, not the finalizer"""
+        from app.services.llm_scheduler import LLMScheduler
+
+        scheduler = LLMScheduler(max_concurrency=1, queue_limits=LIMITS)
+        scheduler.reserve("interactive")  # dropped without cancel()
+        await asyncio.sleep(0)
+
+        assert scheduler.stats()["active"] == 0
+
+
+class TestOllamaAdmission:
+    """OllamaClient generations go through the scheduler"""
+
+    @pytest.mark.asyncio
+    async def test_queue_full_raises_busy_with_retry_after(self):
+        from app.services.ollama_client import OllamaClient, OllamaBusy
+        from app.services.llm_scheduler import LLMScheduler
+
+        scheduler = LLMScheduler(
+            max_concurrency=1, queue_limits={"interactive": 1, "summary": 0, "background": 0}, retry_after=9
+        )
+        client = OllamaClient(scheduler=scheduler)
+        await scheduler.acquire("interactive")
+
+        with pytest.raises(OllamaBusy) as exc_info:
+            await client.generate_summary("İçerik", document_name="doc.pdf")
+
+        assert exc_info.value.retry_after == 9
+        assert client.stats()["scheduler"]["classes"]["summary"]["rejected"] == 1
+        scheduler.release()
+
+    @pytest.mark.asyncio
+    async def test_answers_and_summaries_use_their_classes(self):
+        from app.services.ollama_client import OllamaClient
+
+        client = OllamaClient()
+
+        async def generate(payload, timeout):
+            response = MagicMock()
+            response.json.return_value = {"response": "Metin"}
+            return response
+
+        with patch.object(client, '_generate', generate):
+            await client.generate_answer("Soru?", "Bağlam")
+            await client.generate_summary("İçerik", document_name="doc.pdf")
+            await client.generate_summary("Başka içerik", document_name="doc.pdf", priority="background")
+
+        classes = client.stats()["scheduler"]["classes"]
+        assert [classes[p]["admitted"] for p in ("interactive", "summary", "background")] == [1, 1, 1]
+
+
+    @pytest.mark.asyncio
+    async def test_reservation_given_back_when_joining_flight(self):
+        """A follower of an in-flight generation needs no slot of its own"""
+        from app.services.ollama_client import OllamaClient
+        from app.services.llm_scheduler import LLMScheduler
+
+        scheduler = LLMScheduler(max_concurrency=1, queue_limits=LIMITS)
+        client = OllamaClient(scheduler=scheduler)
+        gate = asyncio.Event()
+
+        async def stream_generate(payload, timeout):
+            await gate.wait()
+            yield {"response": "Cevap", "done": False}
+            yield {"response": "", "done": True}
+
+        with patch.object(client, '_stream_generate', stream_generate):
+            async def consume(reservation):
+                return [t async for t in client.stream_answer("Soru?", "Bağlam", reservation=reservation)]
+
+            leader = asyncio.create_task(consume(client.reserve("interactive")))
+            await asyncio.sleep(0)
+            follower = asyncio.create_task(consume(client.reserve("interactive")))
+            await asyncio.sleep(0)
+            assert scheduler.stats()["queued"] == 0
+
+            gate.set()
+            assert await leader == ["Cevap"]
+            assert await follower == ["Cevap"]
+
+        assert scheduler.stats()["active"] == 0
+        assert scheduler.stats()["classes"]["interactive"]["admitted"] == 1
+
+
+class TestBusyResponse:
+    """Busy Ollama becomes 503 with Retry-After"""
+
+    @pytest.mark.asyncio
+    async def test_query_busy_sets_retry_after_header(self):
+        from fastapi import HTTPException
+        from app.routes.queries import query_documents, QueryRequest
+        from app.services.ollama_client import OllamaBusy
+
+        prepared = {"context": "ctx", "sources_hint": "hint", "sources": [{"document_id": "doc-1"}],
+                    "document_ids": ["doc-1"]}
+        with patch('app.routes.queries.prepare_query', AsyncMock(return_value=prepared)), \
+             patch('app.routes.queries.vector_store'), \
+             patch('app.routes.queries.ollama_client') as mock_ollama:
+            mock_ollama.generate_answer_cached = AsyncMock(side_effect=OllamaBusy("meşgul", retry_after=12))
+
+            with pytest.raises(HTTPException) as exc_info:
+                await query_documents(QueryRequest(question="Soru?", document_ids=["doc-1"]), "user-1", MagicMock())
+
+        assert exc_info.value.status_code == 503
+        assert exc_info.value.headers == {"Retry-After": "12"}
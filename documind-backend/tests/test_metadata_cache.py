@@ -0,0 +1,113 @@
+"""
+DocuMind - Metadata Cache Unit Tests
+
+Test framework: pytest + pytest-asyncio (vector store / Supabase mocked)
+"""
+
+import pytest
+from unittest.mock import patch, AsyncMock, MagicMock
+
+NOTEBOOK_ID = "5f0c2a9e-3b1d-4c8e-9a7f-2d6b1e4c0a11"
+
+
+def doc(doc_id, notebook_id=None, status="ready"):
+    return {"id": doc_id, "user_id": "user-1", "notebook_id": notebook_id, "filename": f"{doc_id}.txt", "status": status}
+
+
+class TestMetadataCache:
+    """Test cases for the shared ownership/status cache"""
+
+    def test_ttl_and_bounded_size(self):
+        """Entries expire after the TTL and the LRU evicts beyond maxsize"""
+        from app.services.metadata_cache import MetadataCache
+
+        cache = MetadataCache(maxsize=2, ttl=10)
+        with patch('app.services.lru_cache.time.monotonic', return_value=100.0):
+            cache.set_document(doc("a"))
+            cache.set_document(doc("b"))
+            cache.set_notebook_owner("nb-1", "user-1")
+            assert cache.get_document("a") is None  # evicted
+            assert cache.get_notebook_owner("nb-1") == "user-1"
+        with patch('app.services.lru_cache.time.monotonic', return_value=111.0):
+            assert cache.get_notebook_owner("nb-1") is None  # expired
+
+        stats = cache.stats()
+        assert stats["hits"] == 1 and stats["misses"] == 2
+        assert stats["hit_rate"] == pytest.approx(1 / 3, abs=1e-3)
+
+    def test_notebook_invalidation_drops_linked_documents(self):
+        """Deleting or renaming a notebook also forgets its documents"""
+        from app.services.metadata_cache import MetadataCache
+
+        cache = MetadataCache(maxsize=10, ttl=60)
+        cache.set_notebook_owner("nb-1", "user-1")
+        cache.set_document(doc("a", notebook_id="nb-1"))
+        cache.set_document(doc("b", notebook_id="nb-2"))
+
+        cache.invalidate_notebook("nb-1")
+
+        assert cache.get_notebook_owner("nb-1") is None
+        assert cache.get_document("a") is None
+        assert cache.get_document("b")["filename"] == "b.txt"
+
+    def test_status_update_invalidates(self, tmp_path):
+        """Vector store status changes evict the cached document"""
+        from app.services.embedded_vector import EmbeddedVector
+        from app.services.metadata_cache import MetadataCache
+
+        cache = MetadataCache(maxsize=10, ttl=60)
+        with patch('app.services.embedded_vector.metadata_cache', cache):
+            store = EmbeddedVector(str(tmp_path))
+            store.create_document({"id": "a", "user_id": "user-1", "filename": "a.txt"})
+            cache.set_document(doc("a", status="processing"))
+
+            store.update_document_status("a", "ready")
+
+        assert cache.get_document("a") is None
+
+
+class TestCachedLookups:
+    """Test cases for routes/loaders reading through the cache"""
+
+    @pytest.mark.asyncio
+    async def test_loader_reads_through_cache(self):
+        """A second request's loader is served from the shared cache"""
+        from app.services.document_loader import DocumentLoader, get_summary_loader
+        from app.services.metadata_cache import MetadataCache
+
+        cache = MetadataCache(maxsize=10, ttl=60)
+        with patch('app.services.document_loader.metadata_cache', cache), \
+             patch('app.services.document_loader.vector_store') as mock_store:
+            mock_store.aget_documents = AsyncMock(return_value=[doc("a")])
+
+            await DocumentLoader().load("a")
+            second = await DocumentLoader().load("a")
+            assert mock_store.aget_documents.await_count == 1
+            assert second["status"] == "ready"
+
+            # Summary columns are not cached, so that loader always queries
+            await get_summary_loader().load("a")
+            assert mock_store.aget_documents.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_notebook_owner_checked_once(self):
+        """Repeated chat requests confirm notebook ownership from the cache"""
+        from fastapi import HTTPException
+        from app.routes.notebooks import check_notebook_owner
+        from app.services.metadata_cache import MetadataCache
+
+        cache = MetadataCache(maxsize=10, ttl=60)
+        with patch('app.routes.notebooks.metadata_cache', cache), \
+             patch('app.routes.notebooks.postgres_client') as mock_pg, \
+             patch('app.routes.notebooks.supabase') as mock_supabase:
+            mock_pg.available = False
+            execute = mock_supabase.table.return_value.select.return_value.eq.return_value.execute
+            execute.return_value = MagicMock(data=[{"user_id": "user-1"}])
+
+            await check_notebook_owner(NOTEBOOK_ID, "user-1")
+            await check_notebook_owner(NOTEBOOK_ID, "user-1")
+            with pytest.raises(HTTPException) as exc_info:
+                await check_notebook_owner(NOTEBOOK_ID, "intruder")
+
+        assert execute.call_count == 1
+        assert exc_info.value.status_code == 403
@@ -0,0 +1,153 @@
+"""
+Unit tests for the notebook listing (document counts without N+1)
+"""
+import pytest
+from unittest.mock import patch, MagicMock, AsyncMock
+
+
+def notebook(i, updated_at="2025-01-0{}T10:00:00+00:00"):
+    return {
+        "id": f"nb-{i}",
+        "title": f"Notebook {i}",
+        "accent": "blue",
+        "created_at": f"2024-12-0{i}T00:00:00+00:00",
+        "updated_at": updated_at.format(i)
+    }
+
+
+class TestNotebookCursor:
+    """Test cases for the opaque keyset cursor"""
+
+    def test_round_trip(self):
+        from app.routes.notebooks import encode_cursor, decode_cursor
+
+        cursor = encode_cursor("2025-01-03T10:00:00+00:00", "nb-3")
+        assert decode_cursor(cursor) == ("2025-01-03T10:00:00+00:00", "nb-3")
+
+    def test_invalid_cursor_rejected(self):
+        from fastapi import HTTPException
+        from app.routes.notebooks import decode_cursor
+
+        with pytest.raises(HTTPException) as exc_info:
+            decode_cursor("not-a-cursor")
+        assert exc_info.value.status_code == 400
+
+
+class TestListNotebooks:
+    """Test cases for list_notebooks"""
+
+    @pytest.mark.asyncio
+    async def test_counts_come_from_one_rpc(self):
+        """One RPC call, no per-notebook count queries"""
+        from app.routes.notebooks import list_notebooks
+
+        rows = [dict(notebook(i), document_count=i, last_activity_at=None) for i in (3, 2, 1)]
+        with patch('app.routes.notebooks.postgres_client') as mock_pg, \
+             patch('app.routes.notebooks.supabase') as mock_supabase:
+            mock_pg.available = False
+            mock_supabase.rpc.return_value.execute.return_value = MagicMock(data=rows)
+
+            response = await list_notebooks(x_user_id="user-1", limit=None, cursor=None)
+
+        mock_supabase.rpc.assert_called_once()
+        mock_supabase.table.assert_not_called()
+        assert [n["document_count"] for n in response["notebooks"]] == [3, 2, 1]
+        assert response["next_cursor"] is None
+
+    @pytest.mark.asyncio
+    async def test_limit_returns_next_cursor(self):
+        """limit + 1 rows are fetched; the extra row only signals another page"""
+        from app.routes.notebooks import list_notebooks, decode_cursor
+
+        rows = [dict(notebook(i), document_count=0) for i in (3, 2, 1)]
+        with patch('app.routes.notebooks.postgres_client') as mock_pg:
+            mock_pg.available = True
+            mock_pg.list_notebooks_with_counts = AsyncMock(return_value=rows)
+
+            response = await list_notebooks(x_user_id="user-1", limit=2, cursor=None)
+
+        mock_pg.list_notebooks_with_counts.assert_awaited_once_with("user-1", 3, None, None)
+        assert [n["id"] for n in response["notebooks"]] == ["nb-3", "nb-2"]
+        # Keyed on created_at: later touches to updated_at cannot move a row across pages
+        assert decode_cursor(response["next_cursor"]) == ("2024-12-02T00:00:00+00:00", "nb-2")
+
+    @pytest.mark.asyncio
+    async def test_fallback_pages_on_created_at(self):
+        from app.routes.notebooks import list_notebooks, encode_cursor
+
+        notebooks_table = MagicMock()
+        filtered = notebooks_table.select.return_value.eq.return_value.or_.return_value
+        ordered = filtered.order.return_value.order.return_value
+        ordered.limit.return_value.execute.return_value = MagicMock(data=[])
+
+        with patch('app.routes.notebooks.postgres_client') as mock_pg, \
+             patch('app.routes.notebooks.supabase') as mock_supabase:
+            mock_pg.available = False
+            mock_supabase.rpc.side_effect = Exception("function does not exist")
+            mock_supabase.table.return_value = notebooks_table
+
+            cursor = encode_cursor("2024-12-02T00:00:00+00:00", "nb-2")
+            await list_notebooks(x_user_id="user-1", limit=2, cursor=cursor)
+
+        notebooks_table.select.return_value.eq.return_value.or_.assert_called_once_with(
+            "created_at.lt.2024-12-02T00:00:00+00:00,"
+            "and(created_at.eq.2024-12-02T00:00:00+00:00,id.lt.nb-2)"
+        )
+        filtered.order.assert_called_once_with("created_at", desc=True)
+
+    @pytest.mark.asyncio
+    async def test_fallback_uses_two_queries(self):
+        """Without the RPC: one notebooks query and one documents query"""
+        from app.routes.notebooks import list_notebooks
+
+        docs = [
+            {"notebook_id": "nb-2", "updated_at": "2025-01-05T10:00:00+00:00"},
+            {"notebook_id": "nb-2", "updated_at": "2025-01-04T10:00:00+00:00"},
+            {"notebook_id": "nb-1", "updated_at": "2025-01-01T09:00:00+00:00"},
+        ]
+        tables = {"notebooks": MagicMock(), "documents": MagicMock()}
+        notebooks_query = tables["notebooks"].select.return_value.eq.return_value
+        notebooks_query.order.return_value.order.return_value.execute.return_value = MagicMock(
+            data=[notebook(3), notebook(2), notebook(1)]
+        )
+        tables["documents"].select.return_value.in_.return_value.execute.return_value = MagicMock(data=docs)
+
+        with patch('app.routes.notebooks.postgres_client') as mock_pg, \
+             patch('app.routes.notebooks.supabase') as mock_supabase:
+            mock_pg.available = False
+            mock_supabase.rpc.side_effect = Exception("function does not exist")
+            mock_supabase.table.side_effect = lambda name: tables[name]
+
+            response = await list_notebooks(x_user_id="user-1", limit=None, cursor=None)
+
+        assert mock_supabase.table.call_count == 2
+        by_id = {n["id"]: n for n in response["notebooks"]}
+        assert by_id["nb-3"]["document_count"] == 0
+        assert by_id["nb-2"]["document_count"] == 2
+        assert by_id["nb-1"]["document_count"] == 1
+        assert by_id["nb-2"]["last_activity_at"] == "2025-01-05T10:00:00+00:00"
+        assert by_id["nb-1"]["last_activity_at"] == "2025-01-01T10:00:00+00:00"
+
+
+class TestDeleteNotebook:
+    """Test cases for delete_notebook"""
+
+    @pytest.mark.asyncio
+    async def test_documents_cleaned_up(self):
+        """Indexes and cached answers of cascaded documents are dropped too"""
+        from app.routes.notebooks import delete_notebook
+
+        with patch('app.routes.notebooks.check_notebook_owner', AsyncMock()), \
+             patch('app.routes.notebooks.supabase') as mock_supabase, \
+             patch('app.routes.notebooks.vector_store') as mock_notebook_store, \
+             patch('app.routes.documents.vector_store') as mock_store, \
+             patch('app.routes.documents.lexical_index') as mock_lexical, \
+             patch('app.routes.documents.response_cache') as mock_cache:
+            mock_notebook_store.list_notebook_documents.return_value = [{"id": "doc-1"}, {"id": "doc-2"}]
+
+            response = await delete_notebook("nb-1", x_user_id="user-1")
+
+        assert response["status"] == "deleted"
+        mock_supabase.table.return_value.delete.return_value.eq.assert_called_once_with("id", "nb-1")
+        for mock in (mock_store.delete_document, mock_lexical.remove_document, mock_cache.invalidate_document):
+            assert [c.args[0] for c in mock.call_args_list] == ["doc-1", "doc-2"]
@@ -0,0 +1,192 @@
+"""
+Unit tests for chat history pagination and incremental sync
+"""
+import pytest
+from unittest.mock import patch, AsyncMock, MagicMock
+
+NOTEBOOK_ID = "5f0c2a9e-3b1d-4c8e-9a7f-2d6b1e4c0a11"
+
+
+def message(i):
+    return {
+        "id": f"m{i}",
+        "role": "user",
+        "content": f"message {i}",
+        "sources": None,
+        "created_at": f"2025-01-01T10:00:{i:02d}+00:00"
+    }
+
+
+@pytest.fixture
+def pool():
+    """Pooled path with ownership check stubbed out"""
+    with patch('app.routes.notebooks.check_notebook_owner', AsyncMock()), \
+         patch('app.routes.notebooks.postgres_client') as mock_pg:
+        mock_pg.available = True
+        yield mock_pg
+
+
+class TestMessagePagination:
+    """Test cases for get_notebook_messages"""
+
+    @pytest.mark.asyncio
+    async def test_newest_page_with_cursor_to_older(self, pool):
+        """Default: newest `limit` messages, oldest first, plus next_before"""
+        from app.routes.notebooks import get_notebook_messages, decode_cursor
+
+        pool.list_messages = AsyncMock(return_value=[message(i) for i in (7, 8, 9)])
+
+        response = await get_notebook_messages("nb-1", limit=2, before=None, after=None, since=None, x_user_id="user-1")
+
+        pool.list_messages.assert_awaited_once_with("nb-1", 3, before=None, after=None, since=None)
+        assert [m["id"] for m in response["messages"]] == ["m8", "m9"]
+        assert response["has_more"] is True
+        assert decode_cursor(response["next_before"]) == ("2025-01-01T10:00:08+00:00", "m8")
+        assert decode_cursor(response["sync_cursor"]) == ("2025-01-01T10:00:09+00:00", "m9")
+
+    @pytest.mark.asyncio
+    async def test_sync_returns_only_new_messages(self, pool):
+        """`after` pages forward from the previous sync_cursor"""
+        from app.routes.notebooks import get_notebook_messages, encode_cursor, decode_cursor
+
+        pool.list_messages = AsyncMock(return_value=[message(10)])
+        cursor = encode_cursor("2025-01-01T10:00:09+00:00", "m9")
+
+        response = await get_notebook_messages("nb-1", limit=50, before=None, after=cursor, since=None, x_user_id="user-1")
+
+        assert pool.list_messages.await_args.kwargs["after"] == ("2025-01-01T10:00:09+00:00", "m9")
+        assert [m["id"] for m in response["messages"]] == ["m10"]
+        assert response["has_more"] is False
+        assert response["next_before"] is None
+        assert decode_cursor(response["sync_cursor"]) == ("2025-01-01T10:00:10+00:00", "m10")
+
+    @pytest.mark.asyncio
+    async def test_sync_without_new_messages_keeps_cursor(self, pool):
+        from app.routes.notebooks import get_notebook_messages, encode_cursor
+
+        pool.list_messages = AsyncMock(return_value=[])
+        cursor = encode_cursor("2025-01-01T10:00:09+00:00", "m9")
+
+        response = await get_notebook_messages("nb-1", limit=50, before=None, after=cursor, since=None, x_user_id="user-1")
+
+        assert response["messages"] == []
+        assert response["sync_cursor"] == cursor
+
+    @pytest.mark.asyncio
+    async def test_before_and_after_are_exclusive(self, pool):
+        from fastapi import HTTPException
+        from app.routes.notebooks import get_notebook_messages, encode_cursor
+
+        cursor = encode_cursor("2025-01-01T10:00:09+00:00", "m9")
+        with pytest.raises(HTTPException) as exc_info:
+            await get_notebook_messages("nb-1", limit=50, before=cursor, after=cursor, since=None, x_user_id="user-1")
+        assert exc_info.value.status_code == 400
+
+    @pytest.mark.asyncio
+    async def test_invalid_since_rejected(self, pool):
+        from fastapi import HTTPException
+        from app.routes.notebooks import get_notebook_messages
+
+        with pytest.raises(HTTPException) as exc_info:
+            await get_notebook_messages("nb-1", limit=50, before=None, after=None, since="yesterday", x_user_id="user-1")
+        assert exc_info.value.status_code == 400
+
+    @pytest.mark.asyncio
+    async def test_pool_failure_falls_back_to_rest(self, pool):
+        from app.routes.notebooks import get_notebook_messages
+
+        pool.list_messages = AsyncMock(side_effect=ConnectionError("pool down"))
+        with patch('app.routes.notebooks.list_messages_rest', return_value=[message(1)]) as mock_rest:
+            response = await get_notebook_messages("nb-1", limit=50, before=None, after=None, since=None, x_user_id="user-1")
+
+        mock_rest.assert_called_once_with("nb-1", 51, None, None, None)
+        assert [m["id"] for m in response["messages"]] == ["m1"]
+
+
+class TestNotebookOwner:
+    """Test cases for get_notebook_owner"""
+
+    @pytest.mark.asyncio
+    async def test_malformed_id_is_not_found(self):
+        from fastapi import HTTPException
+        from app.routes.notebooks import check_notebook_owner
+
+        with patch('app.routes.notebooks.postgres_client') as mock_pg:
+            mock_pg.get_notebook_owner = AsyncMock()
+            with pytest.raises(HTTPException) as exc_info:
+                await check_notebook_owner("not-a-uuid", "user-1")
+
+        assert exc_info.value.status_code == 404
+        mock_pg.get_notebook_owner.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_pool_failure_falls_back_to_rest(self):
+        from app.routes.notebooks import get_notebook_owner
+        from app.services.metadata_cache import MetadataCache
+
+        with patch('app.routes.notebooks.metadata_cache', MetadataCache(maxsize=10, ttl=60)), \
+             patch('app.routes.notebooks.postgres_client') as mock_pg, \
+             patch('app.routes.notebooks.supabase') as mock_supabase:
+            mock_pg.available = True
+            mock_pg.get_notebook_owner = AsyncMock(side_effect=ConnectionError("pool down"))
+            execute = mock_supabase.table.return_value.select.return_value.eq.return_value.execute
+            execute.return_value = MagicMock(data=[{"user_id": "user-1"}])
+
+            owner = await get_notebook_owner(NOTEBOOK_ID)
+
+        assert owner == "user-1"
+
+
+class TestBatchSave:
+    """Test cases for save_messages"""
+
+    @pytest.mark.asyncio
+    async def test_pair_saved_with_one_insert(self, pool):
+        """One insert, ordered ids, notebook touch buffered"""
+        from app.routes.notebooks import save_messages, SaveMessagesRequest
+
+        pool.insert_messages = AsyncMock(side_effect=lambda rows: rows)
+        request = SaveMessagesRequest(messages=[
+            {"role": "user", "content": "Soru?"},
+            {"role": "assistant", "content": "Cevap.", "sources": [{"document_id": "doc-1", "page": 2}]}
+        ])
+
+        with patch('app.routes.notebooks.notebook_touch_buffer') as mock_touch:
+            mock_touch.touch = AsyncMock()
+            response = await save_messages("nb-1", request, x_user_id="user-1")
+
+        pool.insert_messages.assert_awaited_once()
+        mock_touch.touch.assert_awaited_once_with("nb-1")
+        rows = response["messages"]
+        assert [r["role"] for r in rows] == ["user", "assistant"]
+        # Timestamps come from the database; ids keep the keyset order on ties
+        assert all("created_at" not in r for r in rows)
+        assert rows[0]["id"] < rows[1]["id"]
+        assert rows[0]["sources"] is None
+        assert rows[1]["sources"][0]["page"] == 2
+
+    @pytest.mark.asyncio
+    async def test_pool_failure_falls_back_to_rest(self, pool):
+        from app.routes.notebooks import save_message, SaveMessageRequest
+
+        pool.insert_messages = AsyncMock(side_effect=ConnectionError("pool down"))
+        with patch('app.routes.notebooks.supabase') as mock_supabase, \
+             patch('app.routes.notebooks.notebook_touch_buffer') as mock_touch:
+            mock_touch.touch = AsyncMock()
+            mock_supabase.table.return_value.insert.return_value.execute.side_effect = \
+                lambda: MagicMock(data=mock_supabase.table.return_value.insert.call_args.args[0])
+
+            saved = await save_message("nb-1", SaveMessageRequest(role="user", content="Soru?"), x_user_id="user-1")
+
+        mock_supabase.table.assert_called_with("chat_messages")
+        assert saved["content"] == "Soru?"
+
+    @pytest.mark.asyncio
+    async def test_batch_size_limited(self, pool):
+        from fastapi import HTTPException
+        from app.routes.notebooks import save_messages, SaveMessagesRequest
+
+        request = SaveMessagesRequest(messages=[{"role": "user", "content": "x"}] * 51)
+        with pytest.raises(HTTPException) as exc_info:
+            await save_messages("nb-1", request, x_user_id="user-1")
+        assert exc_info.value.status_code == 400
@@ -0,0 +1,60 @@
+"""
+Unit tests for the write-behind notebook touch buffer
+"""
+import pytest
+from unittest.mock import patch, AsyncMock
+
+
+@pytest.fixture
+def pool():
+    with patch('app.services.notebook_touch.postgres_client') as mock_pg:
+        mock_pg.available = True
+        mock_pg.touch_notebooks = AsyncMock()
+        yield mock_pg
+
+
+class TestNotebookTouchBuffer:
+    """Test cases for NotebookTouchBuffer"""
+
+    @pytest.mark.asyncio
+    async def test_touches_coalesce_into_one_update(self, pool):
+        from app.services.notebook_touch import NotebookTouchBuffer
+
+        buffer = NotebookTouchBuffer(interval=60)
+        await buffer.start()
+        for notebook_id in ["nb-2", "nb-1", "nb-2", "nb-2"]:
+            await buffer.touch(notebook_id)
+        pool.touch_notebooks.assert_not_awaited()
+
+        await buffer.stop()
+
+        pool.touch_notebooks.assert_awaited_once_with(["nb-1", "nb-2"])
+        stats = buffer.stats()
+        assert stats["touches"] == 4
+        assert stats["notebooks_written"] == 2
+        assert stats["pending"] == 0
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_is_retried(self, pool):
+        from app.services.notebook_touch import NotebookTouchBuffer
+
+        buffer = NotebookTouchBuffer(interval=60)
+        await buffer.start()
+        await buffer.touch("nb-1")
+        pool.touch_notebooks.side_effect = Exception("connection lost")
+        assert await buffer.flush() == 0
+        assert buffer.stats()["pending"] == 1
+
+        pool.touch_notebooks.side_effect = None
+        assert await buffer.flush() == 1
+        await buffer.stop()
+
+    @pytest.mark.asyncio
+    async def test_writes_immediately_when_not_running(self, pool):
+        from app.services.notebook_touch import NotebookTouchBuffer
+
+        buffer = NotebookTouchBuffer(interval=0)
+        await buffer.start()
+        await buffer.touch("nb-1")
+
+        pool.touch_notebooks.assert_awaited_once_with(["nb-1"])
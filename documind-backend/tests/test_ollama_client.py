@@ -163,6 +163,82 @@ class TestOllamaClient:
 
             assert result is False
 
+    # --- Connection pool Tests ---
+
+    @pytest.mark.asyncio
+    async def test_requests_share_one_pooled_client(self, ollama_client):
+        """Every call reuses the client opened by start()"""
+        await ollama_client.start()
+        client = ollama_client._client
+
+        with patch.object(httpx.AsyncClient, 'post', new_callable=AsyncMock) as mock_post:
+            mock_response = MagicMock()
+            mock_response.json.return_value = {"response": "Cevap"}
+            mock_response.raise_for_status = MagicMock()
+            mock_post.return_value = mock_response
+
+            await ollama_client.generate_answer(question="Soru 1?", context="Bağlam")
+            await ollama_client.generate_answer(question="Soru 2?", context="Bağlam")
+
+        assert ollama_client._client is client
+        assert ollama_client.stats()["requests"] == 2
+        assert ollama_client.stats()["in_flight"] == 0
+        await ollama_client.close()
+        assert ollama_client._client is None
+
+    @pytest.mark.asyncio
+    async def test_pool_exhaustion_raises_busy(self, ollama_client):
+        """Waiting too long for a connection surfaces as OllamaBusy, not a timeout"""
+        from app.services.ollama_client import OllamaBusy
+
+        with patch.object(httpx.AsyncClient, 'post', new_callable=AsyncMock) as mock_post:
+            mock_post.side_effect = httpx.PoolTimeout("no connection available")
+
+            with pytest.raises(OllamaBusy):
+                await ollama_client.generate_answer(question="Soru?", context="Bağlam")
+
+        assert ollama_client.stats()["busy_rejections"] == 1
+
+    # --- stream_answer Tests ---
+
+    @pytest.mark.asyncio
+    async def test_stream_answer_yields_ndjson_fragments(self, ollama_client):
+        """Fragments come through in order and the payload asks for streaming"""
+        lines = [
+            '{"response": "Yapay ", "done": false}',
+            '',
+            '{"response": "zeka.", "done": false}',
+            '{"response": "", "done": true, "eval_count": 2}',
+        ]
+        stream_response = MagicMock()
+        stream_response.raise_for_status = MagicMock()
+
+        async def aiter_lines():
+            for line in lines:
+                yield line
+        stream_response.aiter_lines = aiter_lines
+
+        stream_ctx = MagicMock()
+        stream_ctx.__aenter__ = AsyncMock(return_value=stream_response)
+        stream_ctx.__aexit__ = AsyncMock(return_value=False)
+
+        with patch.object(httpx.AsyncClient, 'stream', return_value=stream_ctx) as mock_stream:
+            fragments = [
+                text async for text in ollama_client.stream_answer(question="Nedir?", context="Bağlam")
+            ]
+
+        assert fragments == ["Yapay ", "zeka."]
+        assert mock_stream.call_args.kwargs["json"]["stream"] is True
+        assert ollama_client.stats()["in_flight"] == 0
+
+    @pytest.mark.asyncio
+    async def test_stream_answer_smalltalk_skips_llm(self, ollama_client):
+        with patch.object(httpx.AsyncClient, 'stream') as mock_stream:
+            fragments = [text async for text in ollama_client.stream_answer(question="selam", context="")]
+
+        mock_stream.assert_not_called()
+        assert len(fragments) == 1
+
     # --- _truncate Tests ---
 
     def test_truncate_short_text(self, ollama_client):
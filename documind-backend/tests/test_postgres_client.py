@@ -0,0 +1,172 @@
+"""
+DocuMind - Async Postgres Layer Unit Tests
+
+Test framework: pytest + pytest-asyncio (asyncpg pool mocked)
+"""
+
+import pytest
+from datetime import datetime, timezone
+from uuid import UUID
+from unittest.mock import patch, AsyncMock, MagicMock
+
+
+class FakeRecord(dict):
+    """asyncpg.Record stand-in (mapping with .items())"""
+
+
+class TestPostgresClient:
+    """Test cases for the pooled asyncpg data layer"""
+
+    @pytest.mark.asyncio
+    async def test_disabled_without_asyncpg(self):
+        """connect() leaves the client unavailable when asyncpg is missing"""
+        from app.services.postgres_client import PostgresClient
+
+        client = PostgresClient()
+        with patch('app.services.postgres_client.asyncpg', None), \
+             patch('app.services.postgres_client.settings') as mock_settings:
+            mock_settings.DATABASE_POOL_ENABLED = True
+            mock_settings.DATABASE_URL = "postgresql://x@localhost/x"
+            await client.connect()
+
+        assert client.available is False
+        assert client.stats() == {"enabled": False}
+
+    @pytest.mark.asyncio
+    async def test_rows_match_postgrest_shape(self):
+        """UUIDs and timestamps come back as strings, like PostgREST JSON"""
+        from app.services.postgres_client import PostgresClient
+
+        doc_id = UUID("12345678-1234-5678-1234-567812345678")
+        created = datetime(2025, 1, 2, tzinfo=timezone.utc)
+        client = PostgresClient()
+        client._pool = MagicMock()
+        client._pool.fetchrow = AsyncMock(return_value=FakeRecord(id=doc_id, status="ready", created_at=created))
+
+        doc = await client.get_document(str(doc_id))
+
+        assert doc == {"id": str(doc_id), "status": "ready", "created_at": created.isoformat()}
+        client._pool.fetchrow.assert_awaited_once()
+
+
+    @pytest.mark.asyncio
+    async def test_list_messages_pages_backwards(self):
+        """`before` runs a descending keyset query and returns oldest first"""
+        from app.services.postgres_client import PostgresClient
+
+        client = PostgresClient()
+        client._pool = MagicMock()
+        client._pool.fetch = AsyncMock(return_value=[FakeRecord(id="m2"), FakeRecord(id="m1")])
+
+        messages = await client.list_messages("nb-1", 2, before=("2025-01-02T00:00:00+00:00", "m3"))
+
+        sql, *args = client._pool.fetch.await_args.args
+        assert "(created_at, id) < ($2, $3)" in sql
+        assert "ORDER BY created_at DESC, id DESC" in sql
+        assert args[1] == datetime(2025, 1, 2, tzinfo=timezone.utc)
+        assert [m["id"] for m in messages] == ["m1", "m2"]
+
+    @pytest.mark.asyncio
+    async def test_insert_messages_is_one_statement(self):
+        """Several messages go out as one multi-row INSERT, returned in input order"""
+        from app.services.postgres_client import PostgresClient
+
+        client = PostgresClient()
+        client._pool = MagicMock()
+        client._pool.fetch = AsyncMock(return_value=[FakeRecord(id="m2"), FakeRecord(id="m1")])
+
+        saved = await client.insert_messages([
+            {"id": "m1", "notebook_id": "nb-1", "role": "user", "content": "q"},
+            {"id": "m2", "notebook_id": "nb-1", "role": "assistant", "content": "a",
+             "created_at": "2025-01-02T00:00:00+00:00"}
+        ])
+
+        client._pool.fetch.assert_awaited_once()
+        sql, *args = client._pool.fetch.await_args.args
+        assert "($1, $2, $3, $4, $5, COALESCE($6, NOW() + interval '0 microseconds'))" in sql
+        assert "($7, $8, $9, $10, $11, COALESCE($12, NOW() + interval '1 microseconds'))" in sql
+        assert len(args) == 12
+        assert args[11] == datetime(2025, 1, 2, tzinfo=timezone.utc)
+        assert [m["id"] for m in saved] == ["m1", "m2"]
+
+    def test_vector_binary_codec_roundtrip(self):
+        """pgvector binary wire format: dim, unused, big-endian float32"""
+        from app.services.postgres_client import _encode_vector, _decode_vector
+
+        data = _encode_vector([1.5, -2.0, 0.25])
+
+        assert data[:4] == b"\x00\x03\x00\x00"
+        assert len(data) == 4 + 3 * 4
+        assert _decode_vector(data) == [1.5, -2.0, 0.25]
+
+    @pytest.mark.asyncio
+    async def test_copy_chunks_swaps_in_one_transaction(self):
+        """Old chunks are deleted and new ones COPYed inside one transaction"""
+        from app.services.postgres_client import PostgresClient, CHUNK_COLUMNS
+
+        doc_id = "12345678-1234-5678-1234-567812345678"
+        chunk_id = "87654321-4321-8765-4321-876543218765"
+        conn = MagicMock()
+        conn.execute = AsyncMock()
+        conn.copy_records_to_table = AsyncMock()
+        client = PostgresClient()
+        client._pool = MagicMock()
+        client._pool.acquire.return_value.__aenter__ = AsyncMock(return_value=conn)
+        client._pool.acquire.return_value.__aexit__ = AsyncMock(return_value=False)
+        conn.transaction.return_value.__aenter__ = AsyncMock()
+        conn.transaction.return_value.__aexit__ = AsyncMock(return_value=False)
+
+        await client.copy_chunks(doc_id, [{
+            "id": chunk_id, "document_id": doc_id, "chunk_text": "a", "chunk_number": 0,
+            "chunk_index": 0, "page_number": 1, "line_start": None, "line_end": None,
+            "embedding": [0.1, 0.2]
+        }])
+
+        conn.transaction.assert_called_once()
+        assert "DELETE FROM document_chunks" in conn.execute.call_args.args[0]
+        kwargs = conn.copy_records_to_table.call_args.kwargs
+        assert kwargs["columns"] == CHUNK_COLUMNS
+        assert kwargs["records"][0][:2] == (UUID(chunk_id), UUID(doc_id))
+
+
+class TestSupabaseVectorPool:
+    """Test cases for SupabaseVector routing hot queries through the pool"""
+
+    @pytest.mark.asyncio
+    async def test_uses_pool_when_available(self):
+        """Lookups, search and chunk insert skip the REST client"""
+        from app.services.supabase_vector import SupabaseVector
+
+        with patch('app.services.supabase_vector.postgres_client') as mock_pg, \
+             patch('app.services.supabase_vector.supabase') as mock_supabase:
+            mock_pg.available = True
+            mock_pg.get_document = AsyncMock(return_value={"id": "doc-1"})
+            mock_pg.match_document_chunks = AsyncMock(return_value=[{"id": "c0", "similarity": 0.9}])
+            mock_pg.copy_chunks = AsyncMock()
+
+            vector = SupabaseVector()
+            assert await vector.aget_document("doc-1") == {"id": "doc-1"}
+            assert await vector.vector_search([0.1, 0.2], ["doc-1"], limit=3) == [{"id": "c0", "similarity": 0.9}]
+            ids = await vector.astore_chunks("doc-1", [{"text": "a", "chunk_number": 0}], [[0.1, 0.2]])
+
+            mock_supabase.rpc.assert_not_called()
+            mock_supabase.table.assert_not_called()
+            assert len(ids) == 1
+            mock_pg.copy_chunks.assert_awaited_once()
+            inserted = mock_pg.copy_chunks.call_args.args[1]
+            assert inserted[0]["chunk_text"] == "a" and inserted[0]["chunk_index"] == 0
+
+    @pytest.mark.asyncio
+    async def test_falls_back_to_rest(self):
+        """Without a pool, or if it errors, the Supabase REST client is used"""
+        from app.services.supabase_vector import SupabaseVector
+
+        with patch('app.services.supabase_vector.postgres_client') as mock_pg, \
+             patch('app.services.supabase_vector.supabase') as mock_supabase:
+            mock_pg.available = True
+            mock_pg.get_document = AsyncMock(side_effect=Exception("connection reset"))
+            mock_supabase.table.return_value.select.return_value.eq.return_value.execute.return_value = MagicMock(
+                data=[{"id": "doc-1", "status": "ready"}]
+            )
+
+            assert (await SupabaseVector().aget_document("doc-1"))["status"] == "ready"
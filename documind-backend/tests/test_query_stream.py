@@ -0,0 +1,125 @@
+"""
+Unit tests for the streaming /query/stream endpoint (Server-Sent Events)
+"""
+import json
+import pytest
+from unittest.mock import patch, AsyncMock, MagicMock
+
+
+SOURCE = {"document_id": "doc-1", "title": "a.pdf", "chunk_id": "c1", "preview": "..."}
+
+
+def parse_events(body: str):
+    """[(event, data)] from an SSE body"""
+    events = []
+    for frame in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in frame.split("\n"))
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+async def read_body(response) -> str:
+    return "".join([chunk async for chunk in response.body_iterator])
+
+
+class TestQueryStream:
+    """Test cases for query_documents_stream"""
+
+    @pytest.fixture
+    def prepared(self):
+        with patch('app.routes.queries.prepare_query', new_callable=AsyncMock) as mock_prepare, \
+             patch('app.routes.queries.vector_store') as mock_store:
+            mock_prepare.return_value = {
+                "context": "ctx", "sources_hint": "hint", "sources": [SOURCE], "document_ids": ["doc-1"]
+            }
+            mock_store.log_query = MagicMock()
+            yield mock_prepare, mock_store
+
+    @pytest.mark.asyncio
+    async def test_sources_then_tokens_then_done(self, prepared):
+        from app.routes.queries import query_documents_stream, QueryRequest
+
+        async def fragments(**kwargs):
+            for text in ["Cevap ", "burada."]:
+                yield text
+
+        with patch('app.routes.queries.ollama_client') as mock_ollama:
+            mock_ollama.stream_answer = fragments
+            response = await query_documents_stream(
+                QueryRequest(question="Soru?", document_ids=["doc-1"]), "user-1", MagicMock()
+            )
+            events = parse_events(await read_body(response))
+
+        assert response.media_type == "text/event-stream"
+        assert [e for e, _ in events] == ["sources", "token", "token", "done"]
+        assert events[0][1]["sources"] == [SOURCE]
+        assert events[3][1]["answer"] == "Cevap burada."
+        assert set(events[3][1]["timings"]) == {"retrieval_ms", "first_token_ms", "total_ms"}
+        prepared[1].log_query.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_generation_error_becomes_error_event(self, prepared):
+        from app.routes.queries import query_documents_stream, QueryRequest
+
+        async def failing(**kwargs):
+            yield "Yarım"
+            raise Exception("Ollama timeout")
+
+        with patch('app.routes.queries.ollama_client') as mock_ollama:
+            mock_ollama.stream_answer = failing
+            response = await query_documents_stream(
+                QueryRequest(question="Soru?", document_ids=["doc-1"]), "user-1", MagicMock()
+            )
+            events = parse_events(await read_body(response))
+
+        assert [e for e, _ in events] == ["sources", "token", "error"]
+        assert events[2][1]["detail"] == "Ollama timeout"
+        prepared[1].log_query.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_validation_errors_are_plain_http_errors(self):
+        """Missing documents fail before the stream starts"""
+        from fastapi import HTTPException
+        from app.routes.queries import query_documents_stream, QueryRequest
+
+        loader = MagicMock()
+        loader.load_many = AsyncMock(return_value={"doc-1": None})
+        with pytest.raises(HTTPException) as exc_info:
+            await query_documents_stream(QueryRequest(question="Soru?", document_ids=["doc-1"]), "user-1", loader)
+        assert exc_info.value.status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_full_queue_is_503_before_stream(self, prepared):
+        """Admission is decided before the 200, so a busy Ollama is a plain 503"""
+        from fastapi import HTTPException
+        from app.routes.queries import query_documents_stream, QueryRequest
+        from app.services.ollama_client import OllamaBusy
+
+        with patch('app.routes.queries.ollama_client') as mock_ollama:
+            mock_ollama.reserve.side_effect = OllamaBusy("meşgul", retry_after=8)
+            with pytest.raises(HTTPException) as exc_info:
+                await query_documents_stream(
+                    QueryRequest(question="Soru?", document_ids=["doc-1"]), "user-1", MagicMock()
+                )
+
+        assert exc_info.value.status_code == 503
+        assert exc_info.value.headers == {"Retry-After": "8"}
+        mock_ollama.stream_answer.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_client_leaving_before_generation_frees_reservation(self, prepared):
+        """Disconnect right after `sources`: the queue place is given back explicitly"""
+        from app.routes.queries import query_documents_stream, QueryRequest
+
+        async def fragments(**kwargs):
+            yield "Cevap"
+
+        with patch('app.routes.queries.ollama_client') as mock_ollama:
+            mock_ollama.stream_answer = fragments
+            response = await query_documents_stream(
+                QueryRequest(question="Soru?", document_ids=["doc-1"]), "user-1", MagicMock()
+            )
+            await response.body_iterator.__anext__()  # sources
+            await response.body_iterator.aclose()
+
+        mock_ollama.reserve.return_value.cancel.assert_called_once()
@@ -0,0 +1,137 @@
+"""
+DocuMind - LLM Response Cache Unit Tests
+
+Test framework: pytest + pytest-asyncio (SQLite file in tmp_path, Ollama mocked)
+"""
+
+import asyncio
+import pytest
+from unittest.mock import patch, AsyncMock, MagicMock
+import httpx
+
+
+PAYLOAD = {"model": "gemma3:4b", "prompt": "Bağlam: ...\nSoru: Nedir?", "options": {"temperature": 0.3}}
+
+
+class TestResponseCache:
+    """Test cases for the two-tier response cache"""
+
+    def test_key_covers_model_options_and_prompt(self):
+        from app.services.response_cache import ResponseCache
+
+        key = ResponseCache.key(PAYLOAD)
+        assert key == ResponseCache.key(dict(PAYLOAD, stream=True))
+        assert key != ResponseCache.key(dict(PAYLOAD, model="llama3"))
+        assert key != ResponseCache.key(dict(PAYLOAD, options={"temperature": 0.7}))
+        assert key != ResponseCache.key(dict(PAYLOAD, prompt=PAYLOAD["prompt"] + " "))
+
+    def test_disk_tier_survives_restart(self, tmp_path):
+        from app.services.response_cache import ResponseCache
+
+        path = str(tmp_path / "llm" / "responses.sqlite3")
+        cache = ResponseCache(path=path)
+        cache.put("k1", "Cevap", ["doc-1"])
+        cache.close()
+
+        reopened = ResponseCache(path=path)
+        assert reopened.get("k1") == "Cevap"
+        assert reopened.disk_hits == 1
+        assert reopened.get("k1") == "Cevap"
+        assert reopened.stats()["memory"]["hits"] == 1
+
+    def test_ttl_expires_both_tiers(self, tmp_path):
+        from app.services.response_cache import ResponseCache
+
+        cache = ResponseCache(path=str(tmp_path / "responses.sqlite3"), ttl=60)
+        cache.put("k1", "Cevap", ["doc-1"])
+
+        with patch('app.services.lru_cache.time.monotonic', return_value=10 ** 12), \
+             patch('app.services.response_cache.time.time', return_value=10 ** 12):
+            assert cache.get("k1") is None
+
+    def test_invalidate_document_drops_dependent_entries(self, tmp_path):
+        from app.services.response_cache import ResponseCache
+
+        path = str(tmp_path / "responses.sqlite3")
+        cache = ResponseCache(path=path)
+        cache.put("both", "A", ["doc-1", "doc-2"])
+        cache.put("other", "B", ["doc-2"])
+
+        assert cache.invalidate_document("doc-1") == 1
+        assert cache.get("both") is None
+        assert cache.get("other") == "B"
+
+        cache.close()
+        assert ResponseCache(path=path).get("both") is None
+
+
+class TestOllamaResponseCaching:
+    """Test cases for OllamaClient reading through the cache"""
+
+    @pytest.fixture
+    def ollama_client(self):
+        from app.services.ollama_client import OllamaClient
+        return OllamaClient()
+
+    @pytest.mark.asyncio
+    async def test_identical_prompt_served_from_cache(self, ollama_client):
+        with patch.object(httpx.AsyncClient, 'post', new_callable=AsyncMock) as mock_post:
+            mock_response = MagicMock()
+            mock_response.json.return_value = {"response": "Cevap"}
+            mock_response.raise_for_status = MagicMock()
+            mock_post.return_value = mock_response
+
+            first = await ollama_client.generate_answer_cached("Soru?", "Bağlam", document_ids=["doc-1"])
+            second = await ollama_client.generate_answer_cached("Soru?", "Bağlam", document_ids=["doc-1"])
+            ollama_client.cache.invalidate_document("doc-1")
+            third = await ollama_client.generate_answer_cached("Soru?", "Bağlam", document_ids=["doc-1"])
+
+        assert first == ("Cevap", False)
+        assert second == ("Cevap", True)
+        assert third == ("Cevap", False)
+        assert mock_post.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_only_completed_streams_are_cached(self, ollama_client):
+        records = [{"response": "Cev", "done": False}, {"response": "ap", "done": True}]
+
+        async def stream_generate(payload, timeout):
+            for record in records:
+                yield record
+                await asyncio.sleep(0)  # a real stream suspends between records
+
+        with patch.object(ollama_client, '_stream_generate', stream_generate):
+            # Abandoned after the first fragment: nothing is cached
+            partial = ollama_client.stream_answer("Soru?", "Bağlam")
+            await partial.__anext__()
+            await partial.aclose()
+
+            meta = {}
+            miss = [t async for t in ollama_client.stream_answer("Soru?", "Bağlam", meta=meta)]
+            assert meta["cached"] is False
+
+            hit = [t async for t in ollama_client.stream_answer("Soru?", "Bağlam", meta=meta)]
+            assert meta["cached"] is True
+
+        assert miss == ["Cev", "ap"]
+        assert hit == ["Cevap"]
+
+
+class TestQueryCacheFlag:
+    """/query reports whether the answer came from the response cache"""
+
+    @pytest.mark.asyncio
+    async def test_query_response_flags_cache_hit(self):
+        from app.routes.queries import query_documents, QueryRequest
+
+        prepared = {"context": "ctx", "sources_hint": "hint", "sources": [{"document_id": "doc-1"}],
+                    "document_ids": ["doc-1"]}
+        with patch('app.routes.queries.prepare_query', AsyncMock(return_value=prepared)), \
+             patch('app.routes.queries.vector_store'), \
+             patch('app.routes.queries.ollama_client') as mock_ollama:
+            mock_ollama.generate_answer_cached = AsyncMock(return_value=("Cevap", True))
+
+            response = await query_documents(QueryRequest(question="Soru?", document_ids=["doc-1"]), "user-1", MagicMock())
+
+        assert response["cached"] is True
+        assert mock_ollama.generate_answer_cached.await_args.kwargs["document_ids"] == ["doc-1"]
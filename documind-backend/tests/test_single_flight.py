@@ -0,0 +1,173 @@
+"""
+DocuMind - Single-flight Coalescing Unit Tests
+
+Test framework: pytest + pytest-asyncio (Ollama mocked)
+"""
+
+import asyncio
+import pytest
+from unittest.mock import patch, MagicMock
+import httpx
+
+
+class TestSingleFlight:
+    """Identical concurrent LLM requests share one upstream generation"""
+
+    @pytest.fixture
+    def ollama_client(self):
+        from app.services.ollama_client import OllamaClient
+        return OllamaClient()
+
+    @staticmethod
+    def gated_stream(gate, calls, fragments=("Cev", "ap")):
+        """Fake _stream_generate that holds each fragment until `gate` is set"""
+        async def stream_generate(payload, timeout):
+            calls.append(payload)
+            for text in fragments:
+                await gate.wait()
+                yield {"response": text, "done": False}
+            yield {"response": "", "done": True}
+        return stream_generate
+
+    @pytest.mark.asyncio
+    async def test_concurrent_identical_requests_share_one_call(self, ollama_client):
+        gate = asyncio.Event()
+        calls = []
+
+        async def generate(payload, timeout):
+            calls.append(payload)
+            await gate.wait()
+            response = MagicMock()
+            response.json.return_value = {"response": "Cevap"}
+            return response
+
+        with patch.object(ollama_client, '_generate', generate):
+            tasks = [
+                asyncio.create_task(ollama_client.generate_answer_cached("Soru?", "Bağlam"))
+                for _ in range(3)
+            ]
+            await asyncio.sleep(0)
+            gate.set()
+            results = await asyncio.gather(*tasks)
+
+        assert results == [("Cevap", False)] * 3
+        assert len(calls) == 1
+        flights = ollama_client.stats()["single_flight"]
+        assert flights == {"active": 0, "started": 1, "coalesced": 2}
+
+    @pytest.mark.asyncio
+    async def test_different_prompts_are_not_coalesced(self, ollama_client):
+        async def generate(payload, timeout):
+            response = MagicMock()
+            response.json.return_value = {"response": payload["prompt"][-5:]}
+            return response
+
+        with patch.object(ollama_client, '_generate', generate):
+            await asyncio.gather(
+                ollama_client.generate_answer("Soru 1?", "Bağlam"),
+                ollama_client.generate_answer("Soru 2?", "Bağlam")
+            )
+
+        assert ollama_client.stats()["single_flight"]["coalesced"] == 0
+
+    @pytest.mark.asyncio
+    async def test_late_stream_joiner_replays_fragments(self, ollama_client):
+        gates = [asyncio.Event(), asyncio.Event()]
+        calls = []
+
+        async def stream_generate(payload, timeout):
+            calls.append(payload)
+            for gate, text in zip(gates, ("Cev", "ap")):
+                await gate.wait()
+                yield {"response": text, "done": False}
+            yield {"response": "", "done": True}
+
+        with patch.object(ollama_client, '_stream_generate', stream_generate):
+            leader = ollama_client.stream_answer("Soru?", "Bağlam")
+            gates[0].set()
+            first = await leader.__anext__()
+
+            # Joins after "Cev" was produced
+            meta = {}
+            follower = ollama_client.stream_answer("Soru?", "Bağlam", meta=meta)
+            replayed = await follower.__anext__()
+            gates[1].set()
+            follower_rest = [t async for t in follower]
+            leader_rest = [t async for t in leader]
+
+        assert [first] + leader_rest == ["Cev", "ap"]
+        assert [replayed] + follower_rest == ["Cev", "ap"]
+        assert meta["cached"] is False
+        assert len(calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_blocking_call_joins_stream(self, ollama_client):
+        gate = asyncio.Event()
+        calls = []
+
+        with patch.object(ollama_client, '_stream_generate', self.gated_stream(gate, calls)):
+            async def consume():
+                return [t async for t in ollama_client.stream_answer("Soru?", "Bağlam")]
+
+            streamed = asyncio.create_task(consume())
+            await asyncio.sleep(0)
+            blocking = asyncio.create_task(ollama_client.generate_answer("Soru?", "Bağlam"))
+            await asyncio.sleep(0)
+            gate.set()
+
+            assert await streamed == ["Cev", "ap"]
+            assert await blocking == "Cevap"
+        assert len(calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_upstream_survives_one_follower_leaving(self, ollama_client):
+        gate = asyncio.Event()
+        calls = []
+
+        with patch.object(ollama_client, '_stream_generate', self.gated_stream(gate, calls)):
+            async def consume():
+                return [t async for t in ollama_client.stream_answer("Soru?", "Bağlam")]
+
+            leaving = asyncio.create_task(consume())
+            staying = asyncio.create_task(consume())
+            await asyncio.sleep(0)
+            leaving.cancel()
+            await asyncio.sleep(0)
+            gate.set()
+
+            assert await staying == ["Cev", "ap"]
+        assert leaving.cancelled()
+        assert len(calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_last_follower_leaving_cancels_upstream(self, ollama_client):
+        gate = asyncio.Event()
+        calls = []
+
+        with patch.object(ollama_client, '_stream_generate', self.gated_stream(gate, calls)):
+            stream = ollama_client.stream_answer("Soru?", "Bağlam")
+            pending = asyncio.create_task(stream.__anext__())
+            await asyncio.sleep(0)
+            pending.cancel()
+            await asyncio.sleep(0)
+            await stream.aclose()
+
+            # Nothing is cached and a new request starts a fresh generation
+            gate.set()
+            again = [t async for t in ollama_client.stream_answer("Soru?", "Bağlam")]
+
+        assert again == ["Cev", "ap"]
+        assert len(calls) == 2
+        assert ollama_client.stats()["single_flight"]["active"] == 0
+
+    @pytest.mark.asyncio
+    async def test_failure_reaches_every_follower(self, ollama_client):
+        with patch.object(httpx.AsyncClient, 'post', side_effect=httpx.ConnectError("refused")):
+            results = await asyncio.gather(
+                ollama_client.generate_answer("Soru?", "Bağlam"),
+                ollama_client.generate_answer("Soru?", "Bağlam"),
+                return_exceptions=True
+            )
+
+        assert all(isinstance(r, Exception) and "ollama serve" in str(r) for r in results)
+        assert ollama_client.stats()["single_flight"]["coalesced"] == 1
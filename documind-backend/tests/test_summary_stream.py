@@ -0,0 +1,122 @@
+"""
+Unit tests for the streaming summary mode
+"""
+import json
+import pytest
+from unittest.mock import patch, AsyncMock, MagicMock
+
+
+def parse_events(frames):
+    events = []
+    for frame in frames:
+        lines = dict(line.split(": ", 1) for line in frame.strip().split("\n"))
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def prepared(cached=None):
+    if cached:
+        return {"cached": cached}
+    return {
+        "cached": None,
+        "doc": {"id": "doc-1", "filename": "a.pdf"},
+        "content": "İçerik",
+        "sources": [{"document_id": "doc-1", "chunk_id": "c1"}]
+    }
+
+
+def fragments(*texts, error=None):
+    async def stream_summary(**kwargs):
+        for text in texts:
+            yield text
+        if error:
+            raise Exception(error)
+    return stream_summary
+
+
+class TestSummaryStream:
+    """Test cases for stream_summary_events"""
+
+    @pytest.fixture
+    def store(self):
+        with patch('app.routes.documents.vector_store') as mock_store:
+            yield mock_store
+
+    @pytest.mark.asyncio
+    async def test_completed_stream_saves_full_summary(self, store):
+        from app.routes.documents import stream_summary_events
+
+        with patch('app.routes.documents.ollama_client') as mock_ollama:
+            mock_ollama.stream_summary = fragments("Genel ", "bakış.")
+            events = parse_events([
+                frame async for frame in stream_summary_events("doc-1", "long", True, prepared())
+            ])
+
+        assert [e for e, _ in events] == ["sources", "token", "token", "done"]
+        assert events[-1][1]["summary"] == "Genel bakış."
+        assert events[-1][1]["saved"] is True
+        store.save_document_summary.assert_called_once_with("doc-1", long_summary="Genel bakış.")
+
+    @pytest.mark.asyncio
+    async def test_abandoned_stream_saves_nothing(self, store):
+        """Client goes away after the first token: no partial summary is stored"""
+        from app.routes.documents import stream_summary_events
+
+        with patch('app.routes.documents.ollama_client') as mock_ollama:
+            mock_ollama.stream_summary = fragments("Genel ", "bakış.")
+            events = stream_summary_events("doc-1", "short", True, prepared())
+            await events.__anext__()  # sources
+            await events.__anext__()  # first token
+            await events.aclose()
+
+        store.save_document_summary.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_client_leaving_before_generation_frees_reservation(self, store):
+        """Disconnect right after `sources`: the queue place is given back explicitly"""
+        from app.routes.documents import stream_summary_events
+
+        reservation = MagicMock()
+        with patch('app.routes.documents.ollama_client') as mock_ollama:
+            mock_ollama.stream_summary = fragments("Genel ")
+            events = stream_summary_events("doc-1", "short", False, prepared(), reservation)
+            await events.__anext__()  # sources
+            await events.aclose()
+
+        reservation.cancel.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_failed_stream_saves_nothing(self, store):
+        from app.routes.documents import stream_summary_events
+
+        with patch('app.routes.documents.ollama_client') as mock_ollama:
+            mock_ollama.stream_summary = fragments("Genel ", error="Ollama timeout")
+            events = parse_events([
+                frame async for frame in stream_summary_events("doc-1", "short", True, prepared())
+            ])
+
+        assert [e for e, _ in events] == ["sources", "token", "error"]
+        store.save_document_summary.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_stored_summary_is_replayed(self, store):
+        from app.routes.documents import stream_summary_events
+
+        with patch('app.routes.documents.ollama_client') as mock_ollama:
+            events = parse_events([
+                frame async for frame in stream_summary_events("doc-1", "short", False, prepared(cached="Kayıtlı özet"))
+            ])
+            mock_ollama.stream_summary.assert_not_called()
+
+        assert events[-1][1] == {"mode": "short", "summary": "Kayıtlı özet", "cached": True, "saved": False}
+
+    @pytest.mark.asyncio
+    async def test_route_returns_event_stream(self, store):
+        from app.routes.documents import generate_document_summary
+
+        with patch('app.routes.documents.prepare_summary', AsyncMock(return_value=prepared())):
+            response = await generate_document_summary(
+                "doc-1", mode="short", save=False, stream=True, x_user_id="user-1", loader=MagicMock()
+            )
+
+        assert response.media_type == "text/event-stream"
@@ -0,0 +1,108 @@
+"""
+DocuMind - SupabaseVector Unit Tests
+
+Test framework: pytest (Supabase client mocked)
+"""
+
+import pytest
+from unittest.mock import patch, MagicMock
+
+
+def make_chunks(n):
+    return [
+        {"text": f"chunk {i}", "chunk_number": i, "chunk_index": i, "page_number": 1}
+        for i in range(n)
+    ]
+
+
+class TestStoreChunks:
+    """Test cases for SupabaseVector.store_chunks (bulk insert)"""
+
+    @pytest.fixture
+    def vector(self):
+        from app.services.supabase_vector import SupabaseVector
+        return SupabaseVector()
+
+    def test_inserts_in_batches(self, vector):
+        """Rows are written with one insert per batch"""
+        with patch('app.services.supabase_vector.supabase') as mock_supabase:
+            table = mock_supabase.table.return_value
+
+            ids = vector.store_chunks("doc-123", make_chunks(5), [[0.1, 0.2]] * 5, batch_size=2)
+
+            assert len(ids) == 5
+            assert table.insert.call_count == 3
+            first_batch = table.insert.call_args_list[0].args[0]
+            assert [row["chunk_number"] for row in first_batch] == [0, 1]
+            assert first_batch[0]["embedding"] == [0.1, 0.2]
+
+    def test_rolls_back_on_failure(self, vector):
+        """Rows from earlier batches are deleted when a later batch fails"""
+        with patch('app.services.supabase_vector.supabase') as mock_supabase:
+            table = mock_supabase.table.return_value
+            table.insert.return_value.execute.side_effect = [MagicMock(), Exception("boom")]
+
+            with pytest.raises(Exception) as exc_info:
+                vector.store_chunks("doc-123", make_chunks(4), [[0.1]] * 4, batch_size=2)
+
+            assert "Failed to store chunks" in str(exc_info.value)
+            deleted_ids = table.delete.return_value.in_.call_args.args[1]
+            assert len(deleted_ids) == 2
+
+    def test_mismatched_lengths(self, vector):
+        """Chunks and embeddings must line up"""
+        with pytest.raises(Exception):
+            vector.store_chunks("doc-123", make_chunks(2), [[0.1]])
+
+
+class TestLocalFallbackRanking:
+    """Test cases for the NumPy cosine ranking used when the RPC fails"""
+
+    def test_matches_bruteforce_order(self):
+        """Top-k order equals a plain sort by cosine similarity"""
+        import random
+        from app.services.vector_math import rank_rows
+        from benchmarks.bench_vector_fallback import legacy_rank, make_rows
+
+        random.seed(1)
+        rows = make_rows(200, 16, as_text=False)
+        query = [random.gauss(0, 1) for _ in range(16)]
+
+        expected = legacy_rank(query, rows, 7)
+        actual = rank_rows(query, rows, 7)
+
+        assert [r["id"] for r in actual] == [r["id"] for r in expected]
+        assert actual[0]["similarity"] == pytest.approx(expected[0]["similarity"], abs=1e-5)
+
+    def test_threshold_and_postgrest_strings(self):
+        """String vectors are parsed, threshold is strict, embedding is dropped"""
+        from app.services.vector_math import rank_rows
+
+        rows = [
+            {"id": "same", "embedding": "[1,0]"},
+            {"id": "orthogonal", "embedding": "[0,1]"},
+            {"id": "missing", "embedding": None},
+            {"id": "zero", "embedding": [0, 0]},
+        ]
+
+        result = rank_rows([1.0, 0.0], rows, limit=5, threshold=0.3)
+
+        assert [r["id"] for r in result] == ["same"]
+        assert "embedding" not in result[0]
+        assert result[0]["similarity"] == pytest.approx(1.0)
+
+    @pytest.mark.asyncio
+    async def test_vector_search_uses_fallback_on_rpc_error(self):
+        """vector_search returns locally ranked rows when the RPC raises"""
+        from app.services.supabase_vector import SupabaseVector
+
+        with patch('app.services.supabase_vector.supabase') as mock_supabase:
+            mock_supabase.rpc.return_value.execute.side_effect = Exception("ambiguous function")
+            mock_supabase.table.return_value.select.return_value.in_.return_value.execute.return_value = MagicMock(
+                data=[{"id": "a", "document_id": "d", "embedding": "[0.6,0.8]"},
+                      {"id": "b", "document_id": "d", "embedding": "[1,0]"}]
+            )
+
+            result = await SupabaseVector(similarity_threshold=0.0).vector_search([1.0, 0.0], ["d"], limit=1)
+
+        assert [r["id"] for r in result] == ["b"]
@@ -10,7 +10,15 @@ import { AddSourceDialog } from '@/components/notebook/AddSourceDialog';
 import { CreateNotebookDialog } from '@/components/home/CreateNotebookDialog';
 import { useNotebooksContext } from '@/hooks/NotebooksContext';
 import type { Message, MessageSource } from '@/types';
-import { api } from '@/services/api';
+import { api, BusyError } from '@/services/api';
+
+/** Busy backend: say when to retry instead of a generic failure */
+function describeError(error: unknown): string {
+  if (error instanceof BusyError && error.retryAfter) {
+    return `${error.message} (${error.retryAfter} sn sonra tekrar deneyin)`;
+  }
+  return String(error);
+}
 
 export function Notebook() {
   const { id } = useParams<{ id: string }>();
@@ -45,13 +53,17 @@ export function Notebook() {
   }, [id]);
 
   // Mesaji backend'e kaydet
-  const saveMessage = useCallback(async (message: Message) => {
+  // A question and its answer are saved together in one request
+  const saveMessages = useCallback(async (...messages: Message[]) => {
     if (!id) return;
 
     try {
-      await api.saveMessage(id, message.role, message.content, message.sources);
+      await api.saveMessages(
+        id,
+        messages.map(({ role, content, sources }) => ({ role, content, sources }))
+      );
     } catch (error) {
-      console.error('Failed to save message:', error);
+      console.error('Failed to save messages:', error);
     }
   }, [id]);
 
@@ -120,7 +132,6 @@ export function Notebook() {
     };
 
     setMessages((prev) => [...prev, userMessage]);
-    saveMessage(userMessage); // Backend'e kaydet
     setIsLoading(true);
 
     try {
@@ -130,21 +141,42 @@ export function Notebook() {
         throw new Error('Bu not defterinde yuklenimis belge yok');
       }
 
-      // Query backend AI
-      const response = await api.queryDocuments(content, documentIds);
+      // Query backend AI (streamed: the answer grows as tokens arrive)
+      const assistantId = (Date.now() + 1).toString();
+      const updateAssistant = (patch: Partial<Message>) =>
+        setMessages((prev) => prev.map((m) => (m.id === assistantId ? { ...m, ...patch } : m)));
+
+      setMessages((prev) => [
+        ...prev,
+        { id: assistantId, role: 'assistant', content: '', createdAt: new Date() },
+      ]);
+
+      let streamed = '';
+      const response = await api.queryDocumentsStream(content, documentIds, {
+        onSources: (sources) => updateAssistant({ sources }),
+        onToken: (text) => {
+          streamed += text;
+          updateAssistant({ content: streamed });
+        },
+      }).catch((error) => {
+        // Drop the partial answer; the error message below replaces it
+        setMessages((prev) => prev.filter((m) => m.id !== assistantId));
+        throw error;
+      });
 
       const assistantMessage: Message = {
-        id: (Date.now() + 1).toString(),
+        id: assistantId,
         role: 'assistant',
         content: response.answer,
         sources: response.sources,
         createdAt: new Date(),
       };
 
-      setMessages((prev) => [...prev, assistantMessage]);
-      saveMessage(assistantMessage); // Backend'e kaydet
+      updateAssistant(assistantMessage);
+      saveMessages(userMessage, assistantMessage);
     } catch (error) {
-      toast.error(`Bir hata olustu: ${error}`);
+      saveMessages(userMessage); // The question is kept even without an answer
+      toast.error(`Bir hata olustu: ${describeError(error)}`);
 
       const errorMessage: Message = {
         id: (Date.now() + 1).toString(),
@@ -176,11 +208,23 @@ export function Notebook() {
       createdAt: new Date(),
     };
     setMessages((prev) => [...prev, userMessage]);
-    saveMessage(userMessage);
 
     try {
       // Generate summary for first document (can be extended for multiple)
-      const response = await api.generateSummary(documentIds[0], 'short', true);
+      // Streamed: the summary bubble fills in as tokens arrive
+      const assistantId = (Date.now() + 1).toString();
+      let streamed = '';
+      setMessages((prev) => [
+        ...prev,
+        { id: assistantId, role: 'assistant', content: '', createdAt: new Date() },
+      ]);
+      const response = await api.generateSummaryStream(documentIds[0], 'short', true, (text) => {
+        streamed += text;
+        setMessages((prev) => prev.map((m) => (m.id === assistantId ? { ...m, content: streamed } : m)));
+      }).catch((error) => {
+        setMessages((prev) => prev.filter((m) => m.id !== assistantId));
+        throw error;
+      });
 
       const sources: MessageSource[] = response.sources.map((s) => ({
         document_id: s.document_id,
@@ -195,21 +239,22 @@ export function Notebook() {
       }));
 
       const assistantMessage: Message = {
-        id: (Date.now() + 1).toString(),
+        id: assistantId,
         role: 'assistant',
         content: response.summary,
         sources: sources.length > 0 ? sources : undefined,
         createdAt: new Date(),
       };
 
-      setMessages((prev) => [...prev, assistantMessage]);
-      saveMessage(assistantMessage);
+      setMessages((prev) => prev.map((m) => (m.id === assistantId ? assistantMessage : m)));
+      saveMessages(userMessage, assistantMessage);
 
       if (response.cached) {
         toast.info('Onbellekteki özet kullanıldı');
       }
     } catch (error) {
-      toast.error(`Özet oluşturulamadı: ${error}`);
+      saveMessages(userMessage); // The question is kept even without an answer
+      toast.error(`Özet oluşturulamadı: ${describeError(error)}`);
 
       const errorMessage: Message = {
         id: (Date.now() + 1).toString(),
@@ -241,10 +286,22 @@ export function Notebook() {
       createdAt: new Date(),
     };
     setMessages((prev) => [...prev, userMessage]);
-    saveMessage(userMessage);
 
     try {
-      const response = await api.generateSummary(documentIds[0], 'long', true);
+      // Streamed: the summary bubble fills in as tokens arrive
+      const assistantId = (Date.now() + 1).toString();
+      let streamed = '';
+      setMessages((prev) => [
+        ...prev,
+        { id: assistantId, role: 'assistant', content: '', createdAt: new Date() },
+      ]);
+      const response = await api.generateSummaryStream(documentIds[0], 'long', true, (text) => {
+        streamed += text;
+        setMessages((prev) => prev.map((m) => (m.id === assistantId ? { ...m, content: streamed } : m)));
+      }).catch((error) => {
+        setMessages((prev) => prev.filter((m) => m.id !== assistantId));
+        throw error;
+      });
 
       const sources: MessageSource[] = response.sources.map((s) => ({
         document_id: s.document_id,
@@ -259,21 +316,22 @@ export function Notebook() {
       }));
 
       const assistantMessage: Message = {
-        id: (Date.now() + 1).toString(),
+        id: assistantId,
         role: 'assistant',
         content: response.summary,
         sources: sources.length > 0 ? sources : undefined,
         createdAt: new Date(),
       };
 
-      setMessages((prev) => [...prev, assistantMessage]);
-      saveMessage(assistantMessage);
+      setMessages((prev) => prev.map((m) => (m.id === assistantId ? assistantMessage : m)));
+      saveMessages(userMessage, assistantMessage);
 
       if (response.cached) {
         toast.info('Onbellekteki ozet kullanildi');
       }
     } catch (error) {
-      toast.error(`Ozet olusturulamadi: ${error}`);
+      saveMessages(userMessage); // The question is kept even without an answer
+      toast.error(`Ozet olusturulamadi: ${describeError(error)}`);
 
       const errorMessage: Message = {
         id: (Date.now() + 1).toString(),
@@ -305,11 +363,10 @@ export function Notebook() {
       createdAt: new Date(),
     };
     setMessages((prev) => [...prev, userMessage]);
-    saveMessage(userMessage);
 
     try {
-      // Search in first document (can be extended for multiple)
-      const response = await api.keywordSearch(documentIds[0], query);
+      // Search all selected documents in one request
+      const response = await api.keywordSearch(documentIds, query);
 
       let resultContent = '';
       if (response.total === 0) {
@@ -350,8 +407,9 @@ export function Notebook() {
       };
 
       setMessages((prev) => [...prev, assistantMessage]);
-      saveMessage(assistantMessage);
+      saveMessages(userMessage, assistantMessage);
     } catch (error) {
+      saveMessages(userMessage); // The question is kept even without an answer
       toast.error(`Arama basarisiz: ${error}`);
 
       const errorMessage: Message = {
@@ -21,6 +21,7 @@ export interface NotebookResponse {
   created_at: string;
   updated_at: string;
   document_count?: number;
+  last_activity_at?: string | null;
   documents?: Document[];
 }
 
@@ -32,6 +33,14 @@ export interface ChatMessageResponse {
   created_at: string;
 }
 
+export interface MessagePage {
+  messages: ChatMessageResponse[];
+  total: number;
+  has_more?: boolean;
+  next_before?: string | null;
+  sync_cursor?: string | null;
+}
+
 export interface Document {
   id: string;
   user_id: string;
@@ -50,6 +59,85 @@ export interface QueryResponse {
   question: string;
   answer: string;
   sources: MessageSource[];
+  cached?: boolean;  // served from the backend's LLM response cache
+}
+
+export interface StreamTimings {
+  retrieval_ms: number;
+  first_token_ms: number | null;
+  total_ms: number;
+}
+
+export interface QueryStreamHandlers {
+  onSources?: (sources: MessageSource[], queryId: string) => void;
+  onToken?: (text: string) => void;
+}
+
+/**
+ * Ollama is at capacity (HTTP 503, or a `busy` error event mid-stream).
+ * retryAfter is the server's estimate in seconds, when it sent one.
+ */
+export class BusyError extends Error {
+  retryAfter: number | null;
+
+  constructor(message: string, retryAfter: number | null) {
+    super(message);
+    this.name = 'BusyError';
+    this.retryAfter = retryAfter;
+  }
+}
+
+function parseRetryAfter(value: unknown): number | null {
+  const seconds = Number(value);
+  return value != null && Number.isFinite(seconds) && seconds > 0 ? seconds : null;
+}
+
+async function generationError(response: Response, fallback: string): Promise<Error> {
+  const error = await response.json().catch(() => ({ detail: fallback }));
+  if (response.status === 503) {
+    return new BusyError(error.detail || fallback, parseRetryAfter(response.headers.get('Retry-After')));
+  }
+  return new Error(error.detail || fallback);
+}
+
+/**
+ * Read a Server-Sent Events response, calling onEvent(event, data) per frame.
+ * An `error` event is thrown as an Error (a BusyError when Ollama is busy).
+ */
+async function readEventStream(
+  response: Response,
+  onEvent: (event: string, data: any) => void
+): Promise<void> {
+  const reader = response.body!.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+
+  for (;;) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    let boundary;
+    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+      const frame = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+
+      let event = 'message';
+      let data = '';
+      for (const line of frame.split('\n')) {
+        if (line.startsWith('event: ')) event = line.slice(7);
+        else if (line.startsWith('data: ')) data += line.slice(6);
+      }
+      const payload = data ? JSON.parse(data) : null;
+      if (event === 'error') {
+        if (payload?.busy) {
+          throw new BusyError(payload.detail || 'Stream failed', parseRetryAfter(payload.retry_after));
+        }
+        throw new Error(payload?.detail || 'Stream failed');
+      }
+      onEvent(event, payload);
+    }
+  }
 }
 
 export interface DocumentStatusResponse {
@@ -181,8 +269,7 @@ export const api = {
       clearTimeout(timeoutId);
 
       if (!response.ok) {
-        const error = await response.json().catch(() => ({ detail: 'Summary generation failed' }));
-        throw new Error(error.detail || 'Summary generation failed');
+        throw await generationError(response, 'Summary generation failed');
       }
 
       return response.json();
@@ -259,8 +346,7 @@ export const api = {
       clearTimeout(timeoutId);
 
       if (!response.ok) {
-        const error = await response.json().catch(() => ({ detail: 'Query failed' }));
-        throw new Error(error.detail || 'Query failed');
+        throw await generationError(response, 'Query failed');
       }
 
       return response.json();
@@ -274,15 +360,104 @@ export const api = {
   },
 
   /**
-   * Keyword search in a document
+   * Streaming variant of generateSummary: onToken receives text as it is
+   * generated. With save=true the backend stores the summary only once the
+   * stream has completed.
    */
-  async keywordSearch(
+  async generateSummaryStream(
     documentId: string,
+    mode: 'short' | 'long' = 'short',
+    save: boolean = false,
+    onToken?: (text: string) => void
+  ): Promise<SummaryResponse> {
+    const response = await fetch(
+      `${API_URL}/documents/${documentId}/summary?mode=${mode}&save=${save}&stream=true`,
+      {
+        method: 'POST',
+        headers: {
+          'x-user-id': USER_ID,
+        },
+      }
+    );
+
+    if (!response.ok) {
+      throw await generationError(response, 'Summary generation failed');
+    }
+
+    let result: SummaryResponse = { mode, summary: '', sources: [], cached: false };
+    await readEventStream(response, (event, data) => {
+      if (event === 'sources') {
+        result = { ...result, sources: data.sources };
+      } else if (event === 'token') {
+        onToken?.(data.text);
+      } else if (event === 'done') {
+        result = { ...result, summary: data.summary, cached: data.cached };
+      }
+    });
+    return result;
+  },
+
+  /**
+   * Streaming variant of queryDocuments: sources arrive right after retrieval,
+   * then answer tokens as the model generates them. Resolves with the full answer.
+   */
+  async queryDocumentsStream(
+    question: string,
+    documentIds: string[],
+    handlers: QueryStreamHandlers = {},
+    searchLimit: number = 5
+  ): Promise<QueryResponse & { timings?: StreamTimings }> {
+    const response = await fetch(`${API_URL}/query/stream`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+        'x-user-id': USER_ID,
+      },
+      body: JSON.stringify({
+        question,
+        document_ids: documentIds,
+        search_limit: searchLimit,
+      }),
+    });
+
+    if (!response.ok) {
+      throw await generationError(response, 'Query failed');
+    }
+
+    let result: QueryResponse & { timings?: StreamTimings } = {
+      query_id: '',
+      question,
+      answer: '',
+      sources: [],
+    };
+    await readEventStream(response, (event, data) => {
+      if (event === 'sources') {
+        result = { ...result, query_id: data.query_id, sources: data.sources };
+        handlers.onSources?.(data.sources, data.query_id);
+      } else if (event === 'token') {
+        handlers.onToken?.(data.text);
+      } else if (event === 'done') {
+        result = { ...result, answer: data.answer, cached: data.cached, timings: data.timings };
+      }
+    });
+    return result;
+  },
+
+  /**
+   * Keyword search in one or more documents (single request, merged results)
+   */
+  async keywordSearch(
+    documentIds: string | string[],
     query: string,
-    limit: number = 10
+    limit: number = 10,
+    offset: number = 0
   ): Promise<KeywordSearchResult> {
+    const ids = Array.isArray(documentIds) ? documentIds : [documentIds];
+    const scope = ids.length === 1
+      ? `document_id=${encodeURIComponent(ids[0])}`
+      : ids.map((id) => `document_ids=${encodeURIComponent(id)}`).join('&');
     const response = await fetch(
-      `${API_URL}/search/keyword?document_id=${encodeURIComponent(documentId)}&q=${encodeURIComponent(query)}&limit=${limit}`,
+      `${API_URL}/search/keyword?${scope}&q=${encodeURIComponent(query)}&limit=${limit}&offset=${offset}`,
       {
         headers: {
           'x-user-id': USER_ID,
@@ -341,7 +516,7 @@ export const api = {
   /**
    * List all notebooks for current user
    */
-  async listNotebooks(): Promise<{ notebooks: NotebookResponse[]; total: number }> {
+  async listNotebooks(): Promise<{ notebooks: NotebookResponse[]; total: number; next_cursor?: string | null }> {
     const response = await fetch(`${API_URL}/notebooks/`, {
       headers: {
         'x-user-id': USER_ID,
@@ -457,10 +632,21 @@ export const api = {
   // ==================== CHAT MESSAGE ENDPOINTS ====================
 
   /**
-   * Get chat messages for a notebook
+   * Get chat messages for a notebook (newest page by default).
+   * Pass `before: next_before` to load older messages, or
+   * `after: sync_cursor` to fetch only messages added since the last call.
    */
-  async getNotebookMessages(notebookId: string, limit: number = 100): Promise<{ messages: ChatMessageResponse[]; total: number }> {
-    const response = await fetch(`${API_URL}/notebooks/${notebookId}/messages?limit=${limit}`, {
+  async getNotebookMessages(
+    notebookId: string,
+    limit: number = 100,
+    cursor: { before?: string; after?: string; since?: string } = {}
+  ): Promise<MessagePage> {
+    const params = new URLSearchParams({ limit: String(limit) });
+    if (cursor.before) params.set('before', cursor.before);
+    if (cursor.after) params.set('after', cursor.after);
+    if (cursor.since) params.set('since', cursor.since);
+
+    const response = await fetch(`${API_URL}/notebooks/${notebookId}/messages?${params}`, {
       headers: {
         'x-user-id': USER_ID,
       },
@@ -500,6 +686,30 @@ export const api = {
     return response.json();
   },
 
+  /**
+   * Save several chat messages (e.g. a question and its answer) in one request
+   */
+  async saveMessages(
+    notebookId: string,
+    messages: { role: 'user' | 'assistant'; content: string; sources?: MessageSource[] }[]
+  ): Promise<{ messages: ChatMessageResponse[]; total: number }> {
+    const response = await fetch(`${API_URL}/notebooks/${notebookId}/messages/batch`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+        'x-user-id': USER_ID,
+      },
+      body: JSON.stringify({ messages }),
+    });
+
+    if (!response.ok) {
+      const error = await response.json().catch(() => ({ detail: 'Failed to save messages' }));
+      throw new Error(error.detail || 'Failed to save messages');
+    }
+
+    return response.json();
+  },
+
   /**
    * Clear all messages in a notebook
    */
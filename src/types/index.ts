@@ -67,8 +67,10 @@ export type DocumentStatus = {
 // Keyword search result
 export type KeywordSearchResult = {
   query: string;
-  document_id: string;
-  document_title: string;
+  document_id?: string;
+  document_title?: string;
+  document_ids: string[];
+  notebook_id?: string;
   results: Array<{
     document_id: string;
     title: string;
@@ -79,6 +81,13 @@ export type KeywordSearchResult = {
     line_end: number | null;
     preview: string;
     full_text: string;
+    match_count: number;
+    matches: Array<[number, number]>;
+    snippet_start: number;
+    snippet_end: number;
   }>;
   total: number;
+  offset: number;
+  limit: number;
+  has_more: boolean;
 };